@@ -13,12 +13,15 @@
     """,
     'author': 'Nidhi Lad',
     'website': 'https://github.com/NidhiLad13/Skill_Swap_Platform',
-    'depends': ['base', 'website', 'portal', 'mail'],
+    'depends': ['base', 'website', 'portal', 'mail', 'bus'],
     'data': [
         'security/security.xml',
         'security/ir.model.access.csv',
         'data/skill_categories_data.xml',
         'data/email_templates.xml',
+        'data/ir_cron_data.xml',
+        'data/ir_sequence_data.xml',
+        'data/skill_taxonomy_data.xml',
         'views/menu.xml',
         'views/skill_category_views.xml',
         'views/user_skill_views.xml',
@@ -26,6 +29,10 @@
         'views/swap_rating_views.xml',
         'views/portal_templates.xml',
         'wizard/swap_request_wizard.xml',
+        'wizard/skill_swap_import_wizard.xml',
+        'views/mail_outbox_views.xml',
+        'views/skill_canonical_views.xml',
+        'report/swap_report_views.xml',
     ],
     'assets': {
         'web.assets_backend': [
@@ -35,6 +42,7 @@
         ],
         'web.assets_frontend': [
             'skill_swap_platform/static/src/js/skill_swap.js',
+            'skill_swap_platform/static/src/js/notification_service.js',
             'skill_swap_platform/static/src/css/skill_swap_styles.css',
         ],
     },
@@ -1,52 +1,119 @@
-from odoo import http
+from odoo import http, fields
+from odoo.exceptions import ValidationError
 from odoo.http import request
+from collections import OrderedDict
+import hashlib
+import hmac
 import json
+import threading
+import time
+
+from ..models.swap_request import INBOX_BOXES
+from ..tools.keyset import decode_cursor
+from ..tools.metrics import instrument, render as render_metrics
+from .serializers import (
+    SKILL_SERIALIZER, MY_SKILL_SERIALIZER, CATEGORY_SERIALIZER, REQUEST_SERIALIZER, MATCH_SERIALIZER,
+    REPUTATION_SERIALIZER,
+)
+
+MAX_PAGE_SIZE = 100
+MAX_SLOTS = 20
+MAX_SLOT_DAYS = 60
+DASHBOARD_TTL = 30  # seconds
+CACHE_MAX_AGE = 60  # seconds an ETag of _cached_json_response stays valid
+
+
+class BodyCache:
+    """Small thread-safe LRU of serialized response bodies, keyed by ETag."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_BODY_CACHE = BodyCache(max_entries=1024)
+# (dbname, lang): (expiry, body) of the admin dashboard
+_DASHBOARD_CACHE = {}
 
 
 class SkillSwapController(http.Controller):
 
     @http.route('/skill_swap/api/skills/search', type='json', auth='user', methods=['POST'])
+    @instrument
     def search_skills(self, **kwargs):
-        """API endpoint to search skills"""
-        domain = []
-
-        if kwargs.get('skill_name'):
-            domain.append(('skill_name', 'ilike', kwargs['skill_name']))
-        if kwargs.get('category_id'):
-            domain.append(('category_id', '=', kwargs['category_id']))
-        if kwargs.get('location'):
-            domain.append(('location', 'ilike', kwargs['location']))
-        if kwargs.get('is_offered'):
-            domain.append(('is_offered', '=', True))
-        if kwargs.get('is_wanted'):
-            domain.append(('is_wanted', '=', True))
-
-        domain.append(('is_public', '=', True))
-        domain.append(('user_id', '!=', request.env.user.id))
-
-        skills = request.env['user.skill'].search(domain, limit=50)
-
-        result = []
-        for skill in skills:
-            result.append({
-                'id': skill.id,
-                'skill_name': skill.skill_name,
-                'user_name': skill.user_id.name,
-                'user_id': skill.user_id.id,
-                'category': skill.category_id.name,
-                'skill_level': skill.skill_level,
-                'location': skill.location,
-                'availability': skill.availability,
-                'description': skill.description,
-                'is_offered': skill.is_offered,
-                'is_wanted': skill.is_wanted
-            })
+        """API endpoint to search skills
 
-        return {'skills': result}
+        Results are paginated with the opaque ``next_cursor`` token: pass it
+        back as ``cursor`` to get the next page. ``total`` is only computed
+        when ``with_count`` is set. ``near`` and ``radius_km`` limit the
+        results to the skills around a place, ``sort='distance'`` returns the
+        nearest first.
+        """
+        limit = min(int(kwargs.get('limit') or 50), MAX_PAGE_SIZE)
+        try:
+            radius_km = float(kwargs['radius_km']) if kwargs.get('radius_km') else None
+        except (TypeError, ValueError):
+            return {'error': 'Invalid radius'}
+        try:
+            page = request.env['user.skill'].search_skills_page(
+                cursor=kwargs.get('cursor'),
+                limit=limit,
+                with_count=bool(kwargs.get('with_count')),
+                skill_name=kwargs.get('skill_name'),
+                category_id=kwargs.get('category_id'),
+                location=kwargs.get('location'),
+                is_offered=kwargs.get('is_offered'),
+                is_wanted=kwargs.get('is_wanted'),
+                exclude_user_id=request.env.user.id,
+                mode=kwargs.get('search_mode') or 'substring',
+                sort=kwargs.get('sort') if kwargs.get('sort') in ('reputation', 'distance') else None,
+                near=kwargs.get('near'),
+                radius_km=radius_km,
+            )
+        except ValueError:
+            return {'error': 'Invalid cursor'}
+        result = {
+            'skills': SKILL_SERIALIZER.serialize(page['records'], kwargs.get('fields')),
+            'next_cursor': page['next_cursor'],
+        }
+        if page['total'] is not None:
+            result['total'] = page['total']
+        return result
+
+    @http.route('/skill_swap/api/matches', type='json', auth='user', methods=['POST'])
+    @instrument
+    def get_matches(self, limit=10, fields=None):
+        """Top reciprocal swap matches of the current user"""
+        matches = MATCH_SERIALIZER.search(
+            request.env['swap.match'], [('user_id', '=', request.env.user.id)], fields,
+            limit=min(int(limit or 10), MAX_PAGE_SIZE),
+        )
+        return {'matches': matches}
 
     @http.route('/skill_swap/api/request/create', type='json', auth='user', methods=['POST'])
+    @instrument
     def create_swap_request(self, **kwargs):
         """API endpoint to create swap request"""
+        retry_after = request.env['skill.swap.rate.limit']._check_request_creation(request.httprequest.remote_addr)
+        if retry_after:
+            # JSON-RPC replies are always 200, the client gets the delay in the header and the payload
+            request.future_response.headers['Retry-After'] = str(retry_after)
+            return {'error': 'Too many requests, please retry later.', 'retry_after': retry_after}
         try:
             # Validate required fields
             required_fields = ['provider_skill_id', 'requester_skill_id']
@@ -61,8 +128,8 @@ class SkillSwapController(http.Controller):
             if not provider_skill or not requester_skill:
                 return {'error': 'Invalid skill IDs'}
 
-            # Create swap request
-            swap_request = request.env['swap.request'].create({
+            # Create swap request, unless the same one is already open
+            swap_request, created = request.env['swap.request']._create_or_get_open({
                 'requester_id': request.env.user.id,
                 'provider_id': provider_skill.user_id.id,
                 'requester_skill_id': requester_skill.id,
@@ -72,69 +139,264 @@ class SkillSwapController(http.Controller):
                 'estimated_duration': kwargs.get('estimated_duration', 1.0),
             })
 
-            # Send notification email
-            template = request.env.ref('skill_swap_platform.email_template_swap_request')
-            if template:
-                template.send_mail(swap_request.id, force_send=True)
+            if not created:
+                return {
+                    'error': 'You already have a pending or accepted request for this skill swap.',
+                    'request_id': swap_request.id or None,
+                }
+
+            # Queue notification email
+            swap_request._queue_mail('skill_swap_platform.email_template_swap_request')
 
             return {'success': True, 'request_id': swap_request.id}
 
         except Exception as e:
             return {'error': str(e)}
 
-    @http.route('/skill_swap/api/categories', type='json', auth='user', methods=['GET'])
-    def get_categories(self):
+    def _my_swap_request(self, request_id):
+        """The swap request ``request_id`` if the current user takes part in it."""
+        swap_request = request.env['swap.request'].browse(int(request_id)).exists()
+        if request.env.user not in swap_request.requester_id | swap_request.provider_id:
+            return request.env['swap.request']
+        return swap_request
+
+    @http.route('/skill_swap/api/request/<int:request_id>/slots', type='json', auth='user', methods=['POST'])
+    @instrument
+    def suggest_slots(self, request_id, count=5, duration=None, days=14):
+        """Next free sessions for both participants of a swap request"""
+        swap_request = self._my_swap_request(request_id)
+        if not swap_request:
+            return {'error': 'Swap request not found'}
+        try:
+            slots = swap_request.suggest_slots(
+                count=min(int(count or 5), MAX_SLOTS),
+                duration=float(duration) if duration else None,
+                days=min(int(days or 14), MAX_SLOT_DAYS),
+            )
+        except (TypeError, ValueError):
+            return {'error': 'Invalid parameters'}
+        return {'slots': [
+            {'start': fields.Datetime.to_string(start), 'stop': fields.Datetime.to_string(stop)}
+            for start, stop in slots
+        ]}
+
+    @http.route('/skill_swap/api/request/<int:request_id>/schedule', type='json', auth='user', methods=['POST'])
+    @instrument
+    def schedule_swap_request(self, request_id, scheduled_date=None, estimated_duration=None):
+        """Schedule the session of a swap request, refused if it overlaps another one"""
+        swap_request = self._my_swap_request(request_id)
+        if not swap_request:
+            return {'error': 'Swap request not found'}
+        try:
+            vals = {'scheduled_date': fields.Datetime.to_datetime(scheduled_date)}
+            if estimated_duration:
+                vals['estimated_duration'] = float(estimated_duration)
+        except (TypeError, ValueError):
+            return {'error': 'Invalid date or duration'}
+        if not vals['scheduled_date']:
+            return {'error': 'Missing required field: scheduled_date'}
+        try:
+            with request.env.cr.savepoint():
+                swap_request.write(vals)
+        except ValidationError as e:
+            return {'error': str(e)}
+        return {'success': True, 'request_id': swap_request.id}
+
+    def _cached_json_response(self, model_names, build, per_user=True, **params):
+        """Serve a read-mostly JSON payload with ETag revalidation.
+
+        The ETag is derived from the cache generation of ``model_names`` and
+        of the users and partners (see skill.swap.cache.mixin), the request
+        parameters, the current ``CACHE_MAX_AGE`` time bucket, which bounds
+        the life of time-dependent values such as ``is_expired``, and, for
+        per-user payloads, the user. A matching ``If-None-Match`` gets a
+        body-less 304; otherwise the serialized body is taken from the
+        in-process LRU or built with ``build(env)``.
+
+        The generations are not transactional: ``build`` gets an environment
+        on a new cursor, whose snapshot is taken after they are read, so a
+        body is never older than its ETag. The request transaction is left
+        untouched.
+        """
+        model_names = list(model_names) + ['res.users', 'res.partner']
+        generations = request.env['skill.swap.cache.mixin']._cache_generations(model_names)
+        key = (
+            request.env.cr.dbname, request.httprequest.path, request.env.lang,
+            request.env.uid if per_user else None, tuple(generations), int(time.time() // CACHE_MAX_AGE),
+            tuple(sorted(params.items())),
+        )
+        etag = hashlib.sha1(repr(key).encode()).hexdigest()
+        headers = [('ETag', '"%s"' % etag), ('Cache-Control', 'private, no-cache')]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        body = _BODY_CACHE.get(etag)
+        if body is None:
+            with request.env.registry.cursor() as cr:
+                body = json.dumps(build(request.env(cr=cr)))
+            _BODY_CACHE.set(etag, body)
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json')])
+
+    @http.route('/skill_swap/api/categories', type='http', auth='user', methods=['GET'])
+    @instrument
+    def get_categories(self, fields=None):
         """Get all skill categories"""
-        categories = request.env['skill.category'].search([('active', '=', True)])
-        result = []
-        for category in categories:
-            result.append({
-                'id': category.id,
-                'name': category.name,
-                'description': category.description,
-                'skill_count': category.skill_count
-            })
-        return {'categories': result}
+        def build(env):
+            categories = CATEGORY_SERIALIZER.search(env['skill.category'], [('active', '=', True)], fields)
+            return {'categories': categories}
+        return self._cached_json_response(['skill.category', 'user.skill'], build, per_user=False, fields=fields)
 
-    @http.route('/skill_swap/api/my_skills', type='json', auth='user', methods=['GET'])
-    def get_my_skills(self):
+    @http.route('/skill_swap/api/my_skills', type='http', auth='user', methods=['GET'])
+    @instrument
+    def get_my_skills(self, fields=None):
         """Get current user's skills"""
-        skills = request.env['user.skill'].search([('user_id', '=', request.env.user.id)])
-        result = []
-        for skill in skills:
-            result.append({
-                'id': skill.id,
-                'skill_name': skill.skill_name,
-                'category': skill.category_id.name,
-                'skill_level': skill.skill_level,
-                'is_offered': skill.is_offered,
-                'is_wanted': skill.is_wanted,
-                'availability': skill.availability,
-                'location': skill.location,
-                'is_public': skill.is_public
-            })
-        return {'skills': result}
-
-    @http.route('/skill_swap/api/my_requests', type='json', auth='user', methods=['GET'])
-    def get_my_requests(self):
-        """Get current user's swap requests"""
-        requests = request.env['swap.request'].search([
-            '|', ('requester_id', '=', request.env.user.id),
-            ('provider_id', '=', request.env.user.id)
+        def build(env):
+            skills = MY_SKILL_SERIALIZER.search(
+                env['user.skill'], [('user_id', '=', env.user.id)], fields)
+            return {'skills': skills}
+        return self._cached_json_response(['user.skill', 'skill.category'], build, fields=fields)
+
+    @http.route('/skill_swap/api/my_requests', type='http', auth='user', methods=['GET'])
+    @instrument
+    def get_my_requests(self, fields=None, state=None, expired=None, box='all', cursor=None, limit=None):
+        """Get current user's swap requests, newest first
+
+        ``box`` selects the ``sent`` or ``received`` requests, ``state`` and
+        ``expired`` filter them. Pages are chained with ``next_cursor``.
+        """
+        box = box or 'all'
+        if box not in INBOX_BOXES:
+            return request.make_response('Invalid box', status=400)
+        try:
+            limit = max(1, min(int(limit or 50), MAX_PAGE_SIZE))
+        except ValueError:
+            return request.make_response('Invalid limit', status=400)
+        if cursor:
+            try:
+                create_date, _last_id = decode_cursor(cursor)
+                fields.Datetime.to_datetime(create_date)
+            except (ValueError, TypeError):
+                return request.make_response('Invalid cursor', status=400)
+
+        def build(env):
+            records, next_cursor = env['swap.request']._inbox(
+                box=box,
+                states=state.split(',') if state else None,
+                expired=expired in ('1', 'true') if expired in ('1', 'true', '0', 'false') else None,
+                limit=limit,
+                cursor=cursor,
+            )
+            return {'requests': REQUEST_SERIALIZER.serialize(records, fields), 'next_cursor': next_cursor}
+        return self._cached_json_response(['swap.request', 'user.skill'], build, fields=fields, state=state,
+                                          expired=expired, box=box, cursor=cursor, limit=limit)
+
+    @http.route('/skill_swap/api/leaderboard', type='http', auth='user', methods=['GET'])
+    @instrument
+    def get_leaderboard(self, cursor=None, limit=None, fields=None):
+        """Users ranked by reputation, paginated with the ``next_cursor`` token"""
+        try:
+            limit = max(1, min(int(limit or 20), MAX_PAGE_SIZE))
+        except ValueError:
+            return request.make_response('Invalid limit', status=400)
+        if cursor:
+            try:
+                score, _last_id = decode_cursor(cursor)
+            except ValueError:
+                score = None
+            if not isinstance(score, (int, float)) or isinstance(score, bool):
+                return request.make_response('Invalid cursor', status=400)
+
+        def build(env):
+            reputations, next_cursor = env['swap.user.reputation'].get_leaderboard(limit, cursor)
+            return {
+                'users': REPUTATION_SERIALIZER.serialize(reputations, fields),
+                'next_cursor': next_cursor,
+            }
+        return self._cached_json_response(['swap.user.reputation', 'swap.request'], build, per_user=False,
+                                          cursor=cursor, limit=limit, fields=fields)
+
+    @http.route('/skill_swap/notifications', type='http', auth='user', methods=['GET'])
+    @instrument
+    def get_notifications(self, after=None):
+        """Notification feed of the current user.
+
+        Returns the events after the ``after`` cursor and the new cursor,
+        without waiting: live events are pushed on the bus, this feed lets a
+        client catch up on what it missed. Without ``after`` only the current
+        cursor is returned, so opening a page does not replay old events.
+        """
+        Event = request.env['swap.notification.event']
+        try:
+            after = int(after) if after else None
+        except ValueError:
+            return request.make_response('Invalid parameters', status=400)
+
+        if after is None:
+            events, cursor = [], Event._last_id()
+        else:
+            events = Event._feed(after)
+            cursor = events[-1]['id'] if events else after
+        body = json.dumps({'notifications': events, 'cursor': cursor})
+        return request.make_response(body, headers=[
+            ('Content-Type', 'application/json'), ('Cache-Control', 'no-store'),
         ])
 
-        result = []
-        for req in requests:
-            result.append({
-                'id': req.id,
-                'name': req.name,
-                'requester_name': req.requester_id.name,
-                'provider_name': req.provider_id.name,
-                'requester_skill': req.requester_skill_id.skill_name,
-                'provider_skill': req.provider_skill_id.skill_name,
-                'state': req.state,
-                'requested_date': req.requested_date.isoformat() if req.requested_date else None,
-                'message': req.message,
-                'is_requester': req.requester_id.id == request.env.user.id
-            })
-        return {'requests': result}
\ No newline at end of file
+    @http.route('/skill_swap/api/dashboard', type='http', auth='user', methods=['GET'])
+    @instrument
+    def get_dashboard(self):
+        """Admin dashboard statistics, computed at most once per ``DASHBOARD_TTL`` per worker"""
+        if not request.env.user.has_group('skill_swap_platform.group_skill_swap_manager'):
+            return request.make_response('Forbidden', status=403)
+        key = (request.env.cr.dbname, request.env.lang)
+        expiry, body = _DASHBOARD_CACHE.get(key, (0, None))
+        if expiry <= time.monotonic():
+            body = json.dumps(request.env['swap.report'].get_dashboard(), default=str)
+            _DASHBOARD_CACHE[key] = (time.monotonic() + DASHBOARD_TTL, body)
+        return request.make_response(body, headers=[
+            ('Content-Type', 'application/json'), ('Cache-Control', 'private, max-age=%d' % DASHBOARD_TTL),
+        ])
+
+    @http.route('/skill_swap/report/export', type='http', auth='user', methods=['GET'])
+    @instrument
+    def export_swap_report(self, format='csv', state=None, date_from=None, date_to=None,
+                           skill_category=None):
+        """Stream the swap report as CSV or XLSX, with the report filters"""
+        Report = request.env['swap.report']
+        try:
+            filters = {
+                'state': state if state in dict(Report._fields['state'].selection) else None,
+                'date_from': fields.Date.to_date(date_from),
+                'date_to': fields.Date.to_date(date_to),
+                'skill_category': skill_category,
+            }
+        except ValueError:
+            return request.make_response('Invalid date', status=400)
+        if format == 'xlsx':
+            try:
+                chunks = Report._export_xlsx_chunks(filters)
+            except ImportError as e:
+                return request.make_response(str(e), status=501)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        else:
+            format = 'csv'
+            chunks = Report._export_csv_chunks(filters)
+            content_type = 'text/csv; charset=utf-8'
+        return request.make_response(chunks, headers=[
+            ('Content-Type', content_type),
+            ('Content-Disposition', 'attachment; filename="swap_report.%s"' % format),
+        ])
+
+    @http.route('/skill_swap/metrics', type='http', auth='public', methods=['GET'], csrf=False)
+    def get_metrics(self):
+        """Route metrics of all the workers, in the Prometheus text format.
+
+        Open to skill swap managers, or to scrapers sending the
+        ``skill_swap.metrics_token`` parameter as a bearer token.
+        """
+        token = request.env['ir.config_parameter'].sudo().get_param('skill_swap.metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not (request.env.user.has_group('skill_swap_platform.group_skill_swap_manager')
+                or (token and hmac.compare_digest(authorization, 'Bearer %s' % token))):
+            return request.make_response('Forbidden', status=403)
+        return request.make_response(render_metrics(), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'), ('Cache-Control', 'no-store'),
+        ])
@@ -1,24 +1,55 @@
 from odoo import http, fields
 from odoo.http import request
-from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
+from odoo.addons.portal.controllers.portal import CustomerPortal
 from odoo.exceptions import AccessError, MissingError
 from collections import OrderedDict
 from operator import itemgetter
+from urllib.parse import urlencode
+
+from ..tools import fragment_cache
+from ..tools.metrics import instrument
 
 
 class SkillSwapPortal(CustomerPortal):
 
     def _prepare_home_portal_values(self, counters):
         values = super()._prepare_home_portal_values(counters)
+        if 'skill_count' in counters:
+            values['skill_count'] = request.env.user.skill_total_count
         if 'skill_request_count' in counters:
-            values['skill_request_count'] = request.env['swap.request'].search_count([
-                '|', ('requester_id', '=', request.env.user.id),
-                ('provider_id', '=', request.env.user.id)
+            values['skill_request_count'] = request.env.user.swap_request_count
+        if 'skill_request_to_answer_count' in counters:
+            values['skill_request_to_answer_count'] = request.env['swap.request']._inbox_count(
+                'received', states=['pending'], expired=False)
+        if 'skill_match_count' in counters:
+            values['skill_match_count'] = request.env['swap.match'].search_count([
+                ('user_id', '=', request.env.user.id)
             ])
         return values
 
-    @http.route(['/my/skills', '/my/skills/page/<int:page>'], type='http', auth="user", website=True)
-    def portal_my_skills(self, page=1, date_begin=None, date_end=None, sortby=None, **kw):
+    def _keyset_page_values(self, model, domain, order, url, cursor=None, url_args=None):
+        """Fetch a keyset-paginated portal page and the links to move through it."""
+        return self._cursor_page_values(
+            lambda cursor: model._keyset_search(domain, order=order, limit=self._items_per_page, cursor=cursor),
+            url, cursor=cursor, url_args=url_args,
+        )
+
+    def _cursor_page_values(self, fetch, url, cursor=None, url_args=None):
+        """Fetch a page with ``fetch(cursor)``, restarting from the first one on an invalid cursor."""
+        try:
+            records, next_cursor = fetch(cursor)
+        except ValueError:
+            records, next_cursor = fetch(None)
+            cursor = None
+        url_args = {key: value for key, value in (url_args or {}).items() if value}
+        return records, {
+            'first_url': cursor and '%s?%s' % (url, urlencode(url_args)),
+            'next_url': next_cursor and '%s?%s' % (url, urlencode(dict(url_args, cursor=next_cursor))),
+        }
+
+    @http.route(['/my/skills'], type='http', auth="user", website=True)
+    @instrument
+    def portal_my_skills(self, cursor=None, date_begin=None, date_end=None, sortby=None, **kw):
         values = self._prepare_portal_layout_values()
         SkillSwap = request.env['user.skill']
 
@@ -34,21 +65,12 @@ class SkillSwapPortal(CustomerPortal):
             sortby = 'date'
         order = searchbar_sortings[sortby]['order']
 
-        # Count for pager
-        skill_count = SkillSwap.search_count(domain)
-
-        # Pager
-        pager = portal_pager(
-            url="/my/skills",
+        # Content
+        skills, page_links = self._keyset_page_values(
+            SkillSwap, domain, order, "/my/skills", cursor=cursor,
             url_args={'date_begin': date_begin, 'date_end': date_end, 'sortby': sortby},
-            total=skill_count,
-            page=page,
-            step=self._items_per_page
         )
 
-        # Content
-        skills = SkillSwap.search(domain, order=order, limit=self._items_per_page, offset=pager['offset'])
-
         values.update({
             'date': date_begin,
             'date_end': date_end,
@@ -56,43 +78,63 @@ class SkillSwapPortal(CustomerPortal):
             'page_name': 'skill',
             'archive_groups': [],
             'default_url': '/my/skills',
-            'pager': pager,
             'searchbar_sortings': searchbar_sortings,
-            'sortby': sortby
+            'sortby': sortby,
+            **page_links,
         })
         return request.render("skill_swap_platform.portal_my_skills", values)
 
-    @http.route(['/my/skill_requests', '/my/skill_requests/page/<int:page>'], type='http', auth="user", website=True)
-    def portal_my_skill_requests(self, page=1, date_begin=None, date_end=None, sortby=None, **kw):
+    @http.route(['/my/skill_requests'], type='http', auth="user", website=True)
+    @instrument
+    def portal_my_skill_requests(self, cursor=None, date_begin=None, date_end=None, sortby=None, filterby=None,
+                                 box=None, **kw):
         values = self._prepare_portal_layout_values()
         SwapRequest = request.env['swap.request']
 
-        domain = ['|', ('requester_id', '=', request.env.user.id), ('provider_id', '=', request.env.user.id)]
-
         searchbar_sortings = {
             'date': {'label': 'Newest', 'order': 'create_date desc'},
             'name': {'label': 'Reference', 'order': 'name'},
             'state': {'label': 'Status', 'order': 'state'},
         }
+        # 'inbox' holds the same filter as 'domain', in the terms of swap.request._inbox
+        searchbar_filters = {
+            'all': {'label': 'All', 'domain': [], 'inbox': {}},
+            'pending': {'label': 'Pending', 'domain': [('state', '=', 'pending'), ('is_expired', '=', False)],
+                        'inbox': {'states': ['pending'], 'expired': False}},
+            'open': {'label': 'Open', 'domain': [('state', 'in', ['pending', 'accepted'])],
+                     'inbox': {'states': ['pending', 'accepted']}},
+            'completed': {'label': 'Completed', 'domain': [('state', '=', 'completed')],
+                          'inbox': {'states': ['completed']}},
+            'expired': {'label': 'Expired', 'domain': [('is_expired', '=', True)], 'inbox': {'expired': True}},
+        }
+        searchbar_boxes = {
+            'all': {'label': 'All', 'domain': ['|', ('requester_id', '=', request.env.user.id),
+                                               ('provider_id', '=', request.env.user.id)]},
+            'sent': {'label': 'Sent', 'domain': [('requester_id', '=', request.env.user.id)]},
+            'received': {'label': 'Received', 'domain': [('provider_id', '=', request.env.user.id)]},
+        }
 
         if not sortby:
             sortby = 'date'
         order = searchbar_sortings[sortby]['order']
-
-        # Count for pager
-        request_count = SwapRequest.search_count(domain)
-
-        # Pager
-        pager = portal_pager(
-            url="/my/skill_requests",
-            url_args={'date_begin': date_begin, 'date_end': date_end, 'sortby': sortby},
-            total=request_count,
-            page=page,
-            step=self._items_per_page
-        )
-
-        # Content
-        requests = SwapRequest.search(domain, order=order, limit=self._items_per_page, offset=pager['offset'])
+        if filterby not in searchbar_filters:
+            filterby = 'all'
+        if box not in searchbar_boxes:
+            box = 'all'
+        url_args = {'date_begin': date_begin, 'date_end': date_end, 'sortby': sortby, 'filterby': filterby,
+                    'box': box}
+
+        # Content: the newest first order is served by the inbox query
+        if sortby == 'date':
+            requests, page_links = self._cursor_page_values(
+                lambda cursor: SwapRequest._inbox(box=box, limit=self._items_per_page, cursor=cursor,
+                                                  **searchbar_filters[filterby]['inbox']),
+                "/my/skill_requests", cursor=cursor, url_args=url_args,
+            )
+        else:
+            domain = searchbar_boxes[box]['domain'] + searchbar_filters[filterby]['domain']
+            requests, page_links = self._keyset_page_values(
+                SwapRequest, domain, order, "/my/skill_requests", cursor=cursor, url_args=url_args)
 
         values.update({
             'date': date_begin,
@@ -101,13 +143,31 @@ class SkillSwapPortal(CustomerPortal):
             'page_name': 'skill_request',
             'archive_groups': [],
             'default_url': '/my/skill_requests',
-            'pager': pager,
             'searchbar_sortings': searchbar_sortings,
-            'sortby': sortby
+            'sortby': sortby,
+            'searchbar_filters': searchbar_filters,
+            'filterby': filterby,
+            'box_urls': OrderedDict(
+                (key, ('/my/skill_requests?%s' % urlencode(dict(url_args, box=key)), item['label']))
+                for key, item in searchbar_boxes.items()
+            ),
+            'box': box,
+            **page_links,
         })
         return request.render("skill_swap_platform.portal_my_skill_requests", values)
 
+    @http.route(['/my/matches'], type='http', auth="user", website=True)
+    @instrument
+    def portal_my_matches(self, **kw):
+        values = self._prepare_portal_layout_values()
+        values.update({
+            'matches': request.env['swap.match'].get_top_matches(limit=self._items_per_page),
+            'page_name': 'skill_match',
+        })
+        return request.render("skill_swap_platform.portal_my_matches", values)
+
     @http.route(['/my/skill_requests/<int:request_id>'], type='http', auth="user", website=True)
+    @instrument
     def portal_skill_request_detail(self, request_id, access_token=None, **kw):
         try:
             request_sudo = self._document_check_access('swap.request', request_id, access_token)
@@ -121,34 +181,74 @@ class SkillSwapPortal(CustomerPortal):
         return request.render("skill_swap_platform.portal_skill_request_detail", values)
 
     @http.route('/skills/browse', type='http', auth="user", website=True)
+    @instrument
     def browse_skills(self, **kw):
         """Browse public skills"""
-        domain = [('is_public', '=', True), ('user_id', '!=', request.env.user.id)]
-
-        # Apply filters
-        if kw.get('category_id'):
-            domain.append(('category_id', '=', int(kw['category_id'])))
-        if kw.get('skill_name'):
-            domain.append(('skill_name', 'ilike', kw['skill_name']))
-        if kw.get('location'):
-            domain.append(('location', 'ilike', kw['location']))
-        if kw.get('is_offered'):
-            domain.append(('is_offered', '=', True))
-        if kw.get('is_wanted'):
-            domain.append(('is_wanted', '=', True))
-
-        skills = request.env['user.skill'].search(domain, limit=50)
+        near = (kw.get('near') or '').strip()
+        sort = kw.get('sort') if kw.get('sort') in ('reputation', 'distance') else None
+        try:
+            radius_km = float(kw['radius_km']) if kw.get('radius_km') else None
+        except ValueError:
+            radius_km = None
+        search_kwargs = dict(
+            skill_name=kw.get('skill_name'),
+            category_id=kw.get('category_id'),
+            location=kw.get('location'),
+            is_offered=kw.get('is_offered') or kw.get('skill_type') == 'offered',
+            is_wanted=kw.get('is_wanted') or kw.get('skill_type') == 'wanted',
+            exclude_user_id=request.env.user.id,
+            mode=kw.get('search_mode') or 'substring',
+            sort=sort if near or sort != 'distance' else None,
+            near=near or None,
+            radius_km=radius_km,
+        )
+        UserSkill = request.env['user.skill']
+        try:
+            page = UserSkill.search_skills_page(cursor=kw.get('cursor'), limit=50, **search_kwargs)
+        except ValueError:
+            page = UserSkill.search_skills_page(limit=50, **search_kwargs)
+        skills = page['records']
+        filters = {key: value for key, value in kw.items() if key != 'cursor' and value}
         categories = request.env['skill.category'].search([('active', '=', True)])
+        selected_category_id = kw.get('category_id') or ''
+        reputations = self._user_reputations(skills.user_id)
 
         values = {
             'skills': skills,
+            'skill_cards': [
+                self._render_skill_fragment('skill_swap_platform.skill_card', skill, reputations)
+                for skill in skills
+            ],
             'categories': categories,
+            'category_options': fragment_cache.render(
+                request.env, 'skill_swap_platform.category_options',
+                {'categories': categories, 'selected_category_id': selected_category_id},
+                (selected_category_id,), (categories,)),
             'search_filters': kw,
             'page_name': 'browse_skills',
+            'first_url': kw.get('cursor') and '/skills/browse?%s' % urlencode(filters),
+            'next_url': page['next_cursor'] and '/skills/browse?%s' % urlencode(
+                dict(filters, cursor=page['next_cursor'])),
         }
         return request.render("skill_swap_platform.browse_skills", values)
 
+    def _user_reputations(self, users):
+        Reputation = request.env['swap.user.reputation']
+        return {reputation.user_id.id: reputation for reputation in Reputation.search([('user_id', 'in', users.ids)])}
+
+    def _skill_fragment_records(self, skill, reputation):
+        # the owner's name is stored on its partner, which a profile edit writes alone
+        return skill, skill.user_id, skill.user_id.partner_id, skill.category_id, reputation
+
+    def _render_skill_fragment(self, template, skill, reputations):
+        reputation = reputations.get(skill.user_id.id, request.env['swap.user.reputation'])
+        # the completed swaps are a counter of the owner, updated without its write_date
+        return fragment_cache.render(request.env, template, {'skill': skill, 'reputation': reputation},
+                                     (skill.user_id.swap_completed_count,),
+                                     self._skill_fragment_records(skill, reputation))
+
     @http.route('/skill/<int:skill_id>', type='http', auth="user", website=True)
+    @instrument
     def skill_detail(self, skill_id, **kw):
         """Skill detail page"""
         skill = request.env['user.skill'].browse(skill_id)
@@ -163,19 +263,29 @@ class SkillSwapPortal(CustomerPortal):
 
         values = {
             'skill': skill,
+            'skill_body': self._render_skill_fragment('skill_swap_platform.skill_detail_body', skill,
+                                                      self._user_reputations(skill.user_id)),
             'my_skills': my_skills,
             'page_name': 'skill_detail',
         }
         return request.render("skill_swap_platform.skill_detail", values)
 
     @http.route('/skill_request/create', type='http', auth="user", website=True, methods=['POST'])
+    @instrument
     def create_skill_request(self, **kw):
         """Create a new skill swap request"""
+        retry_after = request.env['skill.swap.rate.limit']._check_request_creation(request.httprequest.remote_addr)
+        if retry_after:
+            return request.make_response(
+                'Too many requests, please retry later.',
+                headers=[('Retry-After', str(retry_after)), ('Content-Type', 'text/plain; charset=utf-8')],
+                status=429,
+            )
         try:
             provider_skill = request.env['user.skill'].browse(int(kw['provider_skill_id']))
             requester_skill = request.env['user.skill'].browse(int(kw['requester_skill_id']))
 
-            swap_request = request.env['swap.request'].create({
+            swap_request, created = request.env['swap.request']._create_or_get_open({
                 'requester_id': request.env.user.id,
                 'provider_id': provider_skill.user_id.id,
                 'requester_skill_id': requester_skill.id,
@@ -185,10 +295,14 @@ class SkillSwapPortal(CustomerPortal):
                 'estimated_duration': float(kw.get('estimated_duration', 1.0)),
             })
 
-            # Send notification email
-            template = request.env.ref('skill_swap_platform.email_template_swap_request')
-            if template:
-                template.send_mail(swap_request.id, force_send=True)
+            if not created:
+                # already open: show the existing request instead of a duplicate
+                if swap_request:
+                    return request.redirect('/my/skill_requests/%s' % swap_request.id)
+                return request.redirect('/my/skill_requests')
+
+            # Queue notification email
+            swap_request._queue_mail('skill_swap_platform.email_template_swap_request')
 
             return request.redirect('/my/skill_requests')
 
@@ -0,0 +1,140 @@
+"""Projection-based serializers for the JSON controllers.
+
+Each serializer maps the keys of the JSON payload to the model field they
+come from. Records are loaded with a single ``read``/``search_read`` on
+exactly the fields needed for the requested keys; many2one values come back
+as ``(id, display_name)`` pairs, which the ORM resolves with one query per
+related model whatever the number of records.
+"""
+
+
+def _identity(value, env):
+    return value
+
+
+def _many2one_id(value, env):
+    return value[0] if value else None
+
+
+def _many2one_name(value, env):
+    return value[1] if value else None
+
+
+def _isoformat(value, env):
+    return value.isoformat() if value else None
+
+
+def _is_current_user(value, env):
+    return bool(value) and value[0] == env.uid
+
+
+class Serializer:
+
+    def __init__(self, spec):
+        # {output key: (field name, converter)}
+        self.spec = {
+            key: (source, converter or _identity)
+            for key, (source, converter) in spec.items()
+        }
+
+    def keys(self, fields=None):
+        """Return the requested output keys, ``id`` is always included."""
+        if not fields:
+            return list(self.spec)
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        wanted = {name.strip() for name in fields}
+        return [key for key in self.spec if key == 'id' or key in wanted]
+
+    def field_names(self, keys):
+        return list({self.spec[key][0] for key in keys})
+
+    def _convert(self, rows, keys, env):
+        return [
+            {key: self.spec[key][1](row[self.spec[key][0]], env) for key in keys}
+            for row in rows
+        ]
+
+    def serialize(self, records, fields=None):
+        """Serialize an already searched recordset."""
+        keys = self.keys(fields)
+        return self._convert(records.read(self.field_names(keys)), keys, records.env)
+
+    def search(self, model, domain, fields=None, **kwargs):
+        """Search and serialize in one go through ``search_read``."""
+        keys = self.keys(fields)
+        rows = model.search_read(domain, self.field_names(keys), **kwargs)
+        return self._convert(rows, keys, model.env)
+
+
+SKILL_SPEC = {
+    'id': ('id', None),
+    'skill_name': ('skill_name', None),
+    'user_name': ('user_id', _many2one_name),
+    'user_id': ('user_id', _many2one_id),
+    'category': ('category_id', _many2one_name),
+    'skill_level': ('skill_level', None),
+    'location': ('location', None),
+    'availability': ('availability', None),
+    'description': ('description', None),
+    'is_offered': ('is_offered', None),
+    'is_wanted': ('is_wanted', None),
+    'is_public': ('is_public', None),
+    'reputation_score': ('user_reputation_score', None),
+}
+
+SKILL_SERIALIZER = Serializer({key: value for key, value in SKILL_SPEC.items() if key != 'is_public'})
+
+MY_SKILL_SERIALIZER = Serializer({
+    key: SKILL_SPEC[key] for key in (
+        'id', 'skill_name', 'category', 'skill_level', 'is_offered', 'is_wanted',
+        'availability', 'location', 'is_public',
+    )
+})
+
+CATEGORY_SERIALIZER = Serializer({
+    'id': ('id', None),
+    'name': ('name', None),
+    'description': ('description', None),
+    'skill_count': ('skill_count', None),
+})
+
+REQUEST_SERIALIZER = Serializer({
+    'id': ('id', None),
+    'name': ('name', None),
+    'requester_name': ('requester_id', _many2one_name),
+    'provider_name': ('provider_id', _many2one_name),
+    'requester_skill': ('requester_skill_id', _many2one_name),
+    'provider_skill': ('provider_skill_id', _many2one_name),
+    'state': ('state', None),
+    'is_expired': ('is_expired', None),
+    'requested_date': ('requested_date', _isoformat),
+    'message': ('message', None),
+    'is_requester': ('requester_id', _is_current_user),
+})
+
+MATCH_SERIALIZER = Serializer({
+    'id': ('id', None),
+    'partner_id': ('partner_id', _many2one_id),
+    'partner_name': ('partner_id', _many2one_name),
+    'score': ('score', None),
+    'offered_skill_id': ('offered_skill_id', _many2one_id),
+    'offered_skill': ('offered_skill_id', _many2one_name),
+    'wanted_skill_id': ('wanted_skill_id', _many2one_id),
+    'wanted_skill': ('wanted_skill_id', _many2one_name),
+})
+
+REPUTATION_SERIALIZER = Serializer({
+    'id': ('id', None),
+    'user_id': ('user_id', _many2one_id),
+    'user_name': ('user_id', _many2one_name),
+    'rating_count': ('rating_count', None),
+    'rating_avg': ('rating_avg', None),
+    'reputation_score': ('reputation_score', None),
+    'completed_swap_count': ('completed_swap_count', None),
+    'rating_1_count': ('rating_1_count', None),
+    'rating_2_count': ('rating_2_count', None),
+    'rating_3_count': ('rating_3_count', None),
+    'rating_4_count': ('rating_4_count', None),
+    'rating_5_count': ('rating_5_count', None),
+})
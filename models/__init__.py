@@ -1,4 +1,17 @@
+from . import bulk_import
+from . import cache_mixin
+from . import counter_mixin
+from . import keyset_mixin
+from . import mail_outbox
+from . import notification_event
+from . import rate_limit
+from . import res_partner
+from . import res_users
+from . import skill_canonical
 from . import skill_category
+from . import swap_booking
+from . import swap_match
 from . import swap_rating
 from . import swap_request
-from . import user_skill
\ No newline at end of file
+from . import user_reputation
+from . import user_skill
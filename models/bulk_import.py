@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+import logging
+from itertools import islice
+
+import psycopg2
+
+from odoo import models, api, _
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+MAX_CACHED_USERS = 50000
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x', 't'}
+
+# Context used for imported records: no chatter message, follower, tracking or feed event per row
+IMPORT_CONTEXT = {
+    'tracking_disable': True,
+    'mail_create_nolog': True,
+    'mail_create_nosubscribe': True,
+    'mail_notrack': True,
+    'skill_swap_no_notify': True,
+}
+
+
+def iter_rows(stream, file_format):
+    """Yield ``(line number, row dict)`` from a binary CSV or JSONL stream."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if file_format == 'csv' else None)
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+    elif file_format == 'jsonl':
+        for line_num, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, e
+                continue
+            yield line_num, row if isinstance(row, dict) else ValueError("Expected a JSON object")
+    else:
+        raise UserError(_("Unsupported file format: %s") % file_format)
+
+
+def parse_bool(value, default=False):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+class SkillSwapBulkImport(models.AbstractModel):
+    """Streaming import of user skills and swap requests.
+
+    Rows are read lazily and handled ``chunk_size`` at a time: each chunk is
+    validated, its references resolved with one query per related model and
+    written with a single multi-create, so memory does not grow with the
+    file. Target models implement ``_import_prepare_chunk``.
+    """
+    _name = 'skill.swap.bulk.import'
+    _description = 'Skill Swap Bulk Import'
+
+    @api.model
+    def import_stream(self, model_name, stream, file_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+        """Import ``stream`` into ``model_name``.
+
+        Returns a dict with the number of created records, the number of
+        rejected rows and the first rejected rows as ``(line, message)``.
+        """
+        Model = self.env[model_name].with_context(**IMPORT_CONTEXT)
+        result = {'created': 0, 'error_count': 0, 'errors': []}
+        lookups = {}
+        rows = iter_rows(stream, file_format)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            valid = []
+            for line, row in chunk:
+                if isinstance(row, Exception):
+                    self._import_error(result, line, str(row))
+                else:
+                    valid.append((line, row))
+            prepared, errors = Model._import_prepare_chunk(valid, lookups)
+            for line, message in errors:
+                self._import_error(result, line, message)
+            result['created'] += self._import_create(Model, prepared, result)
+            # drop the created records from the cache, it would otherwise grow with the file
+            self.env.flush_all()
+            self.env.invalidate_all()
+        _logger.info("Imported %s %s record(s), %s row(s) rejected",
+                     result['created'], model_name, result['error_count'])
+        return result
+
+    @api.model
+    def _import_error(self, result, line, message):
+        result['error_count'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append((line, message))
+
+    @api.model
+    def _import_create(self, Model, prepared, result):
+        """Create the prepared ``(line, vals)`` in one batch, isolating bad rows on failure."""
+        if not prepared:
+            return 0
+        try:
+            with self.env.cr.savepoint():
+                Model.create([vals for _line, vals in prepared])
+            return len(prepared)
+        except (ValidationError, UserError, psycopg2.Error):
+            pass
+        created = 0
+        for line, vals in prepared:
+            try:
+                with self.env.cr.savepoint():
+                    Model.create(vals)
+                created += 1
+            except (ValidationError, UserError, psycopg2.Error) as e:
+                self._import_error(result, line, str(e))
+        return created
+
+    @api.model
+    def _import_resolve_users(self, keys, lookups):
+        """Map logins/emails to user ids with one query for the unknown ones."""
+        cache = lookups.setdefault('users', {})
+        if len(cache) > MAX_CACHED_USERS:
+            # keep memory bounded on files touching many distinct users
+            cache.clear()
+        missing = list({key for key in keys if key and key not in cache})
+        if missing:
+            users = self.env['res.users'].with_context(active_test=False).search_read(
+                ['|', ('login', 'in', missing), ('email', 'in', missing)], ['login', 'email'])
+            for user in users:
+                cache[user['login']] = user['id']
+                if user['email']:
+                    cache.setdefault(user['email'], user['id'])
+            # also remember misses, the next chunks will not look them up again
+            for key in missing:
+                cache.setdefault(key, False)
+        return cache
+
+    @api.model
+    def _import_resolve_categories(self, lookups):
+        if 'categories' not in lookups:
+            categories = self.env['skill.category'].with_context(active_test=False).search_read([], ['name'])
+            lookups['categories'] = {category['name'].strip().casefold(): category['id'] for category in categories}
+        return lookups['categories']
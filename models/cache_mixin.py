@@ -0,0 +1,64 @@
+from odoo import models, api
+
+from ..tools.fragment_cache import notify_changes
+
+
+class CacheGenerationMixin(models.AbstractModel):
+    """Expose a cheap version stamp of a model for HTTP caching.
+
+    Every model inheriting this mixin owns a Postgres sequence that is bumped
+    after each transaction that created, modified or deleted one of its
+    records. Reading the stamp is a single catalog lookup, whatever the size
+    of the table.
+    """
+    _name = 'skill.swap.cache.mixin'
+    _description = 'Cache Generation Mixin'
+
+    # whether portal fragments are rendered from these records, see tools/fragment_cache
+    _fragment_cache = False
+
+    def _cache_sequence(self):
+        return 'skill_swap_cache_%s' % self._table
+
+    def init(self):
+        super().init()
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS %s" % self._cache_sequence())
+
+    def _bump_cache_generation(self):
+        # bump after commit, so that a reader never sees the new stamp with the old data
+        pending = self.env.cr.postcommit.data.setdefault('skill_swap.cache_sequences', set())
+        if not pending:
+            registry = self.env.registry
+
+            @self.env.cr.postcommit.add
+            def bump():
+                with registry.cursor() as cr:
+                    cr.execute("SELECT %s" % ', '.join("nextval('%s')" % name for name in sorted(pending)))
+                pending.clear()
+        pending.add(self._cache_sequence())
+
+    @api.model
+    def _cache_generations(self, model_names):
+        """Return the current stamp of each given model, in order."""
+        sequences = [self.env[name]._cache_sequence() for name in model_names]
+        self.env.cr.execute("SELECT %s" % ', '.join("(SELECT last_value FROM %s)" % seq for seq in sequences))
+        return self.env.cr.fetchone()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._bump_cache_generation()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._bump_cache_generation()
+        if self._fragment_cache:
+            notify_changes(self)
+        return res
+
+    def unlink(self):
+        self._bump_cache_generation()
+        if self._fragment_cache:
+            notify_changes(self)
+        return super().unlink()
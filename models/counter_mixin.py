@@ -0,0 +1,104 @@
+import logging
+from collections import Counter, defaultdict
+
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+
+class CounterMixin(models.AbstractModel):
+    """Keep denormalized counters on related records up to date.
+
+    Models list the counters each of their records adds one to in
+    ``_counter_contributions``. Creating, writing or deleting records applies
+    the difference to the target columns with a single relative UPDATE per
+    counter, in the same transaction, so the counters can be read directly
+    instead of being recomputed with a ``search_count``.
+    """
+    _name = 'skill.swap.counter.mixin'
+    _description = 'Denormalized Counter Mixin'
+
+    # Fields whose change can move a record from one counter to another
+    _counter_trigger_fields = set()
+
+    def init(self):
+        super().init()
+        if self._counter_trigger_fields:
+            self.pool.post_init(self._counter_repair)
+
+    def _counter_contributions(self):
+        """Return the ``(model name, counter field, record id)`` each record adds one to."""
+        return []
+
+    def _counter_expected_sql(self):
+        """Return ``(model name, counter field, query)`` triples, the query
+        yielding the expected ``(id, cnt)`` rows, used to repair counters."""
+        return []
+
+    def _counter_snapshot(self):
+        return Counter(key for key in self._counter_contributions() if key[2])
+
+    @api.model
+    def _counter_apply(self, delta):
+        updates = defaultdict(dict)
+        for (model_name, field_name, res_id), value in delta.items():
+            if value:
+                updates[(model_name, field_name)][res_id] = value
+        for (model_name, field_name), values in updates.items():
+            model = self.env[model_name]
+            self.env.cr.execute("""
+                UPDATE {table} t SET {field} = COALESCE(t.{field}, 0) + d.delta
+                  FROM unnest(%s::int[], %s::int[]) AS d(id, delta)
+                 WHERE t.id = d.id
+            """.format(table=model._table, field=field_name), (list(values), list(values.values())))
+            model.browse(list(values)).invalidate_recordset([field_name])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._counter_apply(records._counter_snapshot())
+        return records
+
+    def write(self, vals):
+        if not self._counter_trigger_fields.intersection(vals):
+            return super().write(vals)
+        before = self._counter_snapshot()
+        res = super().write(vals)
+        delta = self._counter_snapshot()
+        delta.subtract(before)
+        self._counter_apply(delta)
+        return res
+
+    def unlink(self):
+        before = self._counter_snapshot()
+        res = super().unlink()
+        self._counter_apply(Counter({key: -value for key, value in before.items()}))
+        return res
+
+    @api.model
+    def _counter_repair(self):
+        """Recompute the counters maintained by this model, return the number of fixed rows."""
+        self.flush_model()
+        fixed = 0
+        for model_name, field_name, expected in self._counter_expected_sql():
+            model = self.env[model_name]
+            self.env.cr.execute("""
+                UPDATE {table} t SET {field} = COALESCE(e.cnt, 0)
+                  FROM {table} t2
+             LEFT JOIN ({expected}) e ON e.id = t2.id
+                 WHERE t.id = t2.id AND t.{field} IS DISTINCT FROM COALESCE(e.cnt, 0)
+            """.format(table=model._table, field=field_name, expected=expected))
+            if self.env.cr.rowcount:
+                _logger.warning("Repaired %s %s.%s counter(s)", self.env.cr.rowcount, model_name, field_name)
+            fixed += self.env.cr.rowcount
+            model.invalidate_model([field_name])
+        return fixed
+
+    @api.model
+    def _cron_repair_counters(self):
+        mixin = self.env.registry['skill.swap.counter.mixin']
+        fixed = 0
+        for model_name, model_class in self.env.registry.items():
+            if not model_class._abstract and issubclass(model_class, mixin):
+                fixed += self.env[model_name]._counter_repair()
+        return fixed
@@ -0,0 +1,51 @@
+from odoo import models, api
+from odoo.tools import SQL
+
+from ..tools.keyset import encode_cursor, decode_cursor
+
+
+class KeysetMixin(models.AbstractModel):
+    _name = 'skill.swap.keyset.mixin'
+    _description = 'Keyset Pagination Mixin'
+
+    @api.model
+    def _keyset_fetch(self, query, sort_key, descending=False, limit=20, cursor=None):
+        """Fetch one page of ``query`` ordered by ``(sort_key, id)``.
+
+        ``cursor`` is the token returned for the previous page. Rows are found
+        with a row comparison on the sort key instead of an OFFSET, so every
+        page costs the same. Returns the records and the token of the next
+        page (``None`` on the last page).
+        """
+        id_sql = SQL.identifier(query.table, 'id')
+        direction = SQL('DESC') if descending else SQL('ASC')
+        if cursor:
+            key_value, last_id = decode_cursor(cursor)
+            operator = SQL('<') if descending else SQL('>')
+            query.add_where(SQL("(%s, %s) %s (%s, %s)", sort_key, id_sql, operator, key_value, last_id))
+        query.order = SQL("%s %s, %s %s", sort_key, direction, id_sql, direction)
+        query.offset = None
+        query.limit = limit + 1
+
+        self.flush_model()
+        self.env.cr.execute(query.select(id_sql, sort_key))
+        rows = self.env.cr.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][1], rows[-1][0]])
+        return self.browse([row[0] for row in rows]), next_cursor
+
+    @api.model
+    def _keyset_search(self, domain, order='id', limit=20, cursor=None):
+        """Keyset counterpart of ``search``.
+
+        ``order`` names a single stored column, optionally followed by
+        ``desc``; the record id is always used as the tie-breaker.
+        """
+        field_name, _sep, direction = order.strip().partition(' ')
+        if not self._fields[field_name].store:
+            raise ValueError("Cannot paginate on non-stored field %s" % field_name)
+        query = self._search(domain)
+        sort_key = SQL.identifier(query.table, field_name)
+        return self._keyset_fetch(query, sort_key, direction.strip().lower() == 'desc', limit, cursor)
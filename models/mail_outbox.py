@@ -0,0 +1,209 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 60  # seconds, doubled after every failed attempt
+MAX_RETRY_DELAY = 6 * 3600
+RENDER_FIELDS = ('subject', 'body_html', 'email_from', 'email_to', 'email_cc', 'reply_to')
+
+
+class SwapMailOutbox(models.Model):
+    _name = 'swap.mail.outbox'
+    _description = 'Skill Swap Mail Outbox'
+    _order = 'id desc'
+    _rec_name = 'template_id'
+
+    template_id = fields.Many2one('mail.template', string='Template', required=True, ondelete='cascade')
+    res_id = fields.Integer(string='Record ID', required=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+    ], string='Status', default='queued', required=True)
+    attempt_count = fields.Integer(string='Attempts', default=0)
+    next_attempt_date = fields.Datetime(string='Next Attempt', default=fields.Datetime.now)
+    sent_date = fields.Datetime(string='Sent Date')
+    last_error = fields.Text(string='Last Error')
+
+    def init(self):
+        tools.create_index(self.env.cr, 'swap_mail_outbox_queue_index', self._table,
+                           ['next_attempt_date', 'id'], where="state = 'queued'")
+
+    @api.model
+    def enqueue(self, template, res_ids):
+        """Queue ``template`` for the given records and wake the sender up.
+
+        Rendering and SMTP both happen later in the sender cron, so callers
+        only pay for the insert.
+        """
+        if not template or not res_ids:
+            return self.browse()
+        mails = self.sudo().create([{'template_id': template.id, 'res_id': res_id} for res_id in res_ids])
+        self.env.ref('skill_swap_platform.ir_cron_process_mail_outbox').sudo()._trigger()
+        return mails
+
+    def action_requeue(self):
+        self.write({
+            'state': 'queued',
+            'attempt_count': 0,
+            'next_attempt_date': fields.Datetime.now(),
+            'last_error': False,
+        })
+        return True
+
+    @api.model
+    def _cron_process_outbox(self, batch_size=None):
+        """Send due messages in batches, each batch over a single SMTP connection."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        batch_size = batch_size or int(ICP.get_param('skill_swap.outbox_batch_size', DEFAULT_BATCH_SIZE))
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        processed = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM swap_mail_outbox
+                 WHERE state = 'queued' AND next_attempt_date <= %s
+              ORDER BY next_attempt_date, id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, (fields.Datetime.now(), batch_size))
+            batch = self.browse([row[0] for row in self.env.cr.fetchall()])
+            if not batch:
+                break
+            batch._send_batch()
+            processed += len(batch)
+            if not auto_commit:
+                break
+            self.env.cr.commit()
+        if processed:
+            _logger.info("Skill swap outbox: processed %s message(s)", processed)
+        return processed
+
+    def _smtp_connect(self):
+        """Open the SMTP session shared by a batch.
+
+        ``skill_swap.outbox_smtp_host``/``skill_swap.outbox_smtp_port`` point
+        the sender at a specific server, e.g. a local SMTP stub, otherwise the
+        regular outgoing mail server is used.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        IrMailServer = self.env['ir.mail_server'].sudo()
+        host = ICP.get_param('skill_swap.outbox_smtp_host')
+        if host:
+            port = int(ICP.get_param('skill_swap.outbox_smtp_port', 25))
+            return IrMailServer.connect(host=host, port=port, encryption='none')
+        return IrMailServer.connect()
+
+    def _render_mails(self, template, res_ids):
+        """Render ``template`` for ``res_ids``, each in the language of its recipient.
+
+        Returns ``{res_id: {field: value}}``, or the render error of the
+        records that failed. The records are rendered together, once per
+        language and field; when that fails, they are rendered one by one so
+        that the error only reaches the failing ones.
+        """
+        try:
+            with self.env.cr.savepoint():
+                per_lang = defaultdict(list)
+                for res_id, lang in template._render_lang(res_ids).items():
+                    per_lang[lang].append(res_id)
+                values = {}
+                for lang, lang_res_ids in per_lang.items():
+                    lang_template = template.with_context(lang=lang) if lang else template
+                    rendered = {field: lang_template._render_field(field, lang_res_ids) for field in RENDER_FIELDS}
+                    for res_id in lang_res_ids:
+                        values[res_id] = {field: rendered[field].get(res_id) for field in RENDER_FIELDS}
+                return values
+        except Exception as e:
+            if len(res_ids) == 1:
+                return {res_ids[0]: e}
+        values = {}
+        for res_id in res_ids:
+            values.update(self._render_mails(template, [res_id]))
+        return values
+
+    def _prepare_messages(self):
+        """Render the queued templates, see ``_render_mails``.
+
+        Returns the built messages and the ``(error, retry)`` of the mails
+        that could not be built, by mail id.
+        """
+        IrMailServer = self.env['ir.mail_server'].sudo()
+        messages = {}
+        failures = {}
+        for template in self.template_id:
+            mails = self.filtered(lambda mail: mail.template_id == template)
+            rendered = self._render_mails(template, list(set(mails.mapped('res_id'))))
+            for mail in mails:
+                values = rendered[mail.res_id]
+                if isinstance(values, Exception):
+                    _logger.warning("Skill swap outbox: cannot render mail %s: %s", mail.id, values)
+                    failures[mail.id] = (str(values), True)
+                    continue
+                email_to = tools.email_split_and_format(values['email_to'] or '')
+                if not email_to:
+                    failures[mail.id] = ("No recipient", False)
+                    continue
+                try:
+                    messages[mail.id] = IrMailServer.build_email(
+                        email_from=values['email_from'] or IrMailServer._get_default_from_address(),
+                        email_to=email_to,
+                        subject=values['subject'] or '',
+                        body=values['body_html'] or '',
+                        email_cc=tools.email_split_and_format(values['email_cc'] or ''),
+                        reply_to=values['reply_to'],
+                        subtype='html',
+                    )
+                except Exception as e:
+                    failures[mail.id] = (str(e), True)
+        return messages, failures
+
+    def _send_batch(self):
+        try:
+            messages, failures = self._prepare_messages()
+            smtp_session = self._smtp_connect()
+        except Exception as e:
+            _logger.warning("Skill swap outbox: cannot send batch: %s", e)
+            self._mark_failed(str(e))
+            return
+
+        IrMailServer = self.env['ir.mail_server'].sudo()
+        try:
+            for mail in self:
+                if mail.id in failures:
+                    mail._mark_failed(*failures[mail.id])
+                    continue
+                try:
+                    IrMailServer.send_email(messages[mail.id], smtp_session=smtp_session)
+                except Exception as e:
+                    mail._mark_failed(str(e))
+                else:
+                    mail.write({'state': 'sent', 'sent_date': fields.Datetime.now(), 'last_error': False})
+        finally:
+            try:
+                smtp_session.quit()
+            except Exception:
+                pass
+
+    def _mark_failed(self, error, retry=True):
+        """Schedule another attempt with exponential backoff, or dead-letter."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_attempts = int(ICP.get_param('skill_swap.outbox_max_attempts', DEFAULT_MAX_ATTEMPTS))
+        now = fields.Datetime.now()
+        for mail in self:
+            attempts = mail.attempt_count + 1
+            if not retry or attempts >= max_attempts:
+                mail.write({'state': 'dead', 'attempt_count': attempts, 'last_error': error})
+                continue
+            delay = min(DEFAULT_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            mail.write({
+                'attempt_count': attempts,
+                'next_attempt_date': now + timedelta(seconds=delay),
+                'last_error': error,
+            })
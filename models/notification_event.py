@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+MAX_FEED_EVENTS = 100
+EVENT_RETENTION_DAYS = 30
+
+
+class SwapNotificationEvent(models.Model):
+    """Notification feed of the skill swap users.
+
+    Events are appended when a request changes state or a rating is left.
+    The event id is the feed cursor: clients ask for the events after the
+    last id they have seen. Events are pushed live on the bus, whose
+    websocket worker holds the idle connections; the feed only serves the
+    catch-up reads of the clients that were offline.
+    """
+    _name = 'swap.notification.event'
+    _description = 'Skill Swap Notification Event'
+    _order = 'id'
+    _log_access = False
+
+    user_id = fields.Many2one('res.users', string='Recipient', required=True, ondelete='cascade')
+    event_type = fields.Selection([
+        ('request', 'Swap Request'),
+        ('rating', 'Rating'),
+    ], string='Type', required=True)
+    request_id = fields.Many2one('swap.request', string='Swap Request', ondelete='cascade')
+    rating_id = fields.Many2one('swap.rating', string='Rating', ondelete='cascade')
+    title = fields.Char(string='Title', required=True)
+    message = fields.Char(string='Message')
+    date = fields.Datetime(string='Date', default=fields.Datetime.now)
+
+    def init(self):
+        tools.create_index(self.env.cr, 'swap_notification_event_user_id_index', self._table, ['user_id', 'id'])
+
+    @api.model
+    def _fanout(self, vals_list):
+        """Append the given events and wake up their recipients."""
+        vals_list = [vals for vals in vals_list if vals.get('user_id')]
+        if not vals_list:
+            return self.browse()
+        events = self.sudo().create(vals_list)
+        self.env['bus.bus'].sudo()._sendmany([
+            (event.user_id.partner_id, 'skill_swap/notification', event._feed_values()) for event in events
+        ])
+        return events
+
+    def _feed_values(self):
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'title': self.title,
+            'message': self.message or '',
+            'request_id': self.request_id.id or None,
+            'date': self.date.isoformat() if self.date else None,
+        }
+
+    @api.model
+    def _feed(self, after=0, limit=MAX_FEED_EVENTS):
+        """Return the current user's events after the ``after`` cursor, oldest first."""
+        events = self.sudo().search([('user_id', '=', self.env.uid), ('id', '>', after)], limit=limit)
+        return [event._feed_values() for event in events]
+
+    @api.model
+    def _last_id(self):
+        self.env.cr.execute("SELECT MAX(id) FROM swap_notification_event WHERE user_id = %s", (self.env.uid,))
+        return self.env.cr.fetchone()[0] or 0
+
+    @api.model
+    def _cron_gc_events(self):
+        self.env.cr.execute("DELETE FROM swap_notification_event WHERE date < %s",
+                            (fields.Datetime.now() - timedelta(days=EVENT_RETENTION_DAYS),))
+        return self.env.cr.rowcount
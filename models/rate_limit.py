@@ -0,0 +1,115 @@
+import logging
+import math
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Default bucket size and refill rate (tokens per minute) of each scope
+DEFAULT_LIMITS = {
+    'user': (10, 5.0),
+    'ip': (30, 20.0),
+}
+
+# Refill the bucket for the time elapsed since the last call, then take a token if there is one
+REFILLED = """LEAST(%(burst)s, b.tokens + %(rate)s *
+                 EXTRACT(EPOCH FROM (statement_timestamp() AT TIME ZONE 'UTC') - b.last_refill))"""
+REFILL_SQL = """
+    INSERT INTO skill_swap_rate_limit AS b (key, tokens, allowed, last_refill)
+    VALUES (%(key)s, %(burst)s - 1, true, statement_timestamp() AT TIME ZONE 'UTC')
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = {refilled} - CASE WHEN {refilled} >= 1 THEN 1 ELSE 0 END,
+        allowed = {refilled} >= 1,
+        last_refill = statement_timestamp() AT TIME ZONE 'UTC'
+    RETURNING tokens, allowed
+""".format(refilled=REFILLED)
+# Give back the token taken from a bucket when another bucket refused the call
+REFUND_SQL = """
+    UPDATE skill_swap_rate_limit
+       SET tokens = LEAST(%(burst)s, tokens + 1), allowed = false
+     WHERE key = %(key)s
+"""
+
+
+class SkillSwapRateLimit(models.Model):
+    """Token buckets limiting the request-creation endpoints.
+
+    One row per bucket, shared by all workers. A bucket holds up to ``burst``
+    tokens and regains ``per_minute`` tokens a minute; each admitted call
+    takes one. Limits are read from the ``skill_swap.rate_limit_<scope>_burst``
+    and ``skill_swap.rate_limit_<scope>_per_minute`` parameters.
+    """
+    _name = 'skill.swap.rate.limit'
+    _description = 'Skill Swap Rate Limit Bucket'
+    _rec_name = 'key'
+
+    key = fields.Char(string='Key', required=True, readonly=True)
+    tokens = fields.Float(string='Tokens', readonly=True)
+    allowed = fields.Boolean(string='Last Call Allowed', readonly=True)
+    last_refill = fields.Datetime(string='Last Refill', readonly=True)
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', 'A rate limit bucket key must be unique.'),
+    ]
+
+    @api.model
+    def _get_limits(self, scope):
+        ICP = self.env['ir.config_parameter'].sudo()
+        burst, per_minute = DEFAULT_LIMITS[scope]
+        burst = float(ICP.get_param('skill_swap.rate_limit_%s_burst' % scope, burst))
+        per_minute = float(ICP.get_param('skill_swap.rate_limit_%s_per_minute' % scope, per_minute))
+        return burst, per_minute
+
+    @api.model
+    def _consume(self, keys):
+        """Take one token from each ``(scope, key)`` bucket, or from none.
+
+        Returns 0 when the call is admitted, otherwise the number of seconds
+        to wait before retrying. Buckets are updated with an atomic upsert on
+        a cursor of their own, committed right away, so concurrent workers
+        never lose an update and no row lock outlives the call. When one
+        bucket refuses the call, the tokens taken from the others are given
+        back in the same transaction, so a refused call costs nothing.
+        """
+        retry_after = 0
+        taken = []
+        with self.env.registry.cursor() as cr:
+            for scope, key in keys:
+                burst, per_minute = self._get_limits(scope)
+                if burst <= 0 or per_minute <= 0:
+                    continue
+                rate = per_minute / 60.0
+                params = {'key': '%s:%s' % (scope, key), 'burst': burst, 'rate': rate}
+                cr.execute(REFILL_SQL, params)
+                tokens, allowed = cr.fetchone()
+                if allowed:
+                    taken.append(params)
+                else:
+                    retry_after = max(retry_after, math.ceil((1 - tokens) / rate))
+            if retry_after:
+                for params in taken:
+                    cr.execute(REFUND_SQL, params)
+        return retry_after
+
+    @api.model
+    def _check_request_creation(self, remote_addr):
+        """Rate limit a swap request creation by the current user from ``remote_addr``."""
+        keys = [('user', self.env.uid)]
+        if remote_addr:
+            keys.append(('ip', remote_addr))
+        retry_after = self._consume(keys)
+        if retry_after:
+            _logger.info("Rate limited swap request creation of user %s from %s, retry after %ss",
+                         self.env.uid, remote_addr, retry_after)
+        return retry_after
+
+    @api.model
+    def _cron_gc_buckets(self):
+        """Drop the buckets that have been full for a while, they are equivalent to no row."""
+        max_refill = max((burst / per_minute * 60 for burst, per_minute in
+                          (self._get_limits(scope) for scope in DEFAULT_LIMITS) if per_minute > 0), default=0)
+        self.env.cr.execute("""
+            DELETE FROM skill_swap_rate_limit
+             WHERE last_refill < (now() AT TIME ZONE 'UTC') - make_interval(secs => %s)
+        """, (max_refill,))
+        return self.env.cr.rowcount
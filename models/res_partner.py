@@ -0,0 +1,7 @@
+from odoo import models
+
+
+class ResPartner(models.Model):
+    _name = 'res.partner'
+    # the partners hold the names of the users embedded in the cached API payloads
+    _inherit = ['res.partner', 'skill.swap.cache.mixin']
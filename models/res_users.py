@@ -0,0 +1,32 @@
+from odoo import models, fields
+
+
+class ResUsers(models.Model):
+    _name = 'res.users'
+    # names and reputations of the users are embedded in the cached API payloads
+    _inherit = ['res.users', 'skill.swap.cache.mixin']
+
+    # Counters maintained by user.skill and swap.request (skill.swap.counter.mixin)
+    skill_offered_count = fields.Integer(string='Offered Skills', readonly=True, default=0)
+    skill_wanted_count = fields.Integer(string='Wanted Skills', readonly=True, default=0)
+    skill_total_count = fields.Integer(string='Skills', readonly=True, default=0)
+    swap_request_count = fields.Integer(string='Swap Requests', readonly=True, default=0)
+    swap_open_count = fields.Integer(string='Open Swap Requests', readonly=True, default=0)
+    swap_completed_count = fields.Integer(string='Completed Swaps', readonly=True, default=0)
+
+    # Read from the swap.user.reputation aggregates
+    swap_rating_count = fields.Integer(string='Ratings Received', compute='_compute_swap_reputation')
+    swap_rating_avg = fields.Float(string='Average Rating', compute='_compute_swap_reputation', digits=(3, 2))
+    swap_reputation_score = fields.Float(string='Reputation', compute='_compute_swap_reputation', digits=(3, 2))
+
+    def _compute_swap_reputation(self):
+        reputations = {
+            reputation.user_id.id: reputation
+            for reputation in self.env['swap.user.reputation'].sudo().search([('user_id', 'in', self.ids)])
+        }
+        _weight, prior_mean = self.env['swap.user.reputation']._prior()
+        for user in self:
+            reputation = reputations.get(user.id)
+            user.swap_rating_count = reputation.rating_count if reputation else 0
+            user.swap_rating_avg = reputation.rating_avg if reputation else 0.0
+            user.swap_reputation_score = reputation.reputation_score if reputation else prior_mean
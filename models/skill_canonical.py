@@ -0,0 +1,158 @@
+import logging
+import threading
+
+from odoo import models, fields, api, tools
+
+from ..tools.skills import normalize_skill_name
+
+_logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+class SkillCanonical(models.Model):
+    """One entry of the skill taxonomy.
+
+    Every user.skill is linked to the canonical skill of its normalized name,
+    or of the alias matching it, so "Python", "python " and "Python3" are
+    counted together. ``skill_count`` and ``request_count`` are maintained
+    incrementally by user.skill and swap.request through the counter mixin.
+    """
+    _name = 'skill.canonical'
+    _description = 'Canonical Skill'
+    _order = 'request_count desc, id'
+
+    name = fields.Char(string='Skill', required=True)
+    key = fields.Char(string='Key', required=True, readonly=True, index=True,
+                      help="Normalized name the skills are matched on")
+    alias_ids = fields.One2many('skill.alias', 'canonical_id', string='Aliases')
+    skill_count = fields.Integer(string='Skills', readonly=True, default=0)
+    request_count = fields.Integer(string='Swap Requests', readonly=True, default=0)
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', 'This skill already exists.'),
+    ]
+
+    def init(self):
+        super().init()
+        tools.create_index(self.env.cr, 'skill_canonical_request_count_index', self._table,
+                           ['request_count DESC', 'id'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            vals.setdefault('key', normalize_skill_name(vals.get('name')))
+        return super().create(vals_list)
+
+    @api.model
+    def _resolve(self, names):
+        """Map ``{skill key: skill name}`` to canonical skill ids.
+
+        Aliases win over canonical keys. Missing canonical skills are created,
+        named after the given skill name, with an upsert so that concurrent
+        transactions agree on a single entry.
+        """
+        names = {key: name for key, name in names.items() if key}
+        if not names:
+            return {}
+        cr = self.env.cr
+        self.env['skill.alias'].flush_model(['key', 'canonical_id'])
+        self.flush_model(['key'])
+        cr.execute("""
+            SELECT k.key, COALESCE(a.canonical_id, c.id)
+              FROM unnest(%s::varchar[]) AS k(key)
+         LEFT JOIN skill_alias a ON a.key = k.key
+         LEFT JOIN skill_canonical c ON c.key = k.key
+        """, (list(names),))
+        resolved = {key: canonical_id for key, canonical_id in cr.fetchall() if canonical_id}
+        missing = [key for key in names if key not in resolved]
+        if missing:
+            cr.execute("""
+                INSERT INTO skill_canonical (key, name, skill_count, request_count, create_uid, create_date,
+                                             write_uid, write_date)
+                SELECT k.key, k.name, 0, 0, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC'
+                  FROM unnest(%s::varchar[], %s::varchar[]) AS k(key, name)
+                    ON CONFLICT (key) DO NOTHING
+            """, (self.env.uid, self.env.uid, missing, [names[key].strip() for key in missing]))
+            cr.execute("SELECT key, id FROM skill_canonical WHERE key = ANY(%s)", (missing,))
+            resolved.update(cr.fetchall())
+        return resolved
+
+    @api.model
+    def get_top_skills(self, limit=10):
+        """Most requested skills, read from the request counter index."""
+        self.flush_model(['request_count'])
+        self.env.cr.execute("""
+            SELECT id, name, request_count FROM skill_canonical
+             WHERE request_count > 0
+          ORDER BY request_count DESC, id
+             LIMIT %s
+        """, (limit,))
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def _cron_backfill(self, batch_size=BACKFILL_BATCH_SIZE):
+        """Link the skills created before the taxonomy to their canonical skill.
+
+        Skills are handled in batches, each committed on its own. Returns the
+        number of linked skills.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        UserSkill = self.env['user.skill']
+        processed = 0
+        while True:
+            skills = UserSkill.search([('canonical_id', '=', False), ('skill_key', '!=', False)], limit=batch_size)
+            if not skills:
+                break
+            skills._assign_canonical()
+            processed += len(skills)
+            if not auto_commit:
+                break
+            self.env.cr.commit()
+            self.env.invalidate_all()
+        _logger.info("Skill taxonomy backfill: %s skill(s) linked", processed)
+        return processed
+
+
+class SkillAlias(models.Model):
+    """Alternative name of a canonical skill, such as "Python3" for "Python"."""
+    _name = 'skill.alias'
+    _description = 'Skill Alias'
+    _order = 'name'
+
+    name = fields.Char(string='Alias', required=True)
+    key = fields.Char(string='Key', compute='_compute_key', store=True, index=True)
+    canonical_id = fields.Many2one('skill.canonical', string='Canonical Skill', required=True, ondelete='cascade')
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', 'This alias is already used.'),
+    ]
+
+    @api.depends('name')
+    def _compute_key(self):
+        for alias in self:
+            alias.key = normalize_skill_name(alias.name)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        aliases = super().create(vals_list)
+        aliases._relink_skills(aliases.mapped('key'))
+        return aliases
+
+    def write(self, vals):
+        keys = self.mapped('key')
+        res = super().write(vals)
+        if 'name' in vals or 'canonical_id' in vals:
+            self._relink_skills(keys + self.mapped('key'))
+        return res
+
+    def unlink(self):
+        keys = self.mapped('key')
+        res = super().unlink()
+        self._relink_skills(keys)
+        return res
+
+    def _relink_skills(self, keys):
+        """Move the skills named after the given keys to their new canonical skill."""
+        skills = self.env['user.skill'].sudo().search([('skill_key', 'in', [key for key in keys if key])])
+        skills._assign_canonical()
@@ -3,6 +3,8 @@ from odoo import models, fields, api
 class SkillCategory(models.Model):
     _name = 'skill.category'
     _description = 'Skill Category'
+    _inherit = ['skill.swap.cache.mixin']
+    _fragment_cache = True
     _order = 'name'
 
     name = fields.Char(string='Category Name', required=True)
@@ -10,12 +12,14 @@ class SkillCategory(models.Model):
     color = fields.Char(string='Color', size=7, default='#FFFFFF')
     active = fields.Boolean(string='Active', default=True)
     skill_ids = fields.One2many('user.skill', 'category_id', string='Skills')
-    skill_count = fields.Integer(string='Skills Count', compute='_compute_skill_count')
+    # Maintained by user.skill (skill.swap.counter.mixin)
+    skill_count = fields.Integer(string='Skills Count', readonly=True, default=0)
 
-    @api.depends('skill_ids')
-    def _compute_skill_count(self):
-        for record in self:
-            record.skill_count = len(record.skill_ids)
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.env['swap.report']._refresh_categories(self.ids)
+        return res
 
     def name_get(self):
         result = []
@@ -0,0 +1,153 @@
+import logging
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import models, fields, api, exceptions, tools
+from odoo.tools import mute_logger
+
+from ..tools.pg import ensure_extension
+
+_logger = logging.getLogger(__name__)
+
+BOOKING_EXCLUSION = 'swap_booking_no_overlap'
+# Requests whose scheduled session holds the time of both participants
+BOOKED_STATES = ('accepted',)
+DEFAULT_DURATION_HOURS = 1.0
+
+
+class SwapBooking(models.Model):
+    """Time held by the scheduled sessions, one row per participant.
+
+    Rows mirror the ``scheduled_date`` and ``estimated_duration`` of the
+    accepted swap requests and are maintained by swap.request. ``period`` is
+    a generated ``tsrange`` column under a GiST exclusion constraint on
+    ``(user_id, period)``: Postgres itself refuses a double booking, and the
+    same index serves the overlap checks and the busy periods read by the
+    slot suggestions. Without the btree_gist extension, the constraint is
+    replaced by plain GiST and btree indexes and the check of ``_sync`` is
+    the only guard.
+    """
+    _name = 'swap.booking'
+    _description = 'Skill Swap Booking'
+    _order = 'date_start'
+    _log_access = False
+
+    request_id = fields.Many2one('swap.request', string='Swap Request', required=True, ondelete='cascade',
+                                 index=True)
+    user_id = fields.Many2one('res.users', string='User', required=True, ondelete='cascade')
+    date_start = fields.Datetime(string='Start', required=True)
+    date_stop = fields.Datetime(string='End', required=True)
+
+    _sql_constraints = [
+        ('dates_check', 'CHECK (date_stop > date_start)', 'A session must end after it starts.'),
+    ]
+
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        if not tools.column_exists(cr, self._table, 'period'):
+            cr.execute("""
+                ALTER TABLE swap_booking
+                 ADD COLUMN period tsrange GENERATED ALWAYS AS (tsrange(date_start, date_stop, '[)')) STORED
+            """)
+        if ensure_extension(cr, 'btree_gist'):
+            if not tools.constraint_definition(cr, self._table, BOOKING_EXCLUSION):
+                cr.execute("""
+                    ALTER TABLE swap_booking ADD CONSTRAINT %s
+                          EXCLUDE USING gist (user_id WITH =, period WITH &&)
+                """ % BOOKING_EXCLUSION)
+        else:
+            _logger.warning("btree_gist is missing, double bookings are only checked by the application.")
+            tools.create_index(cr, 'swap_booking_period_index', self._table, ['period'], method='gist')
+            tools.create_index(cr, 'swap_booking_user_id_index', self._table, ['user_id'])
+        cr.execute("SELECT NOT EXISTS (SELECT 1 FROM swap_booking)")
+        if cr.fetchone()[0]:
+            self.pool.post_init(self._backfill)
+
+    @api.model
+    def _backfill(self):
+        """Book the sessions of the requests accepted before bookings existed.
+
+        Historical sessions may overlap, the later ones are left unbooked.
+        """
+        self.env['swap.request'].flush_model(['state', 'scheduled_date', 'estimated_duration',
+                                              'requester_id', 'provider_id'])
+        self.env.cr.execute("""
+            INSERT INTO swap_booking (request_id, user_id, date_start, date_stop)
+            SELECT r.id, u.user_id, r.scheduled_date,
+                   r.scheduled_date + make_interval(secs => COALESCE(NULLIF(r.estimated_duration, 0), %s) * 3600)
+              FROM swap_request r
+        CROSS JOIN LATERAL (VALUES (r.requester_id), (r.provider_id)) AS u(user_id)
+             WHERE r.state IN %s AND r.scheduled_date IS NOT NULL
+          ORDER BY r.scheduled_date, r.id
+                ON CONFLICT DO NOTHING
+        """, (DEFAULT_DURATION_HOURS, BOOKED_STATES))
+        self.invalidate_model()
+
+    @api.model
+    def _session_rows(self, requests):
+        """``(request id, user id, start, stop)`` of the sessions the requests hold."""
+        rows = []
+        for record in requests:
+            if record.state in BOOKED_STATES and record.scheduled_date:
+                stop = record.scheduled_date + timedelta(hours=record.estimated_duration or DEFAULT_DURATION_HOURS)
+                rows += [(record.id, user.id, record.scheduled_date, stop)
+                         for user in (record.requester_id, record.provider_id)]
+        return rows
+
+    @api.model
+    def _sync(self, requests):
+        """Rebook the sessions of ``requests``, refusing any overlap.
+
+        Raises a ValidationError naming the conflicting request when one
+        participant is already booked at that time.
+        """
+        cr = self.env.cr
+        self.flush_model()
+        cr.execute("DELETE FROM swap_booking WHERE request_id = ANY(%s)", (requests.ids,))
+        self.invalidate_model()
+        rows = self._session_rows(requests)
+        if not rows:
+            return
+        columns = [list(column) for column in zip(*rows)]
+        cr.execute("""
+            SELECT n.request_id, n.user_id, b.request_id
+              FROM unnest(%s::int[], %s::int[], %s::timestamp[], %s::timestamp[])
+                   AS n(request_id, user_id, date_start, date_stop)
+              JOIN swap_booking b
+                ON b.user_id = n.user_id AND b.period && tsrange(n.date_start, n.date_stop, '[)')
+             LIMIT 1
+        """, columns)
+        conflict = cr.fetchone()
+        if conflict:
+            self._raise_conflict(*conflict)
+        try:
+            with cr.savepoint(flush=False), mute_logger('odoo.sql_db'):
+                cr.execute("""
+                    INSERT INTO swap_booking (request_id, user_id, date_start, date_stop)
+                    SELECT * FROM unnest(%s::int[], %s::int[], %s::timestamp[], %s::timestamp[])
+                """, columns)
+        except psycopg2.errors.ExclusionViolation:
+            # the requests overlap each other, or a session was booked since the check
+            raise exceptions.ValidationError("These sessions overlap another session of the same participant.")
+
+    def _raise_conflict(self, request_id, user_id, other_request_id):
+        Request = self.env['swap.request'].sudo()
+        raise exceptions.ValidationError("%s is already booked for %s at the time of %s." % (
+            self.env['res.users'].sudo().browse(user_id).name,
+            Request.browse(other_request_id).name,
+            Request.browse(request_id).name,
+        ))
+
+    @api.model
+    def _busy_periods(self, user_ids, start, stop, exclude_request_id=None):
+        """Booked ``(start, stop)`` periods of the users between two dates, sorted by start."""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT GREATEST(date_start, %s), LEAST(date_stop, %s)
+              FROM swap_booking
+             WHERE user_id = ANY(%s) AND period && tsrange(%s, %s, '[)') AND request_id IS DISTINCT FROM %s
+          ORDER BY date_start
+        """, (start, stop, list(user_ids), start, stop, exclude_request_id))
+        return self.env.cr.fetchall()
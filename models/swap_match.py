@@ -0,0 +1,172 @@
+import logging
+import threading
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+
+class SwapMatch(models.Model):
+    """Precomputed reciprocal swaps.
+
+    A row means the partner offers a skill the user wants *and* wants a skill
+    the user offers. ``score`` is the number of such skill pairs. Each user
+    keeps the rows of their own best ``_match_limit`` partners, so that the
+    matches of a user are a single index range.
+
+    A skill change recomputes the rows of its owner right away. Their
+    partners' rankings depend on it too: the owner is queued in
+    ``swap_match_dirty`` and the cron recomputes the partners later, so a
+    skill edit or an import chunk does not pay for them.
+    """
+    _name = 'swap.match'
+    _description = 'Reciprocal Skill Match'
+    _order = 'score desc, id'
+
+    user_id = fields.Many2one('res.users', string='User', required=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.users', string='Partner', required=True, ondelete='cascade')
+    offered_skill_id = fields.Many2one('user.skill', string='Skill You Offer', ondelete='cascade')
+    wanted_skill_id = fields.Many2one('user.skill', string='Skill You Want', ondelete='cascade')
+    score = fields.Integer(string='Score')
+
+    _sql_constraints = [
+        ('user_partner_uniq', 'unique(user_id, partner_id)', 'A partner can only be matched once per user.'),
+    ]
+
+    # Direct matches kept per user, popular skills would otherwise produce huge ranges
+    _match_limit = 200
+
+    def init(self):
+        cr = self.env.cr
+        tools.create_index(cr, 'swap_match_user_score_index', self._table, ['user_id', 'score DESC', 'id'])
+        tools.create_index(cr, 'swap_match_partner_index', self._table, ['partner_id'])
+        cr.execute("CREATE TABLE IF NOT EXISTS swap_match_dirty (user_id integer PRIMARY KEY)")
+        cr.execute("SELECT NOT EXISTS (SELECT 1 FROM swap_match)")
+        if cr.fetchone()[0]:
+            self.pool.post_init(self.rebuild)
+
+    @api.model
+    def _refresh_users(self, user_ids):
+        """Recompute the matches of the given users, queue those of their partners."""
+        user_ids = sorted({uid for uid in user_ids if uid})
+        if not user_ids:
+            return
+        self.env['user.skill'].flush_model()
+        self.flush_model()
+        self._compute_matches(user_ids)
+        self.env.cr.execute("""
+            INSERT INTO swap_match_dirty (user_id)
+            SELECT unnest(%s::int[])
+                ON CONFLICT DO NOTHING
+        """, (user_ids,))
+
+    @api.model
+    def _partners_of(self, user_ids):
+        """Users whose ranking depends on the given users: matched before or after their changes."""
+        self.env.cr.execute("""
+            SELECT user_id FROM swap_match WHERE partner_id = ANY(%(users)s)
+             UNION
+            (SELECT theirs.user_id
+               FROM user_skill mine
+               JOIN user_skill theirs ON theirs.skill_key = mine.skill_key
+                                     AND theirs.is_wanted AND theirs.is_public
+                                     AND theirs.user_id != mine.user_id
+              WHERE mine.user_id = ANY(%(users)s) AND mine.is_offered AND mine.is_public
+          INTERSECT
+             SELECT theirs.user_id
+               FROM user_skill mine
+               JOIN user_skill theirs ON theirs.skill_key = mine.skill_key
+                                     AND theirs.is_offered AND theirs.is_public
+                                     AND theirs.user_id != mine.user_id
+              WHERE mine.user_id = ANY(%(users)s) AND mine.is_wanted AND mine.is_public)
+        """, {'users': list(user_ids)})
+        return sorted({row[0] for row in self.env.cr.fetchall()})
+
+    @api.model
+    def _cron_refresh_partners(self, batch_size=1000):
+        """Recompute the partners of the queued users, ``batch_size`` queued users at a time.
+
+        Each batch is committed on its own. Returns the number of queued
+        users handled.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        cr = self.env.cr
+        processed = 0
+        while True:
+            cr.execute("""
+                SELECT user_id FROM swap_match_dirty ORDER BY user_id LIMIT %s FOR UPDATE SKIP LOCKED
+            """, (batch_size,))
+            user_ids = [row[0] for row in cr.fetchall()]
+            if not user_ids:
+                break
+            partner_ids = self._partners_of(user_ids)
+            for start in range(0, len(partner_ids), batch_size):
+                self._compute_matches(partner_ids[start:start + batch_size])
+            cr.execute("DELETE FROM swap_match_dirty WHERE user_id = ANY(%s)", (user_ids,))
+            processed += len(user_ids)
+            if not auto_commit:
+                break
+            cr.commit()
+        _logger.info("Skill matches: partners of %s user(s) recomputed", processed)
+        return processed
+
+    @api.model
+    def _compute_matches(self, user_ids):
+        """Replace the rows of exactly the given users by their best matches."""
+        cr = self.env.cr
+        cr.execute("DELETE FROM swap_match WHERE user_id = ANY(%s)", (user_ids,))
+        cr.execute("""
+            WITH gives AS (
+                -- skills the user offers that the partner wants
+                SELECT mine.user_id, theirs.user_id AS partner_id, mine.skill_key, mine.id AS skill_id
+                  FROM user_skill mine
+                  JOIN user_skill theirs ON theirs.skill_key = mine.skill_key
+                                        AND theirs.is_wanted AND theirs.is_public
+                                        AND theirs.user_id != mine.user_id
+                 WHERE mine.user_id = ANY(%(users)s) AND mine.is_offered AND mine.is_public
+            ), takes AS (
+                -- skills the partner offers that the user wants
+                SELECT mine.user_id, theirs.user_id AS partner_id, mine.skill_key, theirs.id AS skill_id
+                  FROM user_skill mine
+                  JOIN user_skill theirs ON theirs.skill_key = mine.skill_key
+                                        AND theirs.is_offered AND theirs.is_public
+                                        AND theirs.user_id != mine.user_id
+                 WHERE mine.user_id = ANY(%(users)s) AND mine.is_wanted AND mine.is_public
+            ), give_totals AS (
+                SELECT user_id, partner_id, COUNT(DISTINCT skill_key) AS cnt, MIN(skill_id) AS skill_id
+                  FROM gives GROUP BY user_id, partner_id
+            ), take_totals AS (
+                SELECT user_id, partner_id, COUNT(DISTINCT skill_key) AS cnt, MIN(skill_id) AS skill_id
+                  FROM takes GROUP BY user_id, partner_id
+            ), ranked AS (
+                SELECT g.user_id, g.partner_id, g.cnt * t.cnt AS score,
+                       g.skill_id AS offered_skill_id, t.skill_id AS wanted_skill_id,
+                       row_number() OVER (PARTITION BY g.user_id ORDER BY g.cnt * t.cnt DESC, g.partner_id) AS rank
+                  FROM give_totals g
+                  JOIN take_totals t ON t.user_id = g.user_id AND t.partner_id = g.partner_id
+            )
+            INSERT INTO swap_match (user_id, partner_id, score, offered_skill_id, wanted_skill_id,
+                                    create_uid, write_uid, create_date, write_date)
+            SELECT user_id, partner_id, score, offered_skill_id, wanted_skill_id,
+                   %(uid)s, %(uid)s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+              FROM ranked
+             WHERE rank <= %(limit)s
+        """, {'users': user_ids, 'limit': self._match_limit, 'uid': self.env.uid})
+        self.invalidate_model()
+
+    @api.model
+    def rebuild(self, batch_size=1000):
+        """Recompute every match, ``batch_size`` users at a time."""
+        self.env['user.skill'].flush_model()
+        self.env.cr.execute("TRUNCATE swap_match, swap_match_dirty")
+        self.env.cr.execute("SELECT DISTINCT user_id FROM user_skill WHERE is_public ORDER BY user_id")
+        user_ids = [row[0] for row in self.env.cr.fetchall()]
+        for start in range(0, len(user_ids), batch_size):
+            self._compute_matches(user_ids[start:start + batch_size])
+        _logger.info("Rebuilt skill matches for %s users", len(user_ids))
+        return True
+
+    @api.model
+    def get_top_matches(self, user_id=None, limit=10):
+        """Best reciprocal matches of a user, best first."""
+        return self.search([('user_id', '=', user_id or self.env.uid)], limit=limit)
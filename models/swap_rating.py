@@ -1,3 +1,5 @@
+from collections import Counter
+
 from odoo import models, fields, api, exceptions
 
 
@@ -9,7 +11,7 @@ class SwapRating(models.Model):
 
     name = fields.Char(string="Title", compute="_compute_name", store=True)
 
-    swap_request_id = fields.Many2one('swap.request', string='Swap Request', required=True, ondelete='cascade')
+    swap_request_id = fields.Many2one('swap.request', string='Swap Request', required=True, ondelete='cascade', index=True)
     rater_id = fields.Many2one('res.users', string='Rater', required=True, ondelete='cascade')
     rated_user_id = fields.Many2one('res.users', string='Rated User', required=True, ondelete='cascade')
 
@@ -53,10 +55,53 @@ class SwapRating(models.Model):
             if record.rater_id == record.rated_user_id:
                 raise exceptions.ValidationError("You cannot rate yourself!")
 
+    def _reputation_snapshot(self):
+        """Count the approved ratings per ``(rated user, value)``."""
+        return Counter(
+            (record.rated_user_id.id, record.rating_value)
+            for record in self if record.state == 'approved'
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['swap.report']._refresh_requests(records.swap_request_id.ids)
+        self.env['swap.user.reputation']._apply_ratings(records._reputation_snapshot())
+        if not self.env.context.get('skill_swap_no_notify'):
+            self.env['swap.notification.event']._fanout([{
+                'user_id': record.rated_user_id.id,
+                'event_type': 'rating',
+                'request_id': record.swap_request_id.id,
+                'rating_id': record.id,
+                'title': "New rating",
+                'message': "%s rated you %s/5" % (record.rater_id.name, record.rating),
+            } for record in records])
+        return records
+
+    def write(self, vals):
+        report_fields = self.env['swap.report']._report_rating_fields.intersection(vals)
+        request_ids = self.swap_request_id.ids if report_fields else []
+        reputation_fields = {'state', 'rating', 'rated_user_id'}.intersection(vals)
+        before = self._reputation_snapshot() if reputation_fields else None
+        res = super().write(vals)
+        if report_fields:
+            self.env['swap.report']._refresh_requests(request_ids + self.swap_request_id.ids)
+        if reputation_fields:
+            delta = self._reputation_snapshot()
+            delta.subtract(before)
+            self.env['swap.user.reputation']._apply_ratings(delta)
+        return res
+
+    def unlink(self):
+        request_ids = self.swap_request_id.ids
+        removed = Counter({key: -count for key, count in self._reputation_snapshot().items()})
+        res = super().unlink()
+        self.env['swap.report']._refresh_requests(request_ids)
+        self.env['swap.user.reputation']._apply_ratings(removed)
+        return res
+
     def action_approve(self):
-        for rec in self:
-            rec.state = 'approved'
+        self.write({'state': 'approved'})
 
     def action_reject(self):
-        for rec in self:
-            rec.state = 'rejected'
+        self.write({'state': 'rejected'})
@@ -1,13 +1,59 @@
-from odoo import models, fields, api, exceptions
+import logging
+import threading
+import time
+
+import psycopg2
+
+from odoo import models, fields, api, exceptions, tools, Command
+from odoo.tools import SQL, mute_logger, split_every
 from datetime import datetime, timedelta
 
+from .swap_booking import DEFAULT_DURATION_HOURS
+from ..tools.keyset import decode_cursor, encode_cursor
+from ..tools.schedule import availability_windows, ceil_datetime, first_slots, intersect, subtract
+from ..tools.skills import normalize_skill_name
+
+_logger = logging.getLogger(__name__)
+
+# Chatter messages created per batch by bulk transitions
+MESSAGE_BATCH_SIZE = 1000
+EXPIRY_BATCH_SIZE = 500
+
+# At most one open request per requester, provider and pair of skills
+OPEN_REQUEST_INDEX = 'swap_request_open_unique_index'
+OPEN_REQUEST_FIELDS = ['requester_id', 'provider_id', 'requester_skill_id', 'provider_skill_id']
+
+# Fields defining the session a request books, see swap.booking
+BOOKING_FIELDS = {'state', 'scheduled_date', 'estimated_duration', 'requester_id', 'provider_id'}
+SLOT_STEP = timedelta(minutes=30)
+
+# Inbox boxes, with the user columns they are read from
+INBOX_BOXES = {
+    'all': ('requester_id', 'provider_id'),
+    'sent': ('requester_id',),
+    'received': ('provider_id',),
+}
+
 
 class SwapRequest(models.Model):
     _name = 'swap.request'
     _description = 'Skill Swap Request'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = [
+        'mail.thread', 'mail.activity.mixin',
+        'skill.swap.keyset.mixin', 'skill.swap.counter.mixin', 'skill.swap.cache.mixin',
+    ]
+    _counter_trigger_fields = {'requester_id', 'provider_id', 'state', 'requester_skill_id', 'provider_skill_id'}
     _order = 'create_date desc'
 
+    # States a request may be moved to, with the states it may come from
+    _state_transitions = {
+        'accepted': {'pending'},
+        'rejected': {'pending'},
+        'completed': {'accepted'},
+        'cancelled': {'pending', 'accepted'},
+        'expired': {'pending'},
+    }
+
     name = fields.Char(string='Request Reference', required=True, copy=False, readonly=True, default='New')
     requester_id = fields.Many2one('res.users', string='Requester', required=True, ondelete='cascade')
     provider_id = fields.Many2one('res.users', string='Provider', required=True, ondelete='cascade')
@@ -19,7 +65,8 @@ class SwapRequest(models.Model):
         ('accepted', 'Accepted'),
         ('rejected', 'Rejected'),
         ('completed', 'Completed'),
-        ('cancelled', 'Cancelled')
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
     ], string='Status', default='pending', tracking=True)
 
     message = fields.Text(string='Message from Requester')
@@ -46,7 +93,47 @@ class SwapRequest(models.Model):
 
     # Expiry
     expiry_date = fields.Datetime(string='Expiry Date', compute='_compute_expiry_date', store=True)
-    is_expired = fields.Boolean(string='Is Expired', compute='_compute_is_expired')
+    is_expired = fields.Boolean(string='Is Expired', compute='_compute_is_expired', search='_search_is_expired')
+
+    def init(self):
+        super().init()
+        tools.create_index(self.env.cr, 'swap_request_state_expiry_date_index', self._table,
+                           ['state', 'expiry_date'])
+        # one index per inbox branch, see _inbox
+        for column in ('requester_id', 'provider_id'):
+            tools.create_index(self.env.cr, 'swap_request_%s_inbox_index' % column, self._table,
+                               [column, 'state', 'create_date', 'id'])
+        if not tools.index_exists(self.env.cr, OPEN_REQUEST_INDEX):
+            self._cancel_duplicate_open_requests()
+            self.env.cr.execute("""
+                CREATE UNIQUE INDEX %s ON swap_request (%s)
+                 WHERE state IN ('pending', 'accepted')
+            """ % (OPEN_REQUEST_INDEX, ', '.join(OPEN_REQUEST_FIELDS)))
+
+    def _cancel_duplicate_open_requests(self):
+        """Cancel the open requests duplicating an older one, so the unique index can be built.
+
+        Runs during the install or update of the module, in plain SQL: no
+        transition hook, message or notification is triggered. The counters
+        are fixed by the repair of skill.swap.counter.mixin after the init.
+        """
+        self.env.cr.execute("""
+            UPDATE swap_request SET state = 'cancelled'
+             WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY %s ORDER BY id) AS rank
+                      FROM swap_request
+                     WHERE state IN ('pending', 'accepted')
+                ) r WHERE rank > 1
+             )
+         RETURNING id
+        """ % ', '.join(OPEN_REQUEST_FIELDS))
+        cancelled_ids = [row[0] for row in self.env.cr.fetchall()]
+        if cancelled_ids:
+            _logger.warning("Cancelled %s duplicate open swap request(s)", len(cancelled_ids))
+            if tools.table_exists(self.env.cr, 'swap_booking'):
+                # a cancelled request holds no time
+                self.env.cr.execute("DELETE FROM swap_booking WHERE request_id = ANY(%s)", [cancelled_ids])
 
     @api.depends('requested_date')
     def _compute_expiry_date(self):
@@ -56,45 +143,421 @@ class SwapRequest(models.Model):
             else:
                 record.expiry_date = False
 
-    @api.depends('expiry_date')
+    @api.depends('expiry_date', 'state')
     def _compute_is_expired(self):
         now = fields.Datetime.now()
         for record in self:
-            record.is_expired = record.expiry_date and record.expiry_date < now and record.state == 'pending'
+            record.is_expired = record.state == 'expired' or (
+                record.expiry_date and record.expiry_date < now and record.state == 'pending')
+
+    def _search_is_expired(self, operator, value):
+        if operator not in ('=', '!='):
+            raise exceptions.UserError("Unsupported operator %s for is_expired" % operator)
+        # pending requests past their expiry date count until the sweeper picks them up
+        domain = ['|', ('state', '=', 'expired'),
+                  '&', ('state', '=', 'pending'), ('expiry_date', '<', fields.Datetime.now())]
+        return domain if (operator == '=') == bool(value) else ['!'] + domain
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        unnamed = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        for vals, name in zip(unnamed, self._next_names(len(unnamed))):
+            vals['name'] = name
+        records = super(SwapRequest, self).create(vals_list)
+        self.env['swap.report']._refresh_requests(records.ids)
+        scheduled = records.filtered('scheduled_date')
+        if scheduled:
+            self.env['swap.booking'].sudo()._sync(scheduled)
+        records._fanout_notifications()
+        return records
+
+    @api.model
+    def _create_or_get_open(self, vals):
+        """Create a swap request, unless the same one is already open.
+
+        Returns ``(request, created)``. Duplicates are rejected by the partial
+        unique index, so the happy path is a plain insert and the existing
+        request is only looked up after a conflict. The lookup may come back
+        empty when the conflicting request was committed after our snapshot.
+        """
+        try:
+            with self.env.cr.savepoint(), mute_logger('odoo.sql_db'):
+                return self.create(vals), True
+        except psycopg2.errors.UniqueViolation as e:
+            if e.diag.constraint_name != OPEN_REQUEST_INDEX:
+                raise
+        existing = self.search([(name, '=', vals[name]) for name in OPEN_REQUEST_FIELDS]
+                               + [('state', 'in', ['pending', 'accepted'])], limit=1)
+        return existing, False
+
+    @api.model
+    def _next_names(self, count):
+        """Allocate ``count`` request references with a single ``nextval`` round-trip."""
+        if not count:
+            return []
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', 'swap.request'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return ['New'] * count
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            return [sequence._next() for _i in range(count)]
+        self.env.cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)",
+                            ('ir_sequence_%03d' % sequence.id, count))
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
+
+    @api.model
+    def _import_prepare_chunk(self, rows, lookups):
+        """Turn imported rows into ``create`` values, see skill.swap.bulk.import."""
+        Import = self.env['skill.swap.bulk.import']
+        users = Import._import_resolve_users(
+            [row.get(key) for _line, row in rows for key in ('requester', 'provider')], lookups)
+        skills = self._import_resolve_skills([
+            (users.get(row.get(user_key)), row.get(skill_key))
+            for _line, row in rows
+            for user_key, skill_key in (('requester', 'requester_skill'), ('provider', 'provider_skill'))
+        ])
+        states = dict(self._fields['state'].selection)
+        meeting_types = dict(self._fields['meeting_type'].selection)
+        prepared, errors = [], []
+        for line, row in rows:
+            requester_id = users.get(row.get('requester'))
+            provider_id = users.get(row.get('provider'))
+            requester_skill_id = skills.get((requester_id, normalize_skill_name(row.get('requester_skill'))))
+            provider_skill_id = skills.get((provider_id, normalize_skill_name(row.get('provider_skill'))))
+            if not requester_id:
+                errors.append((line, "Unknown requester: %s" % row.get('requester')))
+            elif not provider_id:
+                errors.append((line, "Unknown provider: %s" % row.get('provider')))
+            elif requester_id == provider_id:
+                errors.append((line, "You cannot create a swap request with yourself!"))
+            elif not requester_skill_id:
+                errors.append((line, "Unknown requester skill: %s" % row.get('requester_skill')))
+            elif not provider_skill_id:
+                errors.append((line, "Unknown provider skill: %s" % row.get('provider_skill')))
+            elif row.get('state') and row['state'] not in states:
+                errors.append((line, "Invalid state: %s" % row['state']))
+            elif row.get('meeting_type') and row['meeting_type'] not in meeting_types:
+                errors.append((line, "Invalid meeting type: %s" % row['meeting_type']))
+            else:
+                vals = {
+                    'requester_id': requester_id,
+                    'provider_id': provider_id,
+                    'requester_skill_id': requester_skill_id,
+                    'provider_skill_id': provider_skill_id,
+                    'state': row.get('state') or 'pending',
+                    'message': row.get('message') or False,
+                    'meeting_type': row.get('meeting_type') or 'online',
+                }
+                try:
+                    for date_field in ('requested_date', 'response_date', 'completion_date'):
+                        if row.get(date_field):
+                            vals[date_field] = fields.Datetime.to_datetime(row[date_field])
+                    if row.get('estimated_duration'):
+                        vals['estimated_duration'] = float(row['estimated_duration'])
+                except ValueError as e:
+                    errors.append((line, str(e)))
+                    continue
+                if row.get('name'):
+                    vals['name'] = row['name']
+                prepared.append((line, vals))
+        return prepared, errors
+
+    @api.model
+    def _import_resolve_skills(self, pairs):
+        """Map ``(user id, skill name)`` pairs to skill ids with a single query."""
+        keys = {(user_id, normalize_skill_name(name)) for user_id, name in pairs if user_id and name}
+        if not keys:
+            return {}
+        user_ids, skill_keys = zip(*keys)
+        self.env['user.skill'].flush_model(['user_id', 'skill_key'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (s.user_id, s.skill_key) s.user_id, s.skill_key, s.id
+              FROM user_skill s
+              JOIN unnest(%s::int[], %s::varchar[]) AS k(user_id, skill_key)
+                ON k.user_id = s.user_id AND k.skill_key = s.skill_key
+          ORDER BY s.user_id, s.skill_key, s.id
+        """, (list(user_ids), list(skill_keys)))
+        return {(user_id, skill_key): skill_id for user_id, skill_key, skill_id in self.env.cr.fetchall()}
+
+    def write(self, vals):
+        res = super(SwapRequest, self).write(vals)
+        if self.env['swap.report']._report_request_fields.intersection(vals):
+            self.env['swap.report']._refresh_requests(self.ids)
+        if BOOKING_FIELDS.intersection(vals):
+            self.env['swap.booking'].sudo()._sync(self)
+        if 'state' in vals:
+            self._fanout_notifications()
+        return res
+
+    @api.model
+    def _inbox_conditions(self, column, states=None, expired=None):
+        conditions = [SQL("%s = %s", SQL.identifier(column), self.env.uid)]
+        if states:
+            conditions.append(SQL("state = ANY(%s)", list(states)))
+        if expired is not None:
+            # same as the is_expired search
+            condition = SQL("(state = 'expired' OR (state = 'pending' AND expiry_date < %s))",
+                            fields.Datetime.now())
+            conditions.append(condition if expired else SQL("NOT %s", condition))
+        return conditions
+
+    @api.model
+    def _inbox(self, box='all', states=None, expired=None, limit=20, cursor=None):
+        """The current user's requests, newest first, one keyset page at a time.
+
+        ``box`` is ``all``, ``sent`` or ``received``. Instead of a single
+        ``requester_id = uid OR provider_id = uid`` scan, every side of the
+        inbox is read from its own (user, state, create_date, id) index and
+        the two ordered branches are merged with a UNION ALL. Returns the
+        records and the token of the next page, like ``_keyset_search``.
+        """
+        if box not in INBOX_BOXES:
+            raise exceptions.UserError("Unknown inbox: %s" % box)
+        self.check_access_rights('read')
+        self.flush_model(['requester_id', 'provider_id', 'state', 'expiry_date'])
+        branches = []
+        for column in INBOX_BOXES[box]:
+            conditions = self._inbox_conditions(column, states, expired)
+            if cursor:
+                create_date, last_id = decode_cursor(cursor)
+                conditions.append(SQL("(create_date, id) < (%s, %s)", create_date, last_id))
+            branches.append(SQL("""
+                (SELECT id, create_date FROM swap_request
+                  WHERE %s
+               ORDER BY create_date DESC, id DESC
+                  LIMIT %s)
+            """, SQL(" AND ").join(conditions), limit + 1))
+        self.env.cr.execute(SQL("%s ORDER BY create_date DESC, id DESC LIMIT %s",
+                                SQL(" UNION ALL ").join(branches), limit + 1))
+        rows = self.env.cr.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][1], rows[-1][0]])
+        return self.browse([row[0] for row in rows]), next_cursor
+
+    @api.model
+    def _inbox_count(self, box='all', states=None, expired=None):
+        """Number of requests in the current user's inbox, counted on the inbox indexes."""
+        if box not in INBOX_BOXES:
+            raise exceptions.UserError("Unknown inbox: %s" % box)
+        self.check_access_rights('read')
+        self.flush_model(['requester_id', 'provider_id', 'state', 'expiry_date'])
+        counts = [
+            SQL("(SELECT COUNT(*) FROM swap_request WHERE %s)",
+                SQL(" AND ").join(self._inbox_conditions(column, states, expired)))
+            for column in INBOX_BOXES[box]
+        ]
+        self.env.cr.execute(SQL("SELECT %s", SQL(" + ").join(counts)))
+        return self.env.cr.fetchone()[0]
+
+    def suggest_slots(self, count=5, duration=None, days=14, start=None):
+        """Propose the next free sessions for both participants.
+
+        Slots fall within the availability of the two skills of the request,
+        in the timezone of their owner, and avoid the sessions both users
+        already booked, read through the swap.booking range index. Returns
+        up to ``count`` ``(start, stop)`` pairs of UTC datetimes.
+        """
+        self.ensure_one()
+        now = fields.Datetime.now()
+        start = ceil_datetime(max(start or now, now), SLOT_STEP)
+        stop = start + timedelta(days=days)
+        duration = timedelta(hours=duration or self.estimated_duration or DEFAULT_DURATION_HOURS)
+        free = [(start, stop)]
+        for user, skill in ((self.requester_id, self.requester_skill_id), (self.provider_id, self.provider_skill_id)):
+            free = intersect(free, availability_windows(skill.sudo().availability, user.tz, start, stop))
+        busy = self.env['swap.booking'].sudo()._busy_periods(
+            (self.requester_id | self.provider_id).ids, start, stop, exclude_request_id=self.id)
+        return first_slots(subtract(free, busy), duration, SLOT_STEP, count)
+
+    def _fanout_notifications(self):
+        """Add the feed events of new requests and state changes."""
+        if self.env.context.get('skill_swap_no_notify'):
+            return
+        states = dict(self._fields['state'].selection)
+        events = []
+        for record in self:
+            if record.state == 'pending':
+                # a new request, for the provider only
+                recipients = record.provider_id
+                title = "New swap request"
+                message = "%s would like to swap %s for %s" % (
+                    record.requester_id.name, record.requester_skill_id.skill_name,
+                    record.provider_skill_id.skill_name)
+            else:
+                recipients = (record.requester_id | record.provider_id).filtered(
+                    lambda user: user.id != self.env.uid)
+                title = "Swap request %s" % states[record.state].lower()
+                message = "%s is now %s" % (record.name, states[record.state].lower())
+            events += [{
+                'user_id': user.id,
+                'event_type': 'request',
+                'request_id': record.id,
+                'title': title,
+                'message': message,
+            } for user in recipients]
+        self.env['swap.notification.event']._fanout(events)
+
+    def _counter_contributions(self):
+        contributions = []
+        for record in self:
+            for user in (record.requester_id, record.provider_id):
+                contributions.append(('res.users', 'swap_request_count', user.id))
+                if record.state in ('pending', 'accepted'):
+                    contributions.append(('res.users', 'swap_open_count', user.id))
+                elif record.state == 'completed':
+                    contributions.append(('res.users', 'swap_completed_count', user.id))
+            # the skills of other users may be private
+            for skill in (record.sudo().requester_skill_id, record.sudo().provider_skill_id):
+                contributions.append(('skill.canonical', 'request_count', skill.canonical_id.id))
+        return contributions
+
+    def _counter_expected_sql(self):
+        involved = """
+            SELECT requester_id AS user_id, state FROM swap_request
+            UNION ALL
+            SELECT provider_id AS user_id, state FROM swap_request
+        """
+        return [
+            ('res.users', 'swap_request_count',
+             "SELECT user_id AS id, COUNT(*) AS cnt FROM (%s) r GROUP BY user_id" % involved),
+            ('res.users', 'swap_open_count',
+             "SELECT user_id AS id, COUNT(*) AS cnt FROM (%s) r WHERE state IN ('pending', 'accepted') "
+             "GROUP BY user_id" % involved),
+            ('res.users', 'swap_completed_count',
+             "SELECT user_id AS id, COUNT(*) AS cnt FROM (%s) r WHERE state = 'completed' "
+             "GROUP BY user_id" % involved),
+            ('skill.canonical', 'request_count', """
+                SELECT s.canonical_id AS id, COUNT(*) AS cnt
+                  FROM (SELECT requester_skill_id AS skill_id FROM swap_request
+                        UNION ALL
+                        SELECT provider_skill_id AS skill_id FROM swap_request) r
+                  JOIN user_skill s ON s.id = r.skill_id
+              GROUP BY s.canonical_id
+            """),
+        ]
+
+    def unlink(self):
+        self.env['swap.report']._remove_requests(self.ids)
+        return super(SwapRequest, self).unlink()
+
+    def _queue_mail(self, template_xmlid):
+        """Queue a notification email, sent asynchronously by the outbox cron."""
+        template = self.env.ref(template_xmlid, raise_if_not_found=False)
+        return self.env['swap.mail.outbox'].enqueue(template, self.ids)
+
+    def _bulk_transition(self, state, vals=None, body=None, raise_if_invalid=True):
+        """Move the records to ``state`` in bulk.
+
+        Allowed transitions are checked in one pass, the records are written
+        with a single ``write`` and the chatter messages, with their state
+        tracking, are created in batches instead of one ``message_post`` per
+        record. Returns throughput statistics.
+        """
+        start = time.perf_counter()
+        allowed = self._state_transitions[state]
+        self.fetch(['state', 'name'])
+        valid = self.filtered(lambda record: record.state in allowed)
+        invalid = self - valid
+        if invalid and raise_if_invalid:
+            raise exceptions.UserError("These requests cannot be moved to %s: %s" % (
+                dict(self._fields['state'].selection)[state], ', '.join(invalid[:10].mapped('name'))))
+        if valid:
+            old_states = {record.id: record.state for record in valid}
+            valid.with_context(tracking_disable=True).write(dict(vals or {}, state=state))
+            valid._log_state_change(old_states, state, body)
+            self.env.flush_all()
+        elapsed = time.perf_counter() - start
+        stats = {
+            'state': state,
+            'count': len(valid),
+            'skipped': len(invalid),
+            'elapsed': elapsed,
+            'per_second': len(valid) / elapsed if elapsed else 0.0,
+        }
+        if len(valid) > 1:
+            _logger.info("Moved %(count)s swap request(s) to %(state)s in %(elapsed).3fs "
+                         "(%(per_second).0f/s, %(skipped)s skipped)", stats)
+        return stats
+
+    def _log_state_change(self, old_states, new_state, body=None):
+        """Create the chatter messages of a state change, tracking included, in batches."""
+        Tracking = self.env['mail.tracking.value']
+        col_info = self.fields_get(['state'], attributes=('string', 'type', 'selection'))['state']
+        subtype_id = self.env['ir.model.data']._xmlid_to_res_id('mail.mt_note')
+        author_id = self.env.user.partner_id.id
+        now = fields.Datetime.now()
+        trackings = {}
+        for batch_ids in split_every(MESSAGE_BATCH_SIZE, self.ids):
+            values = []
+            for record in self.browse(batch_ids):
+                old_state = old_states[record.id]
+                if old_state not in trackings:
+                    trackings[old_state] = Tracking._create_tracking_values(
+                        old_state, new_state, 'state', col_info, record)
+                values.append({
+                    'model': self._name,
+                    'res_id': record.id,
+                    'record_name': record.name,
+                    'body': body or '',
+                    'message_type': 'notification',
+                    'subtype_id': subtype_id,
+                    'author_id': author_id,
+                    'date': now,
+                    'tracking_value_ids': [Command.create(trackings[old_state])],
+                })
+            self.env['mail.message'].sudo().create(values)
 
     @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('swap.request') or 'New'
-        return super(SwapRequest, self).create(vals)
+    def _cron_expire_requests(self, batch_size=EXPIRY_BATCH_SIZE):
+        """Move pending requests past their expiry date to ``expired``.
+
+        Requests are picked through the (state, expiry_date) index and handled
+        in batches, each committed on its own so that no lock is held for
+        long. Returns the number of expired requests.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        processed = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM swap_request
+                 WHERE state = 'pending' AND expiry_date < %s
+              ORDER BY expiry_date
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, (fields.Datetime.now(), batch_size))
+            batch = self.browse([row[0] for row in self.env.cr.fetchall()])
+            if not batch:
+                break
+            processed += batch._bulk_transition(
+                'expired', body="Swap request has expired.", raise_if_invalid=False)['count']
+            if not auto_commit:
+                break
+            self.env.cr.commit()
+            self.env.invalidate_all()
+        _logger.info("Skill swap expiry sweeper: %s request(s) expired", processed)
+        return processed
 
     def action_accept(self):
-        self.write({
-            'state': 'accepted',
-            'response_date': fields.Datetime.now()
-        })
-        self.message_post(body="Swap request has been accepted!")
+        self._bulk_transition('accepted', {'response_date': fields.Datetime.now()},
+                              "Swap request has been accepted!")
         return True
 
     def action_reject(self):
-        self.write({
-            'state': 'rejected',
-            'response_date': fields.Datetime.now()
-        })
-        self.message_post(body="Swap request has been rejected!")
+        self._bulk_transition('rejected', {'response_date': fields.Datetime.now()},
+                              "Swap request has been rejected!")
         return True
 
     def action_complete(self):
-        self.write({
-            'state': 'completed',
-            'completion_date': fields.Datetime.now()
-        })
-        self.message_post(body="Swap has been completed!")
+        self._bulk_transition('completed', {'completion_date': fields.Datetime.now()},
+                              "Swap has been completed!")
         return True
 
     def action_cancel(self):
-        self.write({'state': 'cancelled'})
-        self.message_post(body="Swap request has been cancelled!")
+        self._bulk_transition('cancelled', body="Swap request has been cancelled!")
         return True
 
     @api.constrains('requester_id', 'provider_id')
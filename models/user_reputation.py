@@ -0,0 +1,145 @@
+from collections import defaultdict
+
+from odoo import models, fields, api
+
+from ..tools.fragment_cache import notify_changes
+
+DEFAULT_PRIOR_WEIGHT = 5
+DEFAULT_PRIOR_MEAN = 3.0
+
+
+class SwapUserReputation(models.Model):
+    """Rating aggregates of every rated user.
+
+    One row per user, covering the approved ratings they received. Rows are
+    updated incrementally by swap.rating, with relative updates, so profiles,
+    search ranking and the leaderboard never aggregate ratings on the fly.
+
+    ``reputation_score`` is a Bayesian average: the ratings are pulled toward
+    ``skill_swap.reputation_prior_mean`` (3.0) with the weight of
+    ``skill_swap.reputation_prior_weight`` (5) ratings, so a single 5-star
+    rating does not top the leaderboard. After changing those parameters,
+    call ``rebuild``.
+    """
+    _name = 'swap.user.reputation'
+    _description = 'Skill Swap User Reputation'
+    _inherit = ['skill.swap.keyset.mixin', 'skill.swap.cache.mixin']
+    _order = 'reputation_score desc, id'
+    _rec_name = 'user_id'
+    # shown in the skill_card and skill_detail_body fragments of the portal
+    _fragment_cache = True
+
+    user_id = fields.Many2one('res.users', string='User', required=True, ondelete='cascade')
+    rating_count = fields.Integer(string='Ratings', default=0)
+    rating_sum = fields.Integer(string='Rating Sum', default=0)
+    rating_avg = fields.Float(string='Average Rating', digits=(3, 2))
+    rating_1_count = fields.Integer(string='1 Star', default=0)
+    rating_2_count = fields.Integer(string='2 Stars', default=0)
+    rating_3_count = fields.Integer(string='3 Stars', default=0)
+    rating_4_count = fields.Integer(string='4 Stars', default=0)
+    rating_5_count = fields.Integer(string='5 Stars', default=0)
+    reputation_score = fields.Float(string='Reputation Score', digits=(3, 2), default=0.0)
+    completed_swap_count = fields.Integer(related='user_id.swap_completed_count', string='Completed Swaps')
+
+    _sql_constraints = [
+        ('user_uniq', 'unique(user_id)', 'A user can only have one reputation record.'),
+    ]
+
+    def init(self):
+        super().init()
+        self.env.cr.execute("SELECT NOT EXISTS (SELECT 1 FROM swap_user_reputation)")
+        if self.env.cr.fetchone()[0]:
+            self.pool.post_init(self.rebuild)
+
+    @api.model
+    def _prior(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        return (
+            float(ICP.get_param('skill_swap.reputation_prior_weight', DEFAULT_PRIOR_WEIGHT)),
+            float(ICP.get_param('skill_swap.reputation_prior_mean', DEFAULT_PRIOR_MEAN)),
+        )
+
+    @api.model
+    def _refresh_scores(self, user_ids=None):
+        """Recompute the average and reputation score from the stored sums."""
+        weight, mean = self._prior()
+        query = """
+            UPDATE swap_user_reputation
+               SET rating_avg = CASE WHEN rating_count > 0 THEN rating_sum::float / rating_count END,
+                   reputation_score = (%s * %s + rating_sum) / (%s + rating_count)
+        """
+        params = [weight, mean, weight]
+        if user_ids is not None:
+            query += " WHERE user_id = ANY(%s)"
+            params.append(list(user_ids))
+        self.env.cr.execute(query, params)
+
+    @api.model
+    def _apply_ratings(self, delta):
+        """Apply a ``{(user id, rating value): count}`` delta to the aggregates."""
+        per_user = defaultdict(lambda: [0] * 7)  # count, sum, then one counter per star
+        for (user_id, value), count in delta.items():
+            if count and user_id and 1 <= value <= 5:
+                row = per_user[user_id]
+                row[0] += count
+                row[1] += count * value
+                row[1 + value] += count
+        per_user = {user_id: row for user_id, row in per_user.items() if any(row)}
+        if not per_user:
+            return
+        columns = list(zip(*per_user.values()))
+        self.env.cr.execute("""
+            INSERT INTO swap_user_reputation AS r (user_id, rating_count, rating_sum, rating_1_count,
+                                                   rating_2_count, rating_3_count, rating_4_count, rating_5_count,
+                                                   create_date, write_date)
+            SELECT d.*, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+              FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[], %s::int[], %s::int[],
+                          %s::int[], %s::int[]) AS d
+            ON CONFLICT (user_id) DO UPDATE SET
+                write_date = EXCLUDED.write_date,
+                rating_count = r.rating_count + EXCLUDED.rating_count,
+                rating_sum = r.rating_sum + EXCLUDED.rating_sum,
+                rating_1_count = r.rating_1_count + EXCLUDED.rating_1_count,
+                rating_2_count = r.rating_2_count + EXCLUDED.rating_2_count,
+                rating_3_count = r.rating_3_count + EXCLUDED.rating_3_count,
+                rating_4_count = r.rating_4_count + EXCLUDED.rating_4_count,
+                rating_5_count = r.rating_5_count + EXCLUDED.rating_5_count
+            RETURNING id
+        """, [list(per_user)] + [list(column) for column in columns])
+        reputations = self.browse([row[0] for row in self.env.cr.fetchall()])
+        self._refresh_scores(list(per_user))
+        self.invalidate_model()
+        self._bump_cache_generation()
+        notify_changes(reputations)
+
+    @api.model
+    def rebuild(self):
+        """Recompute every aggregate from the approved ratings."""
+        self.env['swap.rating'].flush_model(['rated_user_id', 'rating_value', 'state'])
+        self.env.cr.execute("TRUNCATE swap_user_reputation")
+        self.env.cr.execute("""
+            INSERT INTO swap_user_reputation (user_id, rating_count, rating_sum, rating_1_count,
+                                              rating_2_count, rating_3_count, rating_4_count, rating_5_count,
+                                              create_date, write_date)
+            SELECT rated_user_id, COUNT(*), SUM(rating_value),
+                   COUNT(*) FILTER (WHERE rating_value = 1), COUNT(*) FILTER (WHERE rating_value = 2),
+                   COUNT(*) FILTER (WHERE rating_value = 3), COUNT(*) FILTER (WHERE rating_value = 4),
+                   COUNT(*) FILTER (WHERE rating_value = 5), now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC'
+              FROM swap_rating
+             WHERE state = 'approved' AND rating_value BETWEEN 1 AND 5
+          GROUP BY rated_user_id
+        """)
+        self._refresh_scores()
+        self.invalidate_model()
+        self._bump_cache_generation()
+        return True
+
+    def _histogram(self):
+        self.ensure_one()
+        return {str(star): self['rating_%s_count' % star] for star in range(1, 6)}
+
+    @api.model
+    def get_leaderboard(self, limit=20, cursor=None):
+        """Users ranked by reputation score, one keyset page at a time."""
+        return self._keyset_search([('rating_count', '>', 0)], order='reputation_score desc',
+                                   limit=limit, cursor=cursor)
@@ -1,9 +1,29 @@
-from odoo import models, fields, api, exceptions
+import logging
+
+from odoo import models, fields, api, exceptions, tools
+from odoo.tools import SQL
+
+from .bulk_import import parse_bool
+from ..tools.geo import EARTH_RADIUS_KM, MAX_RADIUS_KM, geocode, grid_cell, grid_cells_within
+from ..tools.pg import ensure_extension
+from ..tools.skills import normalize_skill_name
+
+_logger = logging.getLogger(__name__)
+
+# Document indexed for the ranked full-text search. The index in ``init`` and
+# the query in ``_search_skills_query`` must build the very same expression,
+# otherwise Postgres cannot use the index.
+SKILL_DOCUMENT = "coalesce(%s, '') || ' ' || coalesce(%s, '')"
+SKILL_TS_CONFIG = 'simple'
+DEFAULT_RADIUS_KM = 50
 
 
 class UserSkill(models.Model):
     _name = 'user.skill'
     _description = 'User Skills'
+    _inherit = ['skill.swap.keyset.mixin', 'skill.swap.counter.mixin', 'skill.swap.cache.mixin']
+    _counter_trigger_fields = {'user_id', 'category_id', 'is_offered', 'is_wanted', 'canonical_id'}
+    _fragment_cache = True
     _rec_name = 'skill_name'
 
     user_id = fields.Many2one('res.users', string='User', required=True, ondelete='cascade')
@@ -28,27 +48,314 @@ class UserSkill(models.Model):
     is_public = fields.Boolean(string='Public Profile', default=True)
     created_date = fields.Datetime(string='Created Date', default=fields.Datetime.now)
 
+    skill_key = fields.Char(string='Skill Key', compute='_compute_skill_key', store=True,
+                            help="Normalized skill name used to match offers and wishes")
+    canonical_id = fields.Many2one('skill.canonical', string='Canonical Skill', readonly=True, index=True,
+                                   ondelete='set null')
+    user_reputation_score = fields.Float(related='user_id.swap_reputation_score', string='Reputation')
+    latitude = fields.Float(string='Latitude', digits=(10, 6), compute='_compute_coordinates', store=True)
+    longitude = fields.Float(string='Longitude', digits=(10, 6), compute='_compute_coordinates', store=True)
+    geo_cell = fields.Integer(string='Grid Cell', compute='_compute_coordinates', store=True,
+                              help="Cell of the location in the grid index used by radius searches")
+
     # Computed fields
     swap_requests_sent = fields.One2many('swap.request', 'requester_skill_id', string='Swap Requests Sent')
     swap_requests_received = fields.One2many('swap.request', 'provider_skill_id', string='Swap Requests Received')
 
+    def _counter_contributions(self):
+        contributions = []
+        for skill in self:
+            contributions.append(('skill.category', 'skill_count', skill.category_id.id))
+            contributions.append(('res.users', 'skill_total_count', skill.user_id.id))
+            contributions.append(('skill.canonical', 'skill_count', skill.canonical_id.id))
+            if skill.is_offered:
+                contributions.append(('res.users', 'skill_offered_count', skill.user_id.id))
+            if skill.is_wanted:
+                contributions.append(('res.users', 'skill_wanted_count', skill.user_id.id))
+        return contributions
+
+    def _counter_expected_sql(self):
+        return [
+            ('skill.category', 'skill_count',
+             "SELECT category_id AS id, COUNT(*) AS cnt FROM user_skill GROUP BY category_id"),
+            ('res.users', 'skill_total_count',
+             "SELECT user_id AS id, COUNT(*) AS cnt FROM user_skill GROUP BY user_id"),
+            ('res.users', 'skill_offered_count',
+             "SELECT user_id AS id, COUNT(*) AS cnt FROM user_skill WHERE is_offered GROUP BY user_id"),
+            ('res.users', 'skill_wanted_count',
+             "SELECT user_id AS id, COUNT(*) AS cnt FROM user_skill WHERE is_wanted GROUP BY user_id"),
+            ('skill.canonical', 'skill_count',
+             "SELECT canonical_id AS id, COUNT(*) AS cnt FROM user_skill GROUP BY canonical_id"),
+        ]
+
+    # Fields that can make or break a reciprocal match
+    _match_fields = {'skill_name', 'user_id', 'is_offered', 'is_wanted', 'is_public'}
+
+    @api.depends('skill_name')
+    def _compute_skill_key(self):
+        for record in self:
+            record.skill_key = normalize_skill_name(record.skill_name)
+
+    @api.depends('location')
+    def _compute_coordinates(self):
+        for record in self:
+            coordinates = geocode(record.location)
+            if coordinates:
+                record.latitude, record.longitude = coordinates
+                record.geo_cell = grid_cell(*coordinates)
+            else:
+                record.latitude = record.longitude = record.geo_cell = 0
+
+    def _assign_canonical(self):
+        """Link the skills to the canonical skill of their name, see skill.canonical."""
+        names = {}
+        for skill in self:
+            names.setdefault(skill.skill_key, skill.skill_name)
+        canonical_ids = self.env['skill.canonical'].sudo()._resolve(names)
+        moves = {}
+        for skill in self:
+            canonical_id = canonical_ids.get(skill.skill_key, False)
+            if skill.canonical_id.id != canonical_id:
+                moves.setdefault(canonical_id, []).append(skill.id)
+        for canonical_id, skill_ids in moves.items():
+            self.browse(skill_ids).write({'canonical_id': canonical_id})
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._assign_canonical()
+        self.env['swap.match']._refresh_users(records.user_id.ids)
+        return records
+
+    def write(self, vals):
+        match_users = self.user_id.ids if self._match_fields.intersection(vals) else []
+        requests = before = None
+        if 'canonical_id' in vals:
+            # the requests of these skills count toward the popularity of their canonical skill
+            requests = (self.swap_requests_sent | self.swap_requests_received).sudo()
+            before = requests._counter_snapshot()
+        res = super().write(vals)
+        if requests:
+            delta = requests._counter_snapshot()
+            delta.subtract(before)
+            requests._counter_apply(delta)
+        if 'skill_name' in vals:
+            self._assign_canonical()
+        if self.env['swap.report']._report_skill_fields.intersection(vals):
+            self.env['swap.report']._refresh_skills(self.ids)
+        if match_users:
+            self.env['swap.match']._refresh_users(match_users + self.user_id.ids)
+        return res
+
+    def unlink(self):
+        match_users = self.user_id.ids
+        res = super().unlink()
+        self.env['swap.match']._refresh_users(match_users)
+        return res
+
     @api.constrains('is_offered', 'is_wanted')
     def _check_skill_type(self):
         for record in self:
             if not record.is_offered and not record.is_wanted:
                 raise exceptions.ValidationError("A skill must be either offered or wanted (or both).")
 
+    def init(self):
+        super().init()
+        cr = self.env.cr
+        if ensure_extension(cr, 'pg_trgm'):
+            # GIN trigram indexes serve the ILIKE '%term%' filters on these columns
+            tools.create_index(cr, 'user_skill_skill_name_trgm_index', self._table,
+                               ['skill_name gin_trgm_ops'], method='gin')
+            tools.create_index(cr, 'user_skill_location_trgm_index', self._table,
+                               ['location gin_trgm_ops'], method='gin')
+        else:
+            _logger.warning("pg_trgm is missing, skill searches will scan the %s table.", self._table)
+        # inverted index from skill to the users offering/wanting it, used by swap.match
+        tools.create_index(cr, 'user_skill_offered_key_index', self._table, ['skill_key', 'user_id'],
+                           where='is_offered AND is_public')
+        tools.create_index(cr, 'user_skill_wanted_key_index', self._table, ['skill_key', 'user_id'],
+                           where='is_wanted AND is_public')
+        tools.create_index(cr, 'user_skill_user_id_index', self._table, ['user_id'])
+        # skills still waiting for the taxonomy backfill
+        tools.create_index(cr, 'user_skill_unlinked_canonical_index', self._table, ['id'],
+                           where='canonical_id IS NULL')
+        tools.create_index(cr, 'user_skill_geo_cell_index', self._table, ['geo_cell', 'id'],
+                           where='is_public')
+        document = SKILL_DOCUMENT % ('skill_name', 'description')
+        tools.create_index(cr, 'user_skill_fulltext_index', self._table,
+                           ["to_tsvector('%s', %s)" % (SKILL_TS_CONFIG, document)], method='gin')
+
     @api.model
-    def search_skills(self, domain=None, skill_name=None, category_id=None, location=None):
-        if domain is None:
-            domain = []
+    def _import_prepare_chunk(self, rows, lookups):
+        """Turn imported rows into ``create`` values, see skill.swap.bulk.import."""
+        Import = self.env['skill.swap.bulk.import']
+        users = Import._import_resolve_users([row.get('user') for _line, row in rows], lookups)
+        categories = Import._import_resolve_categories(lookups)
+        levels = dict(self._fields['skill_level'].selection)
+        availabilities = dict(self._fields['availability'].selection)
+        prepared, errors = [], []
+        for line, row in rows:
+            user_id = users.get(row.get('user'))
+            category_id = categories.get(str(row.get('category') or '').strip().casefold())
+            is_offered = parse_bool(row.get('is_offered'))
+            is_wanted = parse_bool(row.get('is_wanted'))
+            if not row.get('skill_name'):
+                errors.append((line, "Missing skill name"))
+            elif not user_id:
+                errors.append((line, "Unknown user: %s" % row.get('user')))
+            elif not category_id:
+                errors.append((line, "Unknown category: %s" % row.get('category')))
+            elif row.get('skill_level') not in levels:
+                errors.append((line, "Invalid skill level: %s" % row.get('skill_level')))
+            elif row.get('availability') and row['availability'] not in availabilities:
+                errors.append((line, "Invalid availability: %s" % row['availability']))
+            elif not is_offered and not is_wanted:
+                errors.append((line, "A skill must be either offered or wanted (or both)."))
+            else:
+                prepared.append((line, {
+                    'user_id': user_id,
+                    'skill_name': row['skill_name'],
+                    'category_id': category_id,
+                    'skill_level': row['skill_level'],
+                    'description': row.get('description') or False,
+                    'is_offered': is_offered,
+                    'is_wanted': is_wanted,
+                    'availability': row.get('availability') or False,
+                    'location': row.get('location') or False,
+                    'is_public': parse_bool(row.get('is_public'), default=True),
+                }))
+        return prepared, errors
 
-        if skill_name:
+    @api.model
+    def _search_skills_domain(self, skill_name=None, category_id=None, location=None,
+                              is_offered=False, is_wanted=False, exclude_user_id=None, mode='substring'):
+        domain = [('is_public', '=', True)]
+        if skill_name and mode != 'fulltext':
             domain.append(('skill_name', 'ilike', skill_name))
         if category_id:
-            domain.append(('category_id', '=', category_id))
+            domain.append(('category_id', '=', int(category_id)))
         if location:
             domain.append(('location', 'ilike', location))
+        if is_offered:
+            domain.append(('is_offered', '=', True))
+        if is_wanted:
+            domain.append(('is_wanted', '=', True))
+        if exclude_user_id:
+            domain.append(('user_id', '!=', exclude_user_id))
+        return domain
+
+    @api.model
+    def _search_skills_fulltext(self, query, skill_name):
+        """Return the full-text match condition and its relevance for ``query``."""
+        tsvector = SQL("to_tsvector(%s, %s)", SKILL_TS_CONFIG, SQL(
+            SKILL_DOCUMENT,
+            SQL.identifier(query.table, 'skill_name'),
+            SQL.identifier(query.table, 'description'),
+        ))
+        tsquery = SQL("websearch_to_tsquery(%s, %s)", SKILL_TS_CONFIG, skill_name)
+        return SQL("%s @@ %s", tsvector, tsquery), SQL("ts_rank(%s, %s)", tsvector, tsquery)
+
+    @api.model
+    def _search_skills_distance(self, query, latitude, longitude):
+        """Return the haversine distance in km between the skills and the given point."""
+        skill_lat = SQL.identifier(query.table, 'latitude')
+        skill_lon = SQL.identifier(query.table, 'longitude')
+        return SQL(
+            "2 * %s * asin(sqrt(least(1.0, power(sin(radians(%s - %s) / 2), 2)"
+            " + cos(radians(%s)) * cos(radians(%s)) * power(sin(radians(%s - %s) / 2), 2))))",
+            EARTH_RADIUS_KM, skill_lat, latitude, latitude, skill_lat, skill_lon, longitude,
+        )
+
+    @api.model
+    def _search_skills_query(self, domain=None, skill_name=None, mode='substring', sort=None, limit=None, offset=0,
+                             near=None, radius_km=None, **filters):
+        """Build the access-checked query behind every skill search.
+
+        ``sort='reputation'`` ranks the skills by the reputation of their
+        owner, joined from swap.user.reputation, instead of by relevance.
+        ``near`` restricts the search to the skills located within
+        ``radius_km`` of a place or ``"lat, lon"`` pair, and ``sort='distance'``
+        returns the nearest first; an unknown place matches nothing.
+        Returns the query and the expression it is sorted on.
+        """
+        if mode not in ('substring', 'fulltext'):
+            raise exceptions.UserError("Unknown search mode: %s" % mode)
+        if sort not in (None, 'relevance', 'reputation', 'distance'):
+            raise exceptions.UserError("Unknown sort: %s" % sort)
+        if sort == 'distance' and not near:
+            raise exceptions.UserError("Sorting by distance needs a location to search near.")
+        domain = list(domain or []) + self._search_skills_domain(skill_name=skill_name, mode=mode, **filters)
+        center = geocode(near) if near else None
+        if near:
+            radius_km = min(float(radius_km or DEFAULT_RADIUS_KM), MAX_RADIUS_KM)
+            # the grid cells around the point narrow the rows down through the index,
+            # the exact distance is checked below
+            cells = grid_cells_within(*center, radius_km) if center else []
+            domain.append(('geo_cell', 'in', cells))
+        query = self._search(domain, offset=offset, limit=limit)
+        id_sql = SQL.identifier(query.table, 'id')
+        sort_key = id_sql
+        if mode == 'fulltext' and skill_name:
+            match, rank = self._search_skills_fulltext(query, skill_name)
+            query.add_where(match)
+            query.order = SQL("%s DESC, %s DESC", rank, id_sql)
+            sort_key = rank
+        if sort == 'reputation':
+            alias = query.make_alias(query.table, 'reputation')
+            query.add_join('LEFT JOIN', alias, 'swap_user_reputation', SQL(
+                "%s = %s", SQL.identifier(alias, 'user_id'), SQL.identifier(query.table, 'user_id')))
+            # users without approved ratings sit at the prior, like a Bayesian average of nothing
+            _weight, prior_mean = self.env['swap.user.reputation']._prior()
+            sort_key = SQL("COALESCE(%s, %s)", SQL.identifier(alias, 'reputation_score'), prior_mean)
+            query.order = SQL("%s DESC, %s DESC", sort_key, id_sql)
+        if center:
+            distance = self._search_skills_distance(query, *center)
+            query.add_where(SQL("%s <= %s", distance, radius_km))
+            if sort == 'distance':
+                sort_key = distance
+                query.order = SQL("%s, %s", sort_key, id_sql)
+        return query, sort_key
+
+    @api.model
+    def search_skills(self, domain=None, skill_name=None, category_id=None, location=None,
+                      is_offered=False, is_wanted=False, exclude_user_id=None,
+                      mode='substring', sort=None, near=None, radius_km=None, limit=None, offset=0):
+        """Search public skills.
+
+        Shared by the backend, the JSON API and the portal browse page. The
+        default ``substring`` mode filters ``skill_name`` and ``location`` with
+        ILIKE, backed by trigram indexes. The ``fulltext`` mode matches
+        ``skill_name`` and ``description`` against the full-text index and
+        returns the most relevant skills first. ``sort='reputation'`` puts the
+        skills of the best rated users first. ``near`` and ``radius_km``
+        restrict the results to a circle around a place, searched through the
+        grid index; ``sort='distance'`` puts the nearest skills first.
+        """
+        query, _sort_key = self._search_skills_query(
+            domain=domain, skill_name=skill_name, category_id=category_id, location=location,
+            is_offered=is_offered, is_wanted=is_wanted, exclude_user_id=exclude_user_id,
+            mode=mode, sort=sort, near=near, radius_km=radius_km, limit=limit, offset=offset,
+        )
+        return self.browse(query.get_result_ids())
+
+    @api.model
+    def search_skills_page(self, cursor=None, limit=20, with_count=False, **search_kwargs):
+        """Paginated variant of :meth:`search_skills`.
 
-        domain.append(('is_public', '=', True))
-        return self.search(domain)
\ No newline at end of file
+        Pages are addressed by the opaque ``cursor`` returned with the previous
+        page. Counting every match is as expensive as the search itself, so the
+        total is only computed on request.
+        """
+        query, sort_key = self._search_skills_query(**search_kwargs)
+        total = None
+        if with_count:
+            order, query.order = query.order, None
+            self.flush_model()
+            self.env.cr.execute(query.select(SQL("COUNT(*)")))
+            total = self.env.cr.fetchone()[0]
+            query.order = order
+        sort = search_kwargs.get('sort')
+        descending = sort == 'reputation' or (sort != 'distance' and search_kwargs.get('mode') == 'fulltext'
+                                              and bool(search_kwargs.get('skill_name')))
+        skills, next_cursor = self._keyset_fetch(query, sort_key, descending, limit, cursor)
+        return {'records': skills, 'next_cursor': next_cursor, 'total': total}
@@ -1 +1,2 @@
-from . import swap_report
\ No newline at end of file
+from . import swap_report
+from . import swap_trend
@@ -1,10 +1,26 @@
+import csv
+import io
+import os
+import tempfile
+
+from dateutil.relativedelta import relativedelta
+
 from odoo import models, fields, api, tools
 
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FILE_CHUNK = 64 * 1024
+
 class SwapReport(models.Model):
     _name = 'swap.report'
     _description = 'Skill Swap Report'
     _auto = False
-    _rec_name = 'id'
+    _rec_name = 'request_name'
+    _order = 'requested_date desc, id desc'
 
     # Request fields
     request_id = fields.Many2one('swap.request', string='Request')
@@ -16,7 +32,8 @@ class SwapReport(models.Model):
         ('accepted', 'Accepted'),
         ('rejected', 'Rejected'),
         ('completed', 'Completed'),
-        ('cancelled', 'Cancelled')
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
     ], string='Status')
 
     # Skill fields
@@ -24,6 +41,8 @@ class SwapReport(models.Model):
     provider_skill_id = fields.Many2one('user.skill', string='Requested Skill')
     requester_skill_name = fields.Char(string='Offered Skill Name')
     provider_skill_name = fields.Char(string='Requested Skill Name')
+    requester_category_id = fields.Many2one('skill.category', string='Offered Skill Category ID')
+    provider_category_id = fields.Many2one('skill.category', string='Requested Skill Category ID')
     requester_skill_category = fields.Char(string='Offered Skill Category')
     provider_skill_category = fields.Char(string='Requested Skill Category')
 
@@ -36,56 +55,162 @@ class SwapReport(models.Model):
     estimated_duration = fields.Float(string='Estimated Duration')
     meeting_type = fields.Selection([
         ('online', 'Online'),
-        ('in_person', 'In Person'),
-        ('both', 'Both')
+        ('offline', 'In Person'),
+        ('hybrid', 'Hybrid')
     ], string='Meeting Type')
 
     # Aggregated fields
     rating = fields.Float(string='Average Rating')
     response_time_days = fields.Integer(string='Response Time (Days)')
 
+    # Columns of the materialized table and the expression filling them
+    _report_columns = [
+        ('id', 'integer PRIMARY KEY', 'sr.id'),
+        ('request_id', 'integer', 'sr.id'),
+        ('request_name', 'varchar', 'sr.name'),
+        ('requester_id', 'integer', 'sr.requester_id'),
+        ('provider_id', 'integer', 'sr.provider_id'),
+        ('state', 'varchar', 'sr.state'),
+        ('requester_skill_id', 'integer', 'sr.requester_skill_id'),
+        ('provider_skill_id', 'integer', 'sr.provider_skill_id'),
+        ('requester_skill_name', 'varchar', 'rus.skill_name'),
+        ('provider_skill_name', 'varchar', 'pus.skill_name'),
+        ('requester_category_id', 'integer', 'rus.category_id'),
+        ('provider_category_id', 'integer', 'pus.category_id'),
+        ('requester_skill_category', 'varchar', 'rsc.name'),
+        ('provider_skill_category', 'varchar', 'psc.name'),
+        ('requested_date', 'date', 'sr.requested_date::date'),
+        ('response_date', 'date', 'sr.response_date::date'),
+        ('completion_date', 'date', 'sr.completion_date::date'),
+        ('estimated_duration', 'double precision', 'sr.estimated_duration'),
+        ('meeting_type', 'varchar', 'sr.meeting_type'),
+        ('rating', 'double precision', 'avg_rating.rating'),
+        ('response_time_days', 'integer', """CASE
+                WHEN sr.response_date IS NOT NULL AND sr.requested_date IS NOT NULL
+                THEN sr.response_date::date - sr.requested_date::date
+                ELSE 0
+            END"""),
+    ]
+
+    # Source fields whose changes must be propagated to the report rows
+    _report_request_fields = {
+        'name', 'requester_id', 'provider_id', 'state', 'requester_skill_id', 'provider_skill_id',
+        'requested_date', 'response_date', 'completion_date', 'estimated_duration', 'meeting_type',
+    }
+    _report_rating_fields = {'swap_request_id', 'rating', 'state'}
+    _report_skill_fields = {'skill_name', 'category_id'}
+
     def init(self):
-        tools.drop_view_if_exists(self.env.cr, self._table)
+        cr = self.env.cr
+        # Earlier versions defined the report as a plain view
+        cr.execute("SELECT relkind FROM pg_class WHERE relname = %s", (self._table,))
+        relkind = cr.fetchone()
+        if relkind and relkind[0] == 'v':
+            tools.drop_view_if_exists(cr, self._table)
+            relkind = None
+        created = not relkind
+        if created:
+            cr.execute("CREATE TABLE %s (%s)" % (
+                self._table, ', '.join('%s %s' % (name, sql_type) for name, sql_type, _expr in self._report_columns)))
+        else:
+            for name, sql_type, _expr in self._report_columns[1:]:
+                cr.execute("ALTER TABLE %s ADD COLUMN IF NOT EXISTS %s %s" % (self._table, name, sql_type))
+        tools.create_index(cr, 'swap_report_requested_date_index', self._table, ['requested_date'])
+        tools.create_index(cr, 'swap_report_state_index', self._table, ['state'])
+        tools.create_index(cr, 'swap_report_requester_id_index', self._table, ['requester_id'])
+        tools.create_index(cr, 'swap_report_provider_id_index', self._table, ['provider_id'])
+        tools.create_index(cr, 'swap_report_requester_skill_index', self._table, ['requester_skill_id'])
+        tools.create_index(cr, 'swap_report_provider_skill_index', self._table, ['provider_skill_id'])
+        tools.create_index(cr, 'swap_report_requester_category_index', self._table, ['requester_category_id'])
+        tools.create_index(cr, 'swap_report_provider_category_index', self._table, ['provider_category_id'])
+        if created:
+            # swap.trend rebuilds itself from this table once it is created
+            self._rebuild_table()
+
+    def _report_select(self, where=''):
+        return """
+            SELECT %s
+            FROM swap_request sr
+            LEFT JOIN user_skill rus ON sr.requester_skill_id = rus.id
+            LEFT JOIN user_skill pus ON sr.provider_skill_id = pus.id
+            LEFT JOIN skill_category rsc ON rus.category_id = rsc.id
+            LEFT JOIN skill_category psc ON pus.category_id = psc.id
+            LEFT JOIN LATERAL (
+                SELECT AVG(rating_value) AS rating
+                FROM swap_rating
+                WHERE swap_request_id = sr.id AND state != 'rejected'
+            ) avg_rating ON TRUE
+            %s
+        """ % (', '.join('%s AS %s' % (expr, name) for name, _type, expr in self._report_columns), where)
+
+    def _flush_report_sources(self):
+        for model in ('swap.request', 'swap.rating', 'user.skill', 'skill.category'):
+            self.env[model].flush_model()
+
+    @api.model
+    def rebuild(self):
+        """Recompute the whole report table and its rollups from scratch."""
+        self._rebuild_table()
+        self.env['swap.trend'].rebuild()
+        return True
+
+    def _rebuild_table(self):
+        self._flush_report_sources()
+        cr = self.env.cr
+        cr.execute("TRUNCATE %s" % self._table)
+        cr.execute("INSERT INTO %s (%s) %s" % (
+            self._table, ', '.join(name for name, _type, _expr in self._report_columns), self._report_select()))
+        self.invalidate_model()
+
+    @api.model
+    def _refresh_requests(self, request_ids):
+        """Recompute the report rows of the given swap requests."""
+        request_ids = list(set(request_ids))
+        if not request_ids:
+            return
+        self._flush_report_sources()
+        cr = self.env.cr
+        Trend = self.env['swap.trend']
+        days = Trend._apply_report_rows(request_ids, -1)
+        cr.execute("DELETE FROM %s WHERE id = ANY(%%s)" % self._table, (request_ids,))
+        cr.execute("INSERT INTO %s (%s) %s" % (
+            self._table,
+            ', '.join(name for name, _type, _expr in self._report_columns),
+            self._report_select('WHERE sr.id = ANY(%s)'),
+        ), (request_ids,))
+        Trend._apply_report_rows(request_ids, 1)
+        Trend._drop_empty(days)
+        self.invalidate_model()
+
+    @api.model
+    def _remove_requests(self, request_ids):
+        """Drop the report rows of deleted swap requests."""
+        Trend = self.env['swap.trend']
+        days = Trend._apply_report_rows(request_ids, -1)
+        self.env.cr.execute("DELETE FROM %s WHERE id = ANY(%%s)" % self._table, (list(request_ids),))
+        Trend._drop_empty(days)
+        self.invalidate_model()
+
+    @api.model
+    def _refresh_skills(self, skill_ids):
+        """Recompute the rows referencing the given skills after a rename or recategorisation."""
+        if not skill_ids:
+            return
+        self.env.cr.execute("""
+            SELECT id FROM %s
+            WHERE requester_skill_id = ANY(%%s) OR provider_skill_id = ANY(%%s)
+        """ % self._table, (list(skill_ids), list(skill_ids)))
+        self._refresh_requests([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _refresh_categories(self, category_ids):
+        if not category_ids:
+            return
         self.env.cr.execute("""
-            CREATE OR REPLACE VIEW %s AS (
-                SELECT 
-                    row_number() OVER () AS id,
-                    sr.id as request_id,
-                    sr.name as request_name,
-                    sr.requester_id,
-                    sr.provider_id,
-                    sr.state,
-                    sr.requester_skill_id,
-                    sr.provider_skill_id,
-                    rus.name as requester_skill_name,
-                    pus.name as provider_skill_name,
-                    rsc.name as requester_skill_category,
-                    psc.name as provider_skill_category,
-                    sr.requested_date,
-                    sr.response_date,
-                    sr.completion_date,
-                    sr.estimated_duration,
-                    sr.meeting_type,
-                    COALESCE(avg_rating.rating, 0) as rating,
-                    CASE 
-                        WHEN sr.response_date IS NOT NULL AND sr.requested_date IS NOT NULL 
-                        THEN (sr.response_date - sr.requested_date)
-                        ELSE 0 
-                    END as response_time_days
-                FROM swap_request sr
-                LEFT JOIN user_skill rus ON sr.requester_skill_id = rus.id
-                LEFT JOIN user_skill pus ON sr.provider_skill_id = pus.id
-                LEFT JOIN skill_category rsc ON rus.category_id = rsc.id
-                LEFT JOIN skill_category psc ON pus.category_id = psc.id
-                LEFT JOIN (
-                    SELECT 
-                        request_id,
-                        AVG(rating) as rating
-                    FROM swap_feedback
-                    GROUP BY request_id
-                ) avg_rating ON sr.id = avg_rating.request_id
-            )
-        """ % self._table)
+            SELECT id FROM %s
+            WHERE requester_category_id = ANY(%%s) OR provider_category_id = ANY(%%s)
+        """ % self._table, (list(category_ids), list(category_ids)))
+        self._refresh_requests([row[0] for row in self.env.cr.fetchall()])
 
     @api.model
     def get_swap_statistics(self):
@@ -98,6 +223,7 @@ class SwapReport(models.Model):
                 COUNT(CASE WHEN state = 'accepted' THEN 1 END) as accepted_swaps,
                 COUNT(CASE WHEN state = 'rejected' THEN 1 END) as rejected_swaps,
                 COUNT(CASE WHEN state = 'cancelled' THEN 1 END) as cancelled_swaps,
+                COUNT(CASE WHEN state = 'expired' THEN 1 END) as expired_swaps,
                 AVG(rating) as avg_rating,
                 AVG(response_time_days) as avg_response_time
             FROM swap_report
@@ -106,23 +232,74 @@ class SwapReport(models.Model):
         return result
 
     @api.model
-    def get_top_skills(self, limit=10):
-        """Get most popular skills"""
+    def get_dashboard(self):
+        """Swap statistics of the admin dashboard, computed in one scan of the report.
+
+        The grouping sets give the overall totals, the breakdown per state,
+        per requested skill category and per rounded rating; response time
+        percentiles are taken over the answered requests.
+        """
         self.env.cr.execute("""
-            SELECT 
-                skill_name,
-                COUNT(*) as request_count
-            FROM (
-                SELECT requester_skill_name as skill_name FROM swap_report
-                UNION ALL
-                SELECT provider_skill_name as skill_name FROM swap_report
-            ) skills
-            WHERE skill_name IS NOT NULL
-            GROUP BY skill_name
-            ORDER BY request_count DESC
-            LIMIT %s
-        """, (limit,))
-        return self.env.cr.dictfetchall()
+            SELECT GROUPING(state, provider_category_id, ROUND(rating)) AS grouping,
+                   state,
+                   provider_category_id AS category_id,
+                   MAX(provider_skill_category) AS category_name,
+                   ROUND(rating)::int AS rating,
+                   COUNT(*) AS total_requests,
+                   COUNT(*) FILTER (WHERE state = 'completed') AS completed_count,
+                   COUNT(*) FILTER (WHERE state IN ('pending', 'accepted')) AS open_count,
+                   AVG(rating) AS avg_rating,
+                   (AVG(response_time_days) FILTER (WHERE response_date IS NOT NULL))::float AS avg_response_time,
+                   percentile_cont(ARRAY[0.5, 0.9, 0.99]) WITHIN GROUP (ORDER BY response_time_days)
+                       FILTER (WHERE response_date IS NOT NULL) AS response_time_percentiles
+              FROM swap_report
+          GROUP BY GROUPING SETS ((), (state), (provider_category_id), (ROUND(rating)))
+        """)
+        # GROUPING() sets the bit of every column left out of the row's grouping set
+        totals, states, categories, ratings = {}, [], [], []
+        for row in self.env.cr.dictfetchall():
+            grouping = row.pop('grouping')
+            if grouping == 0b111:
+                totals = row
+            elif grouping == 0b011:
+                states.append(row)
+            elif grouping == 0b101:
+                categories.append(row)
+            elif row['rating'] is not None:
+                ratings.append(row)
+        percentiles = totals.get('response_time_percentiles') or [None] * 3
+        counts = {row['state']: row['total_requests'] for row in states}
+        return {
+            'total_requests': totals.get('total_requests', 0),
+            'completed_count': totals.get('completed_count', 0),
+            'open_count': totals.get('open_count', 0),
+            'avg_rating': totals.get('avg_rating'),
+            'states': [{'state': state, 'count': counts.get(state, 0)}
+                       for state, _label in self._fields['state'].selection],
+            'categories': sorted(({
+                'category_id': row['category_id'],
+                'category_name': row['category_name'],
+                'total_requests': row['total_requests'],
+                'completed_count': row['completed_count'],
+                'avg_rating': row['avg_rating'],
+            } for row in categories), key=lambda row: (-row['total_requests'], row['category_id'] or 0)),
+            'ratings': sorted(({'rating': row['rating'], 'count': row['total_requests']} for row in ratings),
+                              key=lambda row: row['rating']),
+            'response_time': {
+                'avg_days': totals.get('avg_response_time'),
+                'p50_days': percentiles[0],
+                'p90_days': percentiles[1],
+                'p99_days': percentiles[2],
+            },
+        }
+
+    @api.model
+    def get_top_skills(self, limit=10):
+        """Get most popular skills, counted per canonical skill"""
+        return [{
+            'skill_name': skill['name'],
+            'request_count': skill['request_count'],
+        } for skill in self.env['skill.canonical'].get_top_skills(limit)]
 
     @api.model
     def get_user_activity(self, user_id):
@@ -132,27 +309,160 @@ class SwapReport(models.Model):
                 COUNT(CASE WHEN requester_id = %s THEN 1 END) as requests_made,
                 COUNT(CASE WHEN provider_id = %s THEN 1 END) as requests_received,
                 COUNT(CASE WHEN (requester_id = %s OR provider_id = %s) AND state = 'completed' THEN 1 END) as completed_swaps,
-                AVG(CASE WHEN provider_id = %s THEN rating END) as avg_rating_received
+                (SELECT rating_avg FROM swap_user_reputation WHERE user_id = %s) as avg_rating_received,
+                (SELECT reputation_score FROM swap_user_reputation WHERE user_id = %s) as reputation_score
             FROM swap_report
             WHERE requester_id = %s OR provider_id = %s
-        """, (user_id, user_id, user_id, user_id, user_id, user_id, user_id))
+        """, (user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id))
         return self.env.cr.dictfetchone()
 
     @api.model
     def get_monthly_trends(self):
-        """Get monthly swap trends"""
-        self.env.cr.execute("""
-            SELECT 
-                DATE_TRUNC('month', requested_date) as month,
-                COUNT(*) as total_requests,
-                COUNT(CASE WHEN state = 'completed' THEN 1 END) as completed_count,
-                AVG(rating) as avg_rating
-            FROM swap_report
-            WHERE requested_date >= CURRENT_DATE - INTERVAL '12 months'
-            GROUP BY DATE_TRUNC('month', requested_date)
-            ORDER BY month
-        """)
-        return self.env.cr.dictfetchall()
+        """Get monthly swap trends of the last 12 months"""
+        return [{
+            'month': trend['period'],
+            'total_requests': trend['total_requests'],
+            'completed_count': trend['completed_count'],
+            'avg_rating': trend['avg_rating'],
+        } for trend in self.get_trends('month', date_from=fields.Date.today() - relativedelta(months=12))]
+
+    @api.model
+    def get_trends(self, granularity='month', date_from=None, date_to=None, category_id=None):
+        """Swap trends per day, week, month, quarter or year, read from the swap.trend rollup"""
+        return self.env['swap.trend'].get_trends(granularity, date_from=date_from, date_to=date_to,
+                                                 category_id=category_id)
+
+    # Exported columns: (header, SQL expression)
+    _export_columns = [
+        ('Reference', 'r.request_name'),
+        ('Requester', 'rp.name'),
+        ('Provider', 'pp.name'),
+        ('Status', 'r.state'),
+        ('Offered Skill', 'r.requester_skill_name'),
+        ('Requested Skill', 'r.provider_skill_name'),
+        ('Requested Date', 'r.requested_date'),
+        ('Completion Date', 'r.completion_date'),
+        ('Average Rating', 'r.rating'),
+    ]
+
+    @api.model
+    def _export_query(self, filters=None):
+        """Return the export query and its parameters for the given filters.
+
+        Supported filters: ``state``, ``date_from``, ``date_to`` and
+        ``skill_category``, a category id or name matching either skill.
+        """
+        filters = filters or {}
+        conditions, params = [], []
+        if filters.get('state'):
+            conditions.append('r.state = %s')
+            params.append(filters['state'])
+        if filters.get('date_from'):
+            conditions.append('r.requested_date >= %s')
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            conditions.append('r.requested_date <= %s')
+            params.append(filters['date_to'])
+        category = filters.get('skill_category')
+        if category:
+            if str(category).isdigit():
+                conditions.append('(r.requester_category_id = %s OR r.provider_category_id = %s)')
+                params += [int(category), int(category)]
+            else:
+                conditions.append('(r.requester_skill_category = %s OR r.provider_skill_category = %s)')
+                params += [category, category]
+        query = """
+            SELECT %s
+              FROM swap_report r
+         LEFT JOIN res_users ru ON ru.id = r.requester_id
+         LEFT JOIN res_partner rp ON rp.id = ru.partner_id
+         LEFT JOIN res_users pu ON pu.id = r.provider_id
+         LEFT JOIN res_partner pp ON pp.id = pu.partner_id
+             %s
+          ORDER BY r.requested_date DESC, r.id DESC
+        """ % (', '.join(expr for _header, expr in self._export_columns),
+               'WHERE %s' % ' AND '.join(conditions) if conditions else '')
+        return query, params
+
+    @api.model
+    def _export_rows(self, filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Return a generator of the exported rows, header first.
+
+        The generator reads through a server-side cursor on a connection of
+        its own, ``chunk_size`` rows at a time, so it can be consumed after
+        the request transaction is over and memory does not grow with the
+        number of rows.
+        """
+        self.check_access_rights('read')
+        self._flush_report_sources()
+        query, params = self._export_query(filters)
+        states = dict(self._fields['state']._description_selection(self.env))
+        registry = self.env.registry
+        headers = [header for header, _expr in self._export_columns]
+
+        def rows():
+            yield headers
+            with registry.cursor() as cr:
+                server_cursor = cr._cnx.cursor('swap_report_export')
+                try:
+                    server_cursor.itersize = chunk_size
+                    server_cursor.execute(query, params)
+                    while True:
+                        chunk = server_cursor.fetchmany(chunk_size)
+                        if not chunk:
+                            break
+                        for row in chunk:
+                            yield row[:3] + (states.get(row[3], row[3]),) + row[4:]
+                finally:
+                    server_cursor.close()
+        return rows()
+
+    @api.model
+    def _export_csv_chunks(self, filters=None):
+        """Return a generator streaming the export as CSV, one encoded chunk per block of rows."""
+        rows = self._export_rows(filters)
+
+        def chunks():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for index, row in enumerate(rows, 1):
+                writer.writerow(['' if value is None else value for value in row])
+                if index % EXPORT_CHUNK_SIZE == 0:
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode()
+        return chunks()
+
+    @api.model
+    def _export_xlsx_chunks(self, filters=None):
+        """Return a generator streaming the export as XLSX.
+
+        xlsxwriter's constant memory mode flushes every row to a temporary
+        file, which is then streamed and removed.
+        """
+        if xlsxwriter is None:
+            raise ImportError("The xlsxwriter library is required for XLSX exports")
+        rows = self._export_rows(filters)
+
+        def chunks():
+            fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='swap_report_')
+            os.close(fd)
+            try:
+                workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+                sheet = workbook.add_worksheet('Swap Report')
+                for row_index, row in enumerate(rows):
+                    sheet.write_row(row_index, 0, row)
+                workbook.close()
+                with open(path, 'rb') as export_file:
+                    while True:
+                        data = export_file.read(EXPORT_FILE_CHUNK)
+                        if not data:
+                            break
+                        yield data
+            finally:
+                os.unlink(path)
+        return chunks()
 
     @api.model
     def export_report_data(self, filters=None):
@@ -166,13 +476,13 @@ class SwapReport(models.Model):
             if filters.get('date_to'):
                 domain.append(('requested_date', '<=', filters['date_to']))
             if filters.get('skill_category'):
-                domain.append('|',
-                              ('requester_skill_category', '=', filters['skill_category']),
-                              ('provider_skill_category', '=', filters['skill_category']))
+                domain += ['|',
+                           ('requester_skill_category', '=', filters['skill_category']),
+                           ('provider_skill_category', '=', filters['skill_category'])]
 
         records = self.search(domain)
         return records.read([
             'request_name', 'requester_id', 'provider_id', 'state',
             'requester_skill_name', 'provider_skill_name',
             'requested_date', 'completion_date', 'rating'
-        ])
\ No newline at end of file
+        ])
@@ -0,0 +1,123 @@
+from odoo import models, fields, api, exceptions, tools
+
+TREND_GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+
+# Rollup columns and their contribution of one swap_report row
+_TREND_MEASURES = [
+    ('created_count', "COUNT(*)"),
+    ('accepted_count', "COUNT(*) FILTER (WHERE state IN ('accepted', 'completed'))"),
+    ('completed_count', "COUNT(*) FILTER (WHERE state = 'completed')"),
+    ('cancelled_count', "COUNT(*) FILTER (WHERE state = 'cancelled')"),
+    ('rating_sum', "COALESCE(SUM(rating), 0)"),
+    ('rating_count', "COUNT(rating)"),
+]
+
+
+class SwapTrend(models.Model):
+    """Daily rollup of the swap requests, per category of the requested skill.
+
+    Requests are counted on the day they were made, with their current
+    state, so a row tells how that day's requests turned out. Rows are
+    kept up to date by swap.report, which subtracts the contribution of the
+    report rows it is about to recompute and adds the new one, so trends at
+    any granularity re-aggregate a few rows per day instead of the requests.
+    """
+    _name = 'swap.trend'
+    _description = 'Skill Swap Daily Trend'
+    _order = 'day desc, category_id'
+    _log_access = False
+    _rec_name = 'day'
+
+    day = fields.Date(string='Day', required=True)
+    category_id = fields.Many2one('skill.category', string='Category', ondelete='set null')
+    created_count = fields.Integer(string='Requests', default=0)
+    accepted_count = fields.Integer(string='Accepted', default=0)
+    completed_count = fields.Integer(string='Completed', default=0)
+    cancelled_count = fields.Integer(string='Cancelled', default=0)
+    rating_sum = fields.Float(string='Rating Sum', default=0.0)
+    rating_count = fields.Integer(string='Ratings', default=0)
+
+    def init(self):
+        super().init()
+        # one row per day and category, a NULL category included
+        tools.create_unique_index(self.env.cr, 'swap_trend_day_category_uniq', self._table,
+                                  ['day', 'COALESCE(category_id, 0)'])
+        self.env.cr.execute("SELECT NOT EXISTS (SELECT 1 FROM swap_trend)")
+        if self.env.cr.fetchone()[0]:
+            self.pool.post_init(self.rebuild)
+
+    @api.model
+    def _apply_report_rows(self, request_ids, sign):
+        """Add (``sign=1``) or subtract (``sign=-1``) the report rows of the given requests.
+
+        Returns the days whose rows were touched.
+        """
+        columns = [name for name, _expr in _TREND_MEASURES]
+        self.env.cr.execute("""
+            INSERT INTO swap_trend AS t (day, category_id, %s)
+            SELECT requested_date, provider_category_id, %s
+              FROM swap_report
+             WHERE id = ANY(%%s) AND requested_date IS NOT NULL
+          GROUP BY requested_date, provider_category_id
+                ON CONFLICT (day, (COALESCE(category_id, 0))) DO UPDATE SET %s
+         RETURNING day
+        """ % (
+            ', '.join(columns),
+            ', '.join('%d * %s' % (sign, expr) for _name, expr in _TREND_MEASURES),
+            ', '.join('%s = t.%s + EXCLUDED.%s' % (name, name, name) for name in columns),
+        ), (list(request_ids),))
+        days = [row[0] for row in self.env.cr.fetchall()]
+        self.invalidate_model()
+        return days
+
+    @api.model
+    def _drop_empty(self, days):
+        """Delete the rows of the given days left without any request."""
+        if days:
+            self.env.cr.execute("DELETE FROM swap_trend WHERE day = ANY(%s) AND created_count <= 0",
+                                (list(set(days)),))
+            self.invalidate_model()
+
+    @api.model
+    def rebuild(self):
+        """Recompute every rollup row from the report table."""
+        self.env.cr.execute("TRUNCATE swap_trend")
+        self.env.cr.execute("""
+            INSERT INTO swap_trend (day, category_id, %s)
+            SELECT requested_date, provider_category_id, %s
+              FROM swap_report
+             WHERE requested_date IS NOT NULL
+          GROUP BY requested_date, provider_category_id
+        """ % (', '.join(name for name, _expr in _TREND_MEASURES),
+               ', '.join(expr for _name, expr in _TREND_MEASURES)))
+        self.invalidate_model()
+        return True
+
+    @api.model
+    def get_trends(self, granularity='month', date_from=None, date_to=None, category_id=None):
+        """Swap trends per ``granularity`` bucket between two dates, oldest first."""
+        if granularity not in TREND_GRANULARITIES:
+            raise exceptions.UserError("Unknown granularity: %s" % granularity)
+        conditions, params = [], [granularity]
+        if date_from:
+            conditions.append("day >= %s")
+            params.append(fields.Date.to_date(date_from))
+        if date_to:
+            conditions.append("day <= %s")
+            params.append(fields.Date.to_date(date_to))
+        if category_id:
+            conditions.append("category_id = %s")
+            params.append(int(category_id))
+        self.env.cr.execute("""
+            SELECT DATE_TRUNC(%%s, day)::date AS period,
+                   SUM(created_count) AS total_requests,
+                   SUM(accepted_count) AS accepted_count,
+                   SUM(completed_count) AS completed_count,
+                   SUM(cancelled_count) AS cancelled_count,
+                   SUM(rating_sum) / NULLIF(SUM(rating_count), 0) AS avg_rating
+              FROM swap_trend
+              %s
+          GROUP BY 1
+          ORDER BY 1
+        """ % ('WHERE ' + ' AND '.join(conditions) if conditions else ''), params)
+        return self.env.cr.dictfetchall()
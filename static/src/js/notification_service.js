@@ -0,0 +1,30 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { session } from "@web/session";
+
+/**
+ * Relay the skill swap notifications pushed on the bus to skill_swap.js,
+ * as a ``skill_swap:notification`` DOM event carrying the feed event, and
+ * the bus reconnections as ``skill_swap:reconnect``.
+ */
+export const skillSwapNotificationService = {
+    dependencies: ["bus_service"],
+
+    start(env, { bus_service }) {
+        if (session.is_website_user) {
+            // public visitors have no feed
+            return;
+        }
+        bus_service.subscribe("skill_swap/notification", (notification) => {
+            document.dispatchEvent(new CustomEvent("skill_swap:notification", { detail: notification }));
+        });
+        // events sent while disconnected are caught up from the feed
+        bus_service.addEventListener("reconnect", () => {
+            document.dispatchEvent(new CustomEvent("skill_swap:reconnect"));
+        });
+        bus_service.start();
+    },
+};
+
+registry.category("services").add("skill_swap_notification", skillSwapNotificationService);
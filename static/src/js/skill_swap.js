@@ -26,6 +26,7 @@ const SkillSwapPlatform = {
         this.initModals();
         this.initAnimations();
         this.initFormValidation();
+        this.initNotifications();
     },
 
     /**
@@ -445,6 +446,47 @@ const SkillSwapPlatform = {
             })
         })
         .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                this.showAlert(`Swap request ${status} successfully!`, 'success');
+                button.textContent = status.charAt(0).toUpperCase() + status.slice(1);
+                button.classList.add(status === 'accepted' ? 'btn-success' : 'btn-danger');
+
+                // Update status badge
+                const statusBadge = button.closest('.skill-card').querySelector('.swap-status');
+                if (statusBadge) {
+                    statusBadge.textContent = status;
+                    statusBadge.className = `swap-status ${status}`;
+                }
+            } else {
+                throw new Error(data.message || 'Failed to update status');
+            }
+        })
+        .catch(error => {
+            console.error('Error updating swap status:', error);
+            this.showAlert('Failed to update swap status. Please try again.', 'danger');
+            button.textContent = originalText;
+            button.disabled = false;
+        });
+    },
+
+    /**
+     * Handle profile update
+     */
+    handleProfileUpdate: function(event) {
+        event.preventDefault();
+
+        const form = event.target.closest('form');
+        const formData = new FormData(form);
+
+        fetch('/skill_swap/update_profile', {
+            method: 'POST',
+            body: formData,
+            headers: {
+                'X-CSRFToken': this.getCSRFToken()
+            }
+        })
+        .then(response => response.json())
         .then(data => {
             if (data.success) {
                 this.showAlert('Profile updated successfully!', 'success');
@@ -840,22 +882,56 @@ const SkillSwapPlatform = {
             }
         }
 
-        // Check for new notifications periodically
-        setInterval(() => {
-            this.checkNotifications();
-        }, 30000); // Check every 30 seconds
+        // Live events come from the bus, relayed by the skill_swap_notification service.
+        // The feed catches up on the events missed while no page was open or the bus was down.
+        const storedCursor = window.localStorage.getItem('skill_swap.notification_cursor');
+        this.notificationCursor = storedCursor ? parseInt(storedCursor) : null;
+        document.addEventListener('skill_swap:notification', event => {
+            if (this.notificationCursor !== null && event.detail.id <= this.notificationCursor) {
+                return;
+            }
+            this.showNotifications([event.detail]);
+            this.setNotificationCursor(event.detail.id);
+        });
+        document.addEventListener('skill_swap:reconnect', () => this.checkNotifications());
+        this.checkNotifications();
     },
 
     /**
-     * Check for new notifications
+     * Remember the last seen notification, across pages
+     */
+    setNotificationCursor: function(cursor) {
+        this.notificationCursor = Math.max(this.notificationCursor || 0, cursor);
+        window.localStorage.setItem('skill_swap.notification_cursor', this.notificationCursor);
+    },
+
+    /**
+     * Fetch the notifications missed since the last cursor, without waiting for new ones
      */
     checkNotifications: function() {
-        fetch('/skill_swap/notifications')
-            .then(response => response.json())
+        const params = new URLSearchParams();
+        if (this.notificationCursor !== null) {
+            params.set('after', this.notificationCursor);
+        }
+        return fetch('/skill_swap/notifications?' + params.toString(), {credentials: 'same-origin'})
+            .then(response => {
+                if (response.redirected) {
+                    // not logged in, there is no feed
+                    return null;
+                }
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.json();
+            })
             .then(data => {
+                if (!data) {
+                    return;
+                }
                 if (data.notifications && data.notifications.length > 0) {
                     this.showNotifications(data.notifications);
                 }
+                this.setNotificationCursor(data.cursor);
             })
             .catch(error => {
                 console.error('Error checking notifications:', error);
@@ -950,45 +1026,4 @@ backToTopBtn.addEventListener('click', () => {
 });
 
 // Export for global access
-window.SkillSwapPlatform = SkillSwapPlatform;(`Swap request ${status} successfully!`, 'success');
-                button.textContent = status.charAt(0).toUpperCase() + status.slice(1);
-                button.classList.add(status === 'accepted' ? 'btn-success' : 'btn-danger');
-
-                // Update status badge
-                const statusBadge = button.closest('.skill-card').querySelector('.swap-status');
-                if (statusBadge) {
-                    statusBadge.textContent = status;
-                    statusBadge.className = `swap-status ${status}`;
-                }
-            } else {
-                throw new Error(data.message || 'Failed to update status');
-            }
-        })
-        .catch(error => {
-            console.error('Error updating swap status:', error);
-            this.showAlert('Failed to update swap status. Please try again.', 'danger');
-            button.textContent = originalText;
-            button.disabled = false;
-        });
-    },
-
-    /**
-     * Handle profile update
-     */
-    handleProfileUpdate: function(event) {
-        event.preventDefault();
-
-        const form = event.target.closest('form');
-        const formData = new FormData(form);
-
-        fetch('/skill_swap/update_profile', {
-            method: 'POST',
-            body: formData,
-            headers: {
-                'X-CSRFToken': this.getCSRFToken()
-            }
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                this.showAlert
\ No newline at end of file
+window.SkillSwapPlatform = SkillSwapPlatform;
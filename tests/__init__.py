@@ -0,0 +1,7 @@
+from . import test_benchmark
+from . import test_controllers
+from . import test_counter_mixin
+from . import test_keyset
+from . import test_rate_limit
+from . import test_swap_booking
+from . import test_swap_request
@@ -0,0 +1,46 @@
+from odoo import Command
+from odoo.tests import TransactionCase
+
+
+class SkillSwapCommon(TransactionCase):
+    """Two skill swap users, each offering one skill of a shared category."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group_user = cls.env.ref('skill_swap_platform.group_skill_swap_user')
+        cls.user_alice = cls._create_user('alice')
+        cls.user_bob = cls._create_user('bob')
+        cls.category = cls.env['skill.category'].create({'name': 'Test Languages'})
+        cls.skill_alice = cls._create_skill(cls.user_alice, 'Spanish')
+        cls.skill_bob = cls._create_skill(cls.user_bob, 'Guitar')
+
+    @classmethod
+    def _create_user(cls, login, groups=None):
+        return cls.env['res.users'].with_context(no_reset_password=True).create({
+            'name': login.capitalize(),
+            'login': 'skill_swap_%s' % login,
+            'password': 'skill_swap_%s' % login,
+            'email': '%s@example.com' % login,
+            'groups_id': [Command.set((groups or cls.group_user).ids)],
+        })
+
+    @classmethod
+    def _create_skill(cls, user, name, **vals):
+        return cls.env['user.skill'].create(dict({
+            'user_id': user.id,
+            'skill_name': name,
+            'category_id': cls.category.id,
+            'skill_level': 'expert',
+            'is_offered': True,
+        }, **vals))
+
+    def _request_vals(self, requester_skill=None, provider_skill=None, **vals):
+        requester_skill = requester_skill or self.skill_alice
+        provider_skill = provider_skill or self.skill_bob
+        return dict({
+            'requester_id': requester_skill.user_id.id,
+            'provider_id': provider_skill.user_id.id,
+            'requester_skill_id': requester_skill.id,
+            'provider_skill_id': provider_skill.id,
+        }, **vals)
@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from odoo import fields, exceptions
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import split_every
+
+from ..controllers.serializers import (
+    SKILL_SERIALIZER, CATEGORY_SERIALIZER, REQUEST_SERIALIZER, MATCH_SERIALIZER, REPUTATION_SERIALIZER,
+)
+from ..models.bulk_import import IMPORT_CONTEXT
+
+_logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+DEFAULT_SCALE = 10000
+DEFAULT_SEED = 42
+DEFAULT_REPEAT = 5
+# tables analyzed once the data set is generated
+ANALYZED_TABLES = [
+    'res_users', 'skill_category', 'user_skill', 'swap_request', 'swap_rating', 'swap_report', 'swap_trend',
+    'swap_match', 'swap_user_reputation', 'skill_canonical', 'swap_booking', 'swap_notification_event',
+]
+
+SKILL_NAMES = [
+    'Python', 'JavaScript', 'Rust', 'SQL', 'Data Analysis', 'Machine Learning', 'Web Design', 'Photography',
+    'Video Editing', 'Guitar', 'Piano', 'Singing', 'Drawing', 'Painting', 'Cooking', 'Baking', 'Yoga',
+    'Running Coaching', 'Chess', 'Public Speaking', 'Copywriting', 'Spanish', 'French', 'German', 'Japanese',
+    'Mandarin', 'Accounting', 'Excel', 'Marketing', 'SEO', 'Gardening', 'Woodworking', 'Knitting', 'Sewing',
+    'Car Repair', 'Plumbing', 'Electronics', '3D Printing', 'Graphic Design', 'UX Research', 'Negotiation',
+    'Meditation', 'Calligraphy', 'Pottery', 'Dance', 'Swimming', 'Tennis', 'Climbing', 'Sign Language',
+]
+LOCATIONS = [
+    'Ahmedabad', 'Mumbai', 'Pune', 'Bangalore', 'Delhi', 'Chennai', 'Kolkata', 'Hyderabad', 'Jaipur',
+    'Surat', 'London', 'Berlin', 'Paris', 'New York', 'Toronto', 'Sydney', 'Singapore', 'Remote',
+]
+# (state, weight) of generated swap requests
+REQUEST_STATES = [('pending', 25), ('accepted', 15), ('completed', 40), ('rejected', 10), ('cancelled', 10)]
+
+
+def generate(env, scale=DEFAULT_SCALE, seed=DEFAULT_SEED):
+    """Create a synthetic data set, return the number of rows per model.
+
+    ``scale`` is the number of ``user.skill`` rows; users, categories,
+    requests and ratings are derived from it with fixed ratios, and the same
+    ``seed`` always produces the same data.
+    """
+    rng = random.Random(seed)
+    env = env(context=dict(env.context, **IMPORT_CONTEXT, no_reset_password=True))
+    n_users = max(10, scale // 4)
+    n_categories = max(10, scale // 5000)
+
+    categories = env['skill.category'].create([
+        {'name': 'Bench %s Category %s' % (seed, index)} for index in range(n_categories)
+    ])
+
+    group = env.ref('skill_swap_platform.group_skill_swap_user')
+    user_ids = []
+    for batch in split_every(BATCH_SIZE, range(n_users)):
+        user_ids += env['res.users'].create([{
+            'name': 'Bench User %s' % index,
+            'login': 'bench_%s_%s' % (seed, index),
+            'groups_id': [(6, 0, group.ids)],
+        } for index in batch]).ids
+        env.invalidate_all()
+
+    offered = {}
+    skill_count = 0
+    for batch in split_every(BATCH_SIZE, range(scale)):
+        vals_list = []
+        for _index in batch:
+            is_offered = rng.random() < 0.6
+            vals_list.append({
+                'user_id': rng.choice(user_ids),
+                'skill_name': rng.choice(SKILL_NAMES),
+                'category_id': rng.choice(categories.ids),
+                'skill_level': rng.choice(['beginner', 'intermediate', 'advanced', 'expert']),
+                'description': 'Happy to share what I know about %s.' % rng.choice(SKILL_NAMES),
+                'is_offered': is_offered,
+                'is_wanted': not is_offered or rng.random() < 0.2,
+                'availability': rng.choice(['weekdays', 'weekends', 'evenings', 'flexible']),
+                'location': rng.choice(LOCATIONS),
+                'is_public': rng.random() < 0.9,
+            })
+        skills = env['user.skill'].create(vals_list)
+        for skill, vals in zip(skills.ids, vals_list):
+            if vals['is_offered']:
+                offered.setdefault(vals['user_id'], []).append(skill)
+        skill_count += len(skills)
+        env.invalidate_all()
+
+    providers = list(offered)
+    states, weights = zip(*REQUEST_STATES)
+    now = fields.Datetime.now()
+    seen = set()
+    request_ids = []
+    completed = []
+    for batch in split_every(BATCH_SIZE, range(scale // 2)):
+        vals_list = []
+        for _index in batch:
+            requester, provider = rng.sample(providers, 2)
+            key = (requester, provider, rng.choice(offered[requester]), rng.choice(offered[provider]))
+            if key in seen:
+                continue
+            seen.add(key)
+            state = rng.choices(states, weights)[0]
+            requested = now - timedelta(days=rng.randint(0, 3 * 365), minutes=rng.randint(0, 1440))
+            vals_list.append({
+                'requester_id': key[0],
+                'provider_id': key[1],
+                'requester_skill_id': key[2],
+                'provider_skill_id': key[3],
+                'state': state,
+                'message': 'Would you like to swap?',
+                'requested_date': requested,
+                'response_date': requested + timedelta(days=rng.randint(0, 10)) if state != 'pending' else False,
+                'completion_date': requested + timedelta(days=rng.randint(10, 60)) if state == 'completed' else False,
+                'estimated_duration': rng.choice([1.0, 1.5, 2.0, 3.0]),
+            })
+        swap_requests = env['swap.request'].create(vals_list)
+        request_ids += swap_requests.ids
+        completed += [(request_id, vals['requester_id'], vals['provider_id'])
+                      for request_id, vals in zip(swap_requests.ids, vals_list) if vals['state'] == 'completed']
+        env.invalidate_all()
+    seen.clear()
+
+    rating_count = 0
+    for batch in split_every(BATCH_SIZE, completed):
+        vals_list = []
+        for request_id, requester_id, provider_id in batch:
+            if rng.random() < 0.6:
+                vals_list.append({
+                    'swap_request_id': request_id,
+                    'rater_id': requester_id,
+                    'rated_user_id': provider_id,
+                    'rating': str(rng.choices('12345', [3, 5, 15, 37, 40])[0]),
+                    'comment': 'Great swap!',
+                    'state': rng.choice(['draft', 'approved', 'approved', 'approved']),
+                })
+        rating_count += len(env['swap.rating'].create(vals_list))
+        env.invalidate_all()
+
+    return {
+        'skill.category': len(categories),
+        'res.users': len(user_ids),
+        'user.skill': skill_count,
+        'swap.request': len(request_ids),
+        'swap.rating': rating_count,
+    }
+
+
+class _Rollback(Exception):
+    """Raised to undo a scenario that writes."""
+
+
+@tagged('-standard', 'post_install', '-at_install', 'skill_swap_benchmark')
+class TestSkillSwapBenchmark(TransactionCase):
+    """Timed scenarios of the skill swap hot paths over a seeded data set.
+
+    Excluded from the standard run; select it with its tag::
+
+        odoo-bin -d bench -i skill_swap_platform --test-tags skill_swap_benchmark --stop-after-init
+
+    The ``SKILL_SWAP_BENCH_SCALE``, ``SKILL_SWAP_BENCH_SEED`` and
+    ``SKILL_SWAP_BENCH_REPEAT`` environment variables tune the run, and the
+    JSON results are logged and written to ``SKILL_SWAP_BENCH_OUTPUT`` when
+    set, so runs at different scales or commits can be compared. The data
+    set is rolled back with the test transaction, hence the report export,
+    which reads through a cursor of its own, is not timed.
+    """
+
+    def _scenarios(self, user):
+        """Return ``{name: callable}``, the callables run as ``user`` where it matters."""
+        rng = random.Random(0)
+        UserSkill = self.env['user.skill'].with_user(user)
+        Report = self.env['swap.report']
+        SwapRequest = self.env['swap.request'].with_user(user)
+        own_skill = UserSkill.search([('user_id', '=', user.id), ('is_offered', '=', True)], limit=1)
+        other_skill = UserSkill.search([('user_id', '!=', user.id), ('is_offered', '=', True),
+                                        ('is_public', '=', True)], limit=1)
+        pending = SwapRequest.search([('provider_id', '=', user.id), ('state', '=', 'pending')], limit=1)
+
+        def wizard_create():
+            wizard = self.env['swap.request.wizard'].with_user(user).sudo().create({
+                'requester_skill_id': own_skill.id,
+                'provider_skill_id': other_skill.id,
+                'message': 'Benchmark',
+                'meeting_type': 'online',
+                'estimated_duration': 1.0,
+            })
+            try:
+                with self.env.cr.savepoint():
+                    wizard.action_create_request()
+                    raise _Rollback()
+            except (_Rollback, exceptions.ValidationError):
+                pass
+
+        def wizard_respond():
+            wizard = self.env['swap.request.response.wizard'].with_user(user).sudo().create({
+                'request_id': pending.id,
+                'action_type': 'accept',
+                'response_message': 'Sure',
+            })
+            try:
+                with self.env.cr.savepoint():
+                    wizard.action_respond()
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+        scenarios = {
+            'search_skills.substring': lambda: UserSkill.search_skills(
+                skill_name=rng.choice(SKILL_NAMES)[:4], is_offered=True, limit=50),
+            'search_skills.fulltext': lambda: UserSkill.search_skills(
+                skill_name=rng.choice(SKILL_NAMES), mode='fulltext', limit=50),
+            'search_skills.location': lambda: UserSkill.search_skills(location=rng.choice(LOCATIONS), limit=50),
+            'search_skills.nearest': lambda: UserSkill.search_skills(
+                near=rng.choice(LOCATIONS), radius_km=250, sort='distance', limit=50),
+            'api.skills_search': lambda: SKILL_SERIALIZER.serialize(UserSkill.search_skills_page(
+                skill_name=rng.choice(SKILL_NAMES)[:4], limit=50, with_count=True,
+                exclude_user_id=user.id)['records']),
+            'api.skills_search.reputation': lambda: SKILL_SERIALIZER.serialize(UserSkill.search_skills_page(
+                limit=50, sort='reputation', exclude_user_id=user.id)['records']),
+            'api.matches': lambda: MATCH_SERIALIZER.serialize(
+                self.env['swap.match'].with_user(user).get_top_matches(user.id, 10)),
+            'api.categories': lambda: CATEGORY_SERIALIZER.search(
+                self.env['skill.category'].with_user(user), [('active', '=', True)]),
+            'api.my_requests': lambda: REQUEST_SERIALIZER.serialize(SwapRequest._inbox(limit=50)[0]),
+            'api.leaderboard': lambda: REPUTATION_SERIALIZER.serialize(
+                self.env['swap.user.reputation'].with_user(user).get_leaderboard(20)[0]),
+            'api.notifications': lambda: self.env['swap.notification.event'].with_user(user)._feed(0),
+            'portal.home_counters': lambda: user.read(['skill_total_count', 'swap_request_count']),
+            'portal.my_skills': lambda: UserSkill._keyset_search(
+                [('user_id', '=', user.id)], order='create_date desc', limit=20),
+            'portal.my_skill_requests': lambda: SwapRequest._inbox(limit=20),
+            'portal.home_requests_to_answer': lambda: SwapRequest._inbox_count(
+                'received', states=['pending'], expired=False),
+            'portal.browse': lambda: UserSkill.search_skills_page(limit=50, exclude_user_id=user.id)['records'].read(
+                ['skill_name', 'user_id', 'category_id', 'location']),
+            'report.get_swap_statistics': Report.get_swap_statistics,
+            'report.get_top_skills': Report.get_top_skills,
+            'report.get_dashboard': Report.get_dashboard,
+            'report.get_user_activity': lambda: Report.get_user_activity(user.id),
+            'report.get_monthly_trends': Report.get_monthly_trends,
+            'report.get_trends.5y_weekly': lambda: Report.get_trends(
+                'week', date_from=fields.Date.today() - timedelta(days=5 * 365)),
+        }
+        if own_skill and other_skill:
+            scenarios['wizard.create_request'] = wizard_create
+        if pending:
+            scenarios['wizard.respond'] = wizard_respond
+            scenarios['api.suggest_slots'] = lambda: pending.with_user(user).suggest_slots()
+        return scenarios
+
+    def _time(self, func, repeat):
+        durations, queries = [], []
+        for _run in range(repeat):
+            self.env.flush_all()
+            self.env.invalidate_all()
+            count = self.env.cr.sql_log_count
+            start = time.perf_counter()
+            func()
+            self.env.flush_all()
+            durations.append((time.perf_counter() - start) * 1000)
+            queries.append(self.env.cr.sql_log_count - count)
+        return {
+            'runs': repeat,
+            'min_ms': round(min(durations), 3),
+            'median_ms': round(statistics.median(durations), 3),
+            'max_ms': round(max(durations), 3),
+            'queries': max(queries),
+        }
+
+    def test_benchmark(self):
+        scale = int(os.environ.get('SKILL_SWAP_BENCH_SCALE') or DEFAULT_SCALE)
+        seed = int(os.environ.get('SKILL_SWAP_BENCH_SEED') or DEFAULT_SEED)
+        repeat = int(os.environ.get('SKILL_SWAP_BENCH_REPEAT') or DEFAULT_REPEAT)
+
+        start = time.perf_counter()
+        counts = generate(self.env, scale, seed)
+        self.env.flush_all()
+        generation = time.perf_counter() - start
+        self.env.cr.execute("ANALYZE %s" % ', '.join(ANALYZED_TABLES))
+        user = self.env['res.users'].search([('login', '=like', 'bench_%s_%%' % seed),
+                                             ('skill_offered_count', '>', 0)], limit=1)
+        self.assertTrue(user, "The generated data set has no user offering a skill")
+
+        results = {}
+        for name, func in self._scenarios(user).items():
+            results[name] = self._time(func, repeat)
+            _logger.info("Benchmark %s: %s", name, results[name])
+        report = json.dumps({
+            'scale': scale,
+            'seed': seed,
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'rows': counts,
+            'generation_seconds': round(generation, 3),
+            'scenarios': results,
+        }, indent=2, sort_keys=True)
+        _logger.info("Benchmark results:\n%s", report)
+        output = os.environ.get('SKILL_SWAP_BENCH_OUTPUT')
+        if output:
+            with open(output, 'w') as output_file:
+                output_file.write(report)
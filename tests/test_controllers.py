@@ -0,0 +1,150 @@
+import json
+
+from odoo.tests import HttpCase, tagged
+
+from .common import SkillSwapCommon
+from ..tools.keyset import encode_cursor
+
+
+@tagged('post_install', '-at_install')
+class TestSkillSwapRoutes(HttpCase, SkillSwapCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_manager = cls._create_user(
+            'manager', groups=cls.env.ref('skill_swap_platform.group_skill_swap_manager'))
+        cls.env['swap.user.reputation']._apply_ratings({(cls.user_bob.id, 5): 2, (cls.user_bob.id, 4): 1})
+
+    def _get_json(self, url, **headers):
+        response = self.url_open(url, headers=headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response, response.json()
+
+    # JSON API
+
+    def test_create_request(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        params = {'provider_skill_id': self.skill_bob.id, 'requester_skill_id': self.skill_alice.id}
+        result = self.make_jsonrpc_request('/skill_swap/api/request/create', params)
+        self.assertTrue(result.get('success'), result)
+        swap_request = self.env['swap.request'].browse(result['request_id'])
+        self.assertEqual(swap_request.provider_id, self.user_bob)
+
+        duplicate = self.make_jsonrpc_request('/skill_swap/api/request/create', params)
+        self.assertIn('error', duplicate)
+        self.assertEqual(duplicate['request_id'], swap_request.id)
+
+        self.assertIn('error', self.make_jsonrpc_request('/skill_swap/api/request/create', {}))
+
+    def test_create_request_rate_limited(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('skill_swap.rate_limit_user_burst', 1)
+        ICP.set_param('skill_swap.rate_limit_user_per_minute', 0.001)
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        params = {'provider_skill_id': self.skill_bob.id, 'requester_skill_id': self.skill_alice.id}
+        self.assertTrue(self.make_jsonrpc_request('/skill_swap/api/request/create', params).get('success'))
+        result = self.make_jsonrpc_request('/skill_swap/api/request/create', params)
+        self.assertGreater(result.get('retry_after', 0), 0)
+
+    def test_search_skills(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        result = self.make_jsonrpc_request('/skill_swap/api/skills/search', {'skill_name': 'Guitar'})
+        self.assertIn(self.skill_bob.id, [skill['id'] for skill in result['skills']])
+        self.assertNotIn(self.skill_alice.id, [skill['id'] for skill in result['skills']])
+        result = self.make_jsonrpc_request('/skill_swap/api/skills/search', {'cursor': 'not a cursor'})
+        self.assertEqual(result, {'error': 'Invalid cursor'})
+
+    def test_categories_etag(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        response, payload = self._get_json('/skill_swap/api/categories')
+        self.assertIn(self.category.id, [category['id'] for category in payload['categories']])
+        etag = response.headers['ETag']
+        response = self.url_open('/skill_swap/api/categories', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+
+    def test_my_requests(self):
+        swap_request = self.env['swap.request'].create(self._request_vals())
+        self.authenticate('skill_swap_bob', 'skill_swap_bob')
+        _response, payload = self._get_json('/skill_swap/api/my_requests?box=received&limit=1')
+        self.assertEqual([item['id'] for item in payload['requests']], swap_request.ids)
+        self.assertIsNone(payload['next_cursor'])
+
+        for query in ('box=trash', 'limit=many', 'cursor=not-a-cursor',
+                      'cursor=%s' % encode_cursor(['not a date', swap_request.id])):
+            with self.subTest(query=query):
+                response = self.url_open('/skill_swap/api/my_requests?%s' % query)
+                self.assertEqual(response.status_code, 400)
+
+    def test_leaderboard(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        _response, payload = self._get_json('/skill_swap/api/leaderboard?limit=100')
+        self.assertIn(self.user_bob.id, [user['user_id'] for user in payload['users']])
+        for cursor in ('not-a-cursor', encode_cursor(['high', 1]), encode_cursor([True, 1])):
+            with self.subTest(cursor=cursor):
+                response = self.url_open('/skill_swap/api/leaderboard?cursor=%s' % cursor)
+                self.assertEqual(response.status_code, 400)
+
+    def test_notifications(self):
+        self.authenticate('skill_swap_bob', 'skill_swap_bob')
+        _response, payload = self._get_json('/skill_swap/notifications')
+        self.assertEqual(payload['notifications'], [])
+        cursor = payload['cursor']
+        self.env['swap.request'].create(self._request_vals())
+        _response, payload = self._get_json('/skill_swap/notifications?after=%s' % cursor)
+        self.assertTrue(payload['notifications'])
+        self.assertGreater(payload['cursor'], cursor)
+        self.assertEqual(self.url_open('/skill_swap/notifications?after=x').status_code, 400)
+
+    def test_dashboard(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        self.assertEqual(self.url_open('/skill_swap/api/dashboard').status_code, 403)
+        self.authenticate('skill_swap_manager', 'skill_swap_manager')
+        self._get_json('/skill_swap/api/dashboard')
+
+    # Portal pages
+
+    def test_browse_skills(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        response = self.url_open('/skills/browse?skill_name=Guitar')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Guitar', response.text)
+        self.assertIn('(3 ratings)', response.text)
+        self.assertNotIn('Spanish', response.text)
+
+    def test_skill_detail(self):
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        response = self.url_open('/skill/%s' % self.skill_bob.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Guitar', response.text)
+        self.assertIn('completed swaps', response.text)
+
+        response = self.url_open('/skill/%s' % self.skill_alice.id, allow_redirects=False)
+        self.assertEqual(response.status_code, 200)
+        response = self.url_open('/skill/0', allow_redirects=False)
+        self.assertEqual(response.status_code, 303)
+
+    def test_my_pages(self):
+        swap_request = self.env['swap.request'].create(self._request_vals())
+        self.authenticate('skill_swap_alice', 'skill_swap_alice')
+        for url in ('/my/skills', '/my/skill_requests', '/my/skill_requests/%s' % swap_request.id, '/my/matches'):
+            with self.subTest(url=url):
+                self.assertEqual(self.url_open(url).status_code, 200)
+        self.assertIn('Spanish', self.url_open('/my/skills').text)
+        self.assertIn(swap_request.name, self.url_open('/my/skill_requests').text)
+
+    # Export
+
+    def test_export_csv(self):
+        swap_request = self.env['swap.request'].create(self._request_vals())
+        self.authenticate('skill_swap_manager', 'skill_swap_manager')
+        response = self.url_open('/skill_swap/report/export?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/csv'))
+        self.assertIn('swap_report.csv', response.headers['Content-Disposition'])
+        lines = response.text.splitlines()
+        self.assertTrue(lines[0].startswith('Reference,Requester,Provider,Status'))
+        self.assertTrue(any(line.startswith(swap_request.name + ',') for line in lines[1:]))
+
+        self.assertEqual(self.url_open('/skill_swap/report/export?date_from=yesterday').status_code, 400)
@@ -0,0 +1,36 @@
+from .common import SkillSwapCommon
+
+
+class TestCounterMixin(SkillSwapCommon):
+
+    def test_counters_follow_writes(self):
+        self.assertEqual(self.user_alice.skill_total_count, 1)
+        self.assertEqual(self.user_alice.skill_offered_count, 1)
+        self.assertEqual(self.category.skill_count, 2)
+
+        self.skill_alice.write({'is_offered': False, 'is_wanted': True})
+        self.assertEqual(self.user_alice.skill_offered_count, 0)
+        self.assertEqual(self.user_alice.skill_wanted_count, 1)
+
+        self.skill_bob.unlink()
+        self.assertEqual(self.user_bob.skill_total_count, 0)
+        self.assertEqual(self.category.skill_count, 1)
+
+    def test_repair(self):
+        self.env.flush_all()
+        self.cr.execute("UPDATE res_users SET skill_total_count = 42 WHERE id = %s", [self.user_alice.id])
+        self.cr.execute("UPDATE skill_category SET skill_count = NULL WHERE id = %s", [self.category.id])
+        self.env.invalidate_all()
+
+        self.assertGreaterEqual(self.env['user.skill']._counter_repair(), 2)
+        self.assertEqual(self.user_alice.skill_total_count, 1)
+        self.assertEqual(self.category.skill_count, 2)
+        self.assertEqual(self.env['user.skill']._counter_repair(), 0)
+
+    def test_request_counters(self):
+        swap_request = self.env['swap.request'].create(self._request_vals())
+        self.assertEqual(self.user_bob.swap_open_count, 1)
+        swap_request.action_accept()
+        swap_request.action_complete()
+        self.assertEqual(self.user_bob.swap_open_count, 0)
+        self.assertEqual(self.user_bob.swap_completed_count, 1)
@@ -0,0 +1,56 @@
+import base64
+
+from .common import SkillSwapCommon
+from ..tools.keyset import decode_cursor, encode_cursor
+
+
+class TestKeysetCursor(SkillSwapCommon):
+
+    def test_round_trip(self):
+        values = ['2030-01-07 10:00:00', 42]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_tampered_cursor(self):
+        for token in (
+            'not a cursor',
+            base64.urlsafe_b64encode(b'{"id": 42}').decode(),
+            encode_cursor(['2030-01-07 10:00:00']),
+            encode_cursor(['2030-01-07 10:00:00', '42']),
+            encode_cursor([1, 2, 3]),
+        ):
+            with self.subTest(token=token), self.assertRaises(ValueError):
+                decode_cursor(token)
+
+    def test_inbox_pages(self):
+        skills = self.skill_alice | self._create_skill(self.user_alice, 'French') \
+            | self._create_skill(self.user_alice, 'German')
+        requests = self.env['swap.request'].create([self._request_vals(skill) for skill in skills])
+        SwapRequest = self.env['swap.request'].with_user(self.user_bob)
+
+        seen, cursor = [], None
+        for _page in range(3):
+            records, cursor = SwapRequest._inbox(box='received', limit=2, cursor=cursor)
+            seen += records.ids
+            if not cursor:
+                break
+        self.assertEqual(seen, sorted(requests.ids, reverse=True))
+        self.assertFalse(SwapRequest.with_user(self.user_alice)._inbox(box='received')[0])
+
+    def test_inbox_tampered_cursor(self):
+        with self.assertRaises(ValueError):
+            self.env['swap.request'].with_user(self.user_bob)._inbox(cursor='not a cursor')
+
+    def test_leaderboard_pages(self):
+        Reputation = self.env['swap.user.reputation']
+        Reputation._apply_ratings({(self.user_alice.id, 5): 3, (self.user_bob.id, 2): 3})
+        reputations = Reputation.search([('user_id', 'in', (self.user_alice | self.user_bob).ids)])
+        self.assertEqual(len(reputations), 2)
+
+        seen, cursor = Reputation.browse(), None
+        while True:
+            records, cursor = Reputation.get_leaderboard(limit=1, cursor=cursor)
+            seen |= records
+            if not cursor:
+                break
+        self.assertLess(seen.ids.index(reputations.filtered(lambda r: r.user_id == self.user_alice).id),
+                        seen.ids.index(reputations.filtered(lambda r: r.user_id == self.user_bob).id))
@@ -0,0 +1,46 @@
+from .common import SkillSwapCommon
+
+
+class TestRateLimit(SkillSwapCommon):
+
+    def setUp(self):
+        super().setUp()
+        # the buckets are updated on a cursor of their own
+        if not self.registry.in_test_mode():
+            self.registry.enter_test_mode(self.cr)
+            self.addCleanup(self.registry.leave_test_mode)
+        self.RateLimit = self.env['skill.swap.rate.limit'].with_user(self.user_alice)
+
+    def _set_limits(self, scope, burst, per_minute):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('skill_swap.rate_limit_%s_burst' % scope, burst)
+        ICP.set_param('skill_swap.rate_limit_%s_per_minute' % scope, per_minute)
+
+    def _tokens(self, key):
+        self.cr.execute("SELECT tokens FROM skill_swap_rate_limit WHERE key = %s", [key])
+        return self.cr.fetchone()[0]
+
+    def test_refused_once_empty(self):
+        self._set_limits('user', 2, 1)
+        self._set_limits('ip', 100, 100)
+        self.assertEqual(self.RateLimit._check_request_creation('10.0.0.1'), 0)
+        self.assertEqual(self.RateLimit._check_request_creation('10.0.0.1'), 0)
+        retry_after = self.RateLimit._check_request_creation('10.0.0.1')
+        # one token a minute
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 60)
+
+    def test_refused_call_is_refunded(self):
+        self._set_limits('user', 5, 0.001)
+        self._set_limits('ip', 1, 0.001)
+        self.assertEqual(self.RateLimit._check_request_creation('10.0.0.2'), 0)
+        self.assertGreater(self.RateLimit._check_request_creation('10.0.0.2'), 0)
+        # the ip bucket refused the second call, the user token it took is given back
+        self.assertAlmostEqual(self._tokens('user:%s' % self.user_alice.id), 4, delta=0.01)
+        self.assertAlmostEqual(self._tokens('ip:10.0.0.2'), 0, delta=0.01)
+
+    def test_disabled_scope(self):
+        self._set_limits('user', 0, 1)
+        self._set_limits('ip', 1, 0.001)
+        self.assertEqual(self.RateLimit._check_request_creation(None), 0)
+        self.assertEqual(self.RateLimit._check_request_creation(None), 0)
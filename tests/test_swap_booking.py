@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import psycopg2
+
+from odoo import exceptions, tools
+from odoo.tools import mute_logger
+
+from .common import SkillSwapCommon
+from ..models.swap_booking import BOOKING_EXCLUSION
+
+
+class TestSwapBooking(SkillSwapCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_carol = cls._create_user('carol')
+        cls.skill_carol = cls._create_skill(cls.user_carol, 'Piano')
+
+    def setUp(self):
+        super().setUp()
+        if not tools.constraint_definition(self.cr, 'swap_booking', BOOKING_EXCLUSION):
+            self.skipTest("btree_gist is not available, double bookings are not excluded by Postgres")
+
+    def _accepted_request(self, requester_skill, scheduled_date=None):
+        return self.env['swap.request'].create(self._request_vals(
+            requester_skill, state='accepted', scheduled_date=scheduled_date, estimated_duration=1.0))
+
+    def test_sessions_are_booked(self):
+        swap_request = self._accepted_request(self.skill_alice, datetime(2030, 1, 7, 10))
+        bookings = self.env['swap.booking'].search([('request_id', '=', swap_request.id)])
+        self.assertEqual(bookings.user_id, self.user_alice | self.user_bob)
+        swap_request.action_complete()
+        self.assertFalse(self.env['swap.booking'].search([('request_id', '=', swap_request.id)]))
+
+    def test_overlap_is_refused(self):
+        self._accepted_request(self.skill_alice, datetime(2030, 1, 7, 10))
+        with self.assertRaises(exceptions.ValidationError), self.cr.savepoint():
+            self._accepted_request(self.skill_carol, datetime(2030, 1, 7, 10, 30))
+        # sessions are half-open ranges, back to back is fine
+        self._accepted_request(self.skill_carol, datetime(2030, 1, 7, 11))
+
+    def test_overlapping_requests_written_together(self):
+        first = self._accepted_request(self.skill_alice)
+        second = self._accepted_request(self.skill_carol)
+        # both are booked at once, only the constraint sees they overlap each other
+        with self.assertRaises(exceptions.ValidationError), self.cr.savepoint():
+            (first | second).write({'scheduled_date': datetime(2030, 1, 7, 10)})
+
+    def test_exclusion_constraint(self):
+        swap_request = self._accepted_request(self.skill_alice, datetime(2030, 1, 7, 10))
+        self.env.flush_all()
+        with self.assertRaises(psycopg2.errors.ExclusionViolation), mute_logger('odoo.sql_db'), \
+                self.cr.savepoint(flush=False):
+            self.cr.execute("""
+                INSERT INTO swap_booking (request_id, user_id, date_start, date_stop)
+                VALUES (%s, %s, '2030-01-07 10:59:00', '2030-01-07 12:00:00')
+            """, [swap_request.id, self.user_bob.id])
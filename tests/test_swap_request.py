@@ -0,0 +1,74 @@
+import psycopg2
+
+from odoo import exceptions, tools
+from odoo.tools import mute_logger
+
+from .common import SkillSwapCommon
+from ..models.swap_request import OPEN_REQUEST_INDEX
+
+
+class TestOpenRequestUniqueness(SkillSwapCommon):
+
+    def test_open_request_index(self):
+        self.assertTrue(tools.index_exists(self.cr, OPEN_REQUEST_INDEX))
+        self.env['swap.request'].create(self._request_vals())
+        with self.assertRaises(psycopg2.errors.UniqueViolation), mute_logger('odoo.sql_db'), self.cr.savepoint():
+            self.env['swap.request'].create(self._request_vals())
+
+    def test_create_or_get_open(self):
+        SwapRequest = self.env['swap.request']
+        first, created = SwapRequest._create_or_get_open(self._request_vals())
+        self.assertTrue(created)
+        self.assertEqual(first.state, 'pending')
+
+        duplicate, created = SwapRequest._create_or_get_open(self._request_vals())
+        self.assertFalse(created)
+        self.assertEqual(duplicate, first)
+
+        # a closed request no longer blocks the same one
+        first.action_reject()
+        second, created = SwapRequest._create_or_get_open(self._request_vals())
+        self.assertTrue(created)
+        self.assertNotEqual(second, first)
+
+    def test_cancel_duplicate_open_requests(self):
+        SwapRequest = self.env['swap.request']
+        # duplicates left by a version without the index, the test transaction restores it
+        self.cr.execute('DROP INDEX %s' % OPEN_REQUEST_INDEX)
+        older = SwapRequest.create(self._request_vals())
+        newer = SwapRequest.create(self._request_vals())
+        message_count = len(newer.message_ids)
+        self.env.flush_all()
+
+        SwapRequest._cancel_duplicate_open_requests()
+        self.env.invalidate_all()
+        self.assertEqual(older.state, 'pending')
+        self.assertEqual(newer.state, 'cancelled')
+        self.assertEqual(len(newer.message_ids), message_count, "The cancellation must not post anything")
+
+
+class TestResponseWizard(SkillSwapCommon):
+
+    def _respond(self, swap_request, action_type):
+        return self.env['swap.request.response.wizard'].create({
+            'request_id': swap_request.id,
+            'action_type': action_type,
+            'response_message': 'See you soon',
+        }).action_respond()
+
+    def test_accept(self):
+        swap_request = self.env['swap.request'].create(self._request_vals())
+        message_count = len(swap_request.message_ids)
+        self._respond(swap_request, 'accept')
+        self.env.invalidate_all()
+        self.assertEqual(swap_request.state, 'accepted')
+        self.assertEqual(swap_request.response_message, 'See you soon')
+        self.assertTrue(swap_request.response_date)
+        self.assertEqual(len(swap_request.message_ids), message_count + 1)
+
+    def test_reject_closed_request(self):
+        swap_request = self.env['swap.request'].create(self._request_vals())
+        swap_request.action_cancel()
+        with self.assertRaises(exceptions.UserError):
+            self._respond(swap_request, 'reject')
+        self.assertEqual(swap_request.state, 'cancelled')
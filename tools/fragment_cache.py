@@ -0,0 +1,120 @@
+"""Per-worker cache of rendered portal fragments.
+
+Fragments are keyed by the records they show and their ``write_date``, so
+a changed record is rendered again on its next hit. Models flagged with
+``_fragment_cache`` (see skill.swap.cache.mixin) also send a NOTIFY with
+the ids they write or delete; every worker drops the fragments depending on
+them as soon as it is delivered, which frees the memory early and covers
+what ``write_date`` does not, such as deletions. Models without the flag,
+such as the partners holding the owners' names, are only keyed by their
+``write_date``: their outdated fragments are never hit again and age out of
+the LRU. Invalidations arrive on the listening connection that tools/notify
+shares between all the channels of a worker.
+
+The rendered markup kept by a worker is bounded by the
+``skill_swap_fragment_cache_mb`` option of the server configuration file;
+the least recently used fragments are evicted first.
+"""
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+from odoo.tools import config
+
+from .notify import get_dispatcher, notify_ids
+
+FRAGMENT_CHANNEL = 'skill_swap_fragment'
+DEFAULT_BUDGET_MB = 32
+
+
+class FragmentCache:
+    """LRU of rendered fragments, bounded in bytes, with a reverse index of their records."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key: (body, dependencies)
+        self._dependents = {}  # (dbname, model, id): keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, body, dependencies):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (body, dependencies)
+            self.size += len(body)
+            for dependency in dependencies:
+                self._dependents.setdefault(dependency, set()).add(key)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, dbname, model, ids):
+        with self._lock:
+            for res_id in ids:
+                for key in self._dependents.pop((dbname, model, res_id), ()):
+                    self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        body, dependencies = entry
+        self.size -= len(body)
+        for dependency in dependencies:
+            keys = self._dependents.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[dependency]
+
+
+_cache = FragmentCache(int(float(config.get('skill_swap_fragment_cache_mb') or DEFAULT_BUDGET_MB) * 1024 * 1024))
+_listening = set()
+_listening_lock = threading.Lock()
+
+
+def _listen(dbname):
+    with _listening_lock:
+        if dbname in _listening:
+            return
+        _listening.add(dbname)
+
+    def invalidate(payload):
+        _cache.invalidate(dbname, payload.get('model'), payload.get('ids') or [])
+    get_dispatcher(dbname, FRAGMENT_CHANNEL).subscribe(invalidate)
+
+
+def notify_changes(records):
+    """Tell every worker that the fragments showing ``records`` are outdated."""
+    if records.ids:
+        notify_ids(records.env.cr, FRAGMENT_CHANNEL, 'ids', records.ids, model=records._name)
+
+
+def render(env, template, values, key, recordsets):
+    """Render ``template``, or return its cached markup.
+
+    ``key`` must identify everything the fragment shows besides the records
+    of ``recordsets``, whose ids and ``write_date`` are added to it and which
+    invalidate it when they are written or deleted.
+    """
+    dbname = env.cr.dbname
+    _listen(dbname)
+    # stamps are metadata: read them whatever the access of the viewer to the records
+    stamps = tuple((record._name, record.id, record.write_date)
+                   for records in recordsets for record in records.sudo())
+    cache_key = (dbname, env.lang, template, tuple(key), stamps)
+    body = _cache.get(cache_key)
+    if body is None:
+        body = str(env['ir.qweb']._render(template, values))
+        _cache.set(cache_key, body, {(dbname, model, res_id) for model, res_id, _date in stamps})
+    return Markup(body)
@@ -0,0 +1,96 @@
+"""Offline geocoding and grid index of the skill locations.
+
+Locations are resolved against the gazetteer bundled in
+``data/gazetteer.csv``, so no request ever leaves the server. Coordinates
+are bucketed into a fixed grid of ``GRID_DEGREES`` cells; a radius search
+only reads the cells overlapping the circle, through the index on the cell
+number, before checking the exact distance.
+"""
+import csv
+import functools
+import math
+import re
+
+from odoo.tools import file_open
+
+GAZETTEER_PATH = 'skill_swap_platform/data/gazetteer.csv'
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GRID_DEGREES = 0.5
+GRID_COLUMNS = int(360 / GRID_DEGREES)
+MAX_RADIUS_KM = 500
+
+_WHITESPACE = re.compile(r'\s+')
+_COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;\s]\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def _place_key(name):
+    return _WHITESPACE.sub(' ', name or '').strip().casefold()
+
+
+@functools.lru_cache(maxsize=1)
+def gazetteer():
+    """Return ``{place key: (latitude, longitude)}`` of the bundled gazetteer."""
+    places = {}
+    with file_open(GAZETTEER_PATH) as f:
+        for row in csv.DictReader(f):
+            coordinates = (float(row['latitude']), float(row['longitude']))
+            places.setdefault(_place_key(row['name']), coordinates)
+            places.setdefault(_place_key('%s %s' % (row['name'], row['country'])), coordinates)
+    return places
+
+
+def geocode(location):
+    """Return the ``(latitude, longitude)`` of a free-text location, or None.
+
+    Accepts explicit ``"lat, lon"`` coordinates, a known place name, or an
+    address whose comma-separated parts contain one (``"Navrangpura,
+    Ahmedabad"``).
+    """
+    if not location:
+        return None
+    match = _COORDINATES.match(location)
+    if match:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return latitude, longitude
+        return None
+    places = gazetteer()
+    key = _place_key(location.replace(',', ' '))
+    if key in places:
+        return places[key]
+    for part in location.split(','):
+        coordinates = places.get(_place_key(part))
+        if coordinates:
+            return coordinates
+    return None
+
+
+def _cell(row, column):
+    # cells are numbered from 1, 0 is what the ORM stores for a missing location
+    return row * GRID_COLUMNS + column + 1
+
+
+def grid_cell(latitude, longitude):
+    """Number of the grid cell containing the given point."""
+    row = min(int((latitude + 90) / GRID_DEGREES), int(180 / GRID_DEGREES) - 1)
+    column = int((longitude + 180) / GRID_DEGREES) % GRID_COLUMNS
+    return _cell(row, column)
+
+
+def grid_cells_within(latitude, longitude, radius_km):
+    """Numbers of the grid cells overlapping the circle around the given point."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_row = max(int((latitude - lat_delta + 90) / GRID_DEGREES), 0)
+    max_row = min(int((latitude + lat_delta + 90) / GRID_DEGREES), int(180 / GRID_DEGREES) - 1)
+    # meridians converge toward the poles, widen the band at the latitude farthest from the equator
+    widest = min(abs(latitude) + lat_delta, 89.9)
+    lon_delta = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    if lon_delta >= 180:
+        columns = range(GRID_COLUMNS)
+    else:
+        first = int((longitude - lon_delta + 180) // GRID_DEGREES)
+        last = int((longitude + lon_delta + 180) // GRID_DEGREES)
+        columns = sorted({column % GRID_COLUMNS for column in range(first, last + 1)})
+    return [_cell(row, column) for row in range(min_row, max_row + 1) for column in columns]
+
@@ -0,0 +1,21 @@
+import base64
+import binascii
+import json
+
+
+def encode_cursor(values):
+    """Turn the sort values of the last row of a page into an opaque token."""
+    payload = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of :func:`encode_cursor`, raises ``ValueError`` on a tampered token."""
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != 2 or not isinstance(values[1], int):
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,311 @@
+"""In-process request metrics of the skill swap routes.
+
+``instrument`` wraps a controller method and records, per route, the wall
+time, the number and duration of SQL queries and the response size into
+fixed-bucket histograms, so memory does not grow with traffic. ``render``
+returns them in the Prometheus text format.
+
+Each worker process keeps its histograms in memory and writes them, at
+most every ``FLUSH_INTERVAL`` seconds, to a file of its own in the
+``skill_swap_metrics_dir`` directory of the server configuration (by
+default ``skill_swap_metrics`` in the data directory). ``render`` sums the
+files of all the workers, whichever worker serves the scrape, and folds the
+files of the workers that exited into a shared archive so the counters never
+go back. A worker file is named after its host, pid and process start
+time: only the files of the local host are checked, so a shared directory
+never archives the live workers of another host, and a reused pid does not
+keep the file of an exited worker alive. Scrape one worker per host.
+
+When ``skill_swap.slow_request_ms`` is set, the SQL statements of every
+instrumented request are captured and the slowest ones are logged for the
+requests exceeding that duration.
+"""
+import fcntl
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from odoo.http import request
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+SLOW_STATEMENTS_LOGGED = 10
+MAX_CAPTURED_STATEMENTS = 500
+MAX_STATEMENT_LENGTH = 500
+FLUSH_INTERVAL = 1  # seconds between two writes of the metrics file of a worker
+ARCHIVE_FILE = 'archive.json'
+
+# name: (help, buckets)
+METRICS = {
+    'skill_swap_request_duration_seconds': (
+        'Wall time of the skill swap routes',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    ),
+    'skill_swap_request_sql_queries': (
+        'SQL queries run by the skill swap routes',
+        (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    ),
+    'skill_swap_request_sql_duration_seconds': (
+        'Time spent in SQL by the skill swap routes',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    ),
+    'skill_swap_response_size_bytes': (
+        'Response size of the skill swap routes',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram, in the Prometheus sense."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.total += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield '%g' % bound, cumulative
+        yield '+Inf', cumulative + self.counts[-1]
+
+
+_histograms = {}  # (metric, route): Histogram
+_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _metrics_dir():
+    return config.get('skill_swap_metrics_dir') or os.path.join(config['data_dir'], 'skill_swap_metrics')
+
+
+def _dump(histograms):
+    return [[metric, route, histogram.counts, histogram.total]
+            for (metric, route), histogram in histograms.items()]
+
+
+def _merge(histograms, entries):
+    """Add the ``_dump`` entries to ``histograms``, skipping the ones whose buckets changed."""
+    for metric, route, counts, total in entries:
+        if metric not in METRICS or len(counts) != len(METRICS[metric][1]) + 1:
+            continue
+        histogram = histograms.get((metric, route))
+        if histogram is None:
+            histogram = histograms[metric, route] = Histogram(METRICS[metric][1])
+        histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+        histogram.total += total
+
+
+def _write(path, entries):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w') as tmp_file:
+        json.dump(entries, tmp_file)
+    os.replace(tmp_path, path)
+
+
+def _read(path):
+    try:
+        with open(path) as metrics_file:
+            return json.load(metrics_file)
+    except (OSError, ValueError):
+        return []
+
+
+def _start_time(pid):
+    """Start time of process ``pid`` in clock ticks since boot, ``'0'`` where /proc is missing."""
+    try:
+        with open('/proc/%s/stat' % pid) as stat_file:
+            # the command name may hold spaces, the fields after it do not
+            return stat_file.read().rpartition(')')[2].split()[19]
+    except (OSError, IndexError):
+        return '0'
+
+
+def _worker_file(pid):
+    return '%s-%s-%s.json' % (socket.gethostname(), pid, _start_time(pid))
+
+
+def _flush():
+    """Write the histograms of this process to its metrics file, call with ``_lock`` held."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    try:
+        _write(os.path.join(_metrics_dir(), _worker_file(os.getpid())), _dump(_histograms))
+    except OSError:
+        _logger.warning("Cannot write the skill swap metrics file", exc_info=True)
+
+
+def _alive(pid, start_time):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return _start_time(pid) == start_time
+
+
+def observe(route, values):
+    with _lock:
+        for metric, value in values.items():
+            if value is None:
+                continue
+            histogram = _histograms.get((metric, route))
+            if histogram is None:
+                histogram = _histograms[metric, route] = Histogram(METRICS[metric][1])
+            histogram.observe(value)
+        if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+            _flush()
+
+
+def collect():
+    """Sum the histograms of all the workers, folding the exited ones into the archive."""
+    with _lock:
+        _flush()
+    directory = _metrics_dir()
+    histograms = {}
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = {}
+        _merge(archive, _read(archive_path))
+        exited = []
+        hostname = socket.gethostname()
+        for name in os.listdir(directory):
+            parts = name[:-len('.json')].rsplit('-', 2)
+            if not name.endswith('.json') or len(parts) != 3 or not parts[1].isdigit():
+                continue
+            host, pid, start_time = parts
+            entries = _read(os.path.join(directory, name))
+            if host != hostname or _alive(int(pid), start_time):
+                _merge(histograms, entries)
+            else:
+                _merge(archive, entries)
+                exited.append(name)
+        if exited:
+            _write(archive_path, _dump(archive))
+            for name in exited:
+                os.unlink(os.path.join(directory, name))
+        _merge(histograms, _dump(archive))
+    return histograms
+
+
+def render():
+    """Return the histograms of all the workers in the Prometheus text exposition format."""
+    histograms = collect()
+    lines = []
+    for metric, (help_text, _buckets) in METRICS.items():
+        lines.append('# HELP %s %s' % (metric, help_text))
+        lines.append('# TYPE %s histogram' % metric)
+        for (name, route), histogram in sorted(histograms.items()):
+            if name != metric:
+                continue
+            labels = 'route="%s"' % route
+            for bound, count in histogram.samples():
+                lines.append('%s_bucket{%s,le="%s"} %s' % (metric, labels, bound, count))
+            lines.append('%s_sum{%s} %s' % (metric, labels, histogram.total))
+            lines.append('%s_count{%s} %s' % (metric, labels, sum(histogram.counts)))
+    return '\n'.join(lines) + '\n'
+
+
+def _response_size(response):
+    if isinstance(response, (dict, list)):
+        # json routes return the payload, it is serialized by the framework
+        return len(json.dumps(response, default=str))
+    if getattr(response, 'is_streamed', False) or getattr(response, 'direct_passthrough', False):
+        # sizing a streamed body would read it all into memory before sending it
+        length = response.headers.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    if getattr(response, 'is_qweb', False):
+        response.flatten()
+    try:
+        return response.calculate_content_length()
+    except AttributeError:
+        return None
+
+
+def _slow_request_threshold():
+    try:
+        value = request.env['ir.config_parameter'].sudo().get_param('skill_swap.slow_request_ms')
+        return float(value) / 1000 if value else None
+    except Exception:
+        return None
+
+
+def _capture_statements(cr):
+    """Record the statements run on ``cr`` until the returned function restores it."""
+    statements = []
+    execute = cr.execute
+
+    def capturing_execute(query, params=None, log_exceptions=True):
+        start = time.perf_counter()
+        try:
+            return execute(query, params, log_exceptions)
+        finally:
+            if len(statements) < MAX_CAPTURED_STATEMENTS:
+                statements.append((time.perf_counter() - start, str(getattr(query, 'code', query))))
+
+    cr.execute = capturing_execute
+
+    def restore():
+        del cr.execute
+        return statements
+    return restore
+
+
+def instrument(func):
+    """Record the metrics of a controller method, place it under ``http.route``."""
+    route = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        threshold = _slow_request_threshold()
+        thread = threading.current_thread()
+        query_count = getattr(thread, 'query_count', 0)
+        query_time = getattr(thread, 'query_time', 0.0)
+        cr = request.env.cr if threshold is not None else None
+        restore = _capture_statements(cr) if cr is not None else None
+        start = time.perf_counter()
+        try:
+            response = func(self, *args, **kwargs)
+            size = _response_size(response)
+        finally:
+            duration = time.perf_counter() - start
+            statements = restore() if restore else []
+            sql_queries = getattr(thread, 'query_count', 0) - query_count
+            sql_time = getattr(thread, 'query_time', 0.0) - query_time
+        observe(route, {
+            'skill_swap_request_duration_seconds': duration,
+            'skill_swap_request_sql_queries': sql_queries,
+            'skill_swap_request_sql_duration_seconds': sql_time,
+            'skill_swap_response_size_bytes': size,
+        })
+        if threshold is not None and duration >= threshold:
+            slowest = sorted(statements, reverse=True)[:SLOW_STATEMENTS_LOGGED]
+            _logger.warning(
+                "Slow request %s (%s): %.3fs, %s queries in %.3fs. Slowest statements:\n%s",
+                route, request.httprequest.full_path, duration, sql_queries, sql_time,
+                '\n'.join('%.3fs %s' % (elapsed, statement[:MAX_STATEMENT_LENGTH])
+                          for elapsed, statement in slowest),
+            )
+        return response
+    return wrapper
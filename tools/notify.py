@@ -0,0 +1,133 @@
+"""Per-process dispatcher of Postgres ``LISTEN``/``NOTIFY`` payloads.
+
+Each worker process runs at most one listening thread per database, on a
+single connection shared by every channel it listens to. That connection is
+taken from the worker's pool and kept for the life of the process: with N
+workers serving a database, Postgres sees N more connections, and
+``db_maxconn`` must leave one spare per database a worker listens on.
+
+Payloads are JSON documents; ``notify`` sends one within the current
+transaction, so it is delivered only if the transaction commits.
+"""
+import json
+import logging
+import os
+import selectors
+import threading
+import time
+
+import odoo
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+LISTEN_TIMEOUT = 50  # seconds between two checks of the connection
+RECONNECT_DELAY = 5
+MAX_PAYLOAD_IDS = 500  # keeps payloads well below the 8000 bytes NOTIFY limit
+
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+def notify(cr, channel, **payload):
+    cr.execute("SELECT pg_notify(%s, %s)", (channel, json.dumps(payload)))
+
+
+def notify_ids(cr, channel, key, ids, **payload):
+    """Notify ``ids`` under ``key``, split over as many payloads as needed."""
+    for batch in split_every(MAX_PAYLOAD_IDS, sorted(set(ids))):
+        notify(cr, channel, **{key: list(batch)}, **payload)
+
+
+def get_dispatcher(dbname, channel):
+    with _listeners_lock:
+        if dbname not in _listeners:
+            _listeners[dbname] = Listener(dbname)
+        return _listeners[dbname].dispatcher(channel)
+
+
+class Dispatcher:
+    """Callbacks of one channel, fed by the listener of its database."""
+
+    def __init__(self, listener, channel):
+        self.listener = listener
+        self.channel = channel
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        """Call ``callback(payload)`` from the listening thread for every payload."""
+        self._callbacks.append(callback)
+        self.listener.start()
+
+    def _dispatch(self, payloads):
+        for payload in payloads:
+            for callback in self._callbacks:
+                try:
+                    callback(payload)
+                except Exception:
+                    _logger.exception("Error while dispatching %s notification", self.channel)
+
+
+class Listener:
+    """Listening thread of one database, for all the channels of the process."""
+
+    def __init__(self, dbname):
+        self.dbname = dbname
+        self._dispatchers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        # written to when a channel is added, so that the thread LISTENs to it right away
+        self._wakeup_r, self._wakeup_w = os.pipe()
+
+    def dispatcher(self, channel):
+        with self._lock:
+            if channel not in self._dispatchers:
+                self._dispatchers[channel] = Dispatcher(self, channel)
+                os.write(self._wakeup_w, b'.')
+            return self._dispatchers[channel]
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name='skill_swap.notify.%s' % self.dbname, daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                _logger.exception("Listener of %s lost its connection, reconnecting", self.dbname)
+                time.sleep(RECONNECT_DELAY)
+
+    def _listen(self):
+        with odoo.sql_db.db_connect(self.dbname).cursor() as cr, selectors.DefaultSelector() as sel:
+            conn = cr._cnx
+            sel.register(conn, selectors.EVENT_READ)
+            sel.register(self._wakeup_r, selectors.EVENT_READ)
+            listening = set()
+            while True:
+                with self._lock:
+                    channels = set(self._dispatchers) - listening
+                for channel in sorted(channels):
+                    cr.execute('LISTEN "%s"' % channel)
+                    listening.add(channel)
+                if channels:
+                    cr.commit()
+                for key, _mask in sel.select(LISTEN_TIMEOUT):
+                    if key.fileobj == self._wakeup_r:
+                        os.read(self._wakeup_r, 512)
+                        continue
+                    conn.poll()
+                    payloads = {}
+                    for notification in conn.notifies:
+                        try:
+                            payloads.setdefault(notification.channel, []).append(json.loads(notification.payload))
+                        except ValueError:
+                            _logger.warning("Ignoring malformed %s payload", notification.channel)
+                    conn.notifies.clear()
+                    for channel, channel_payloads in payloads.items():
+                        dispatcher = self._dispatchers.get(channel)
+                        if dispatcher:
+                            dispatcher._dispatch(channel_payloads)
@@ -0,0 +1,26 @@
+import logging
+
+import psycopg2
+
+from odoo.tools import mute_logger
+
+_logger = logging.getLogger(__name__)
+
+
+def ensure_extension(cr, name):
+    """Make sure the Postgres extension ``name`` is available.
+
+    Creating an extension needs elevated privileges on most setups, so a
+    failure is logged and reported to the caller instead of aborting the
+    module update.
+    """
+    cr.execute("SELECT 1 FROM pg_extension WHERE extname = %s", (name,))
+    if cr.fetchone():
+        return True
+    try:
+        with cr.savepoint(flush=False), mute_logger('odoo.sql_db'):
+            cr.execute('CREATE EXTENSION IF NOT EXISTS "%s"' % name)
+    except psycopg2.Error:
+        _logger.warning("Postgres extension %s is not available, ask a superuser to install it.", name)
+        return False
+    return True
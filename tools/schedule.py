@@ -0,0 +1,100 @@
+"""Interval arithmetic behind the free slot suggestions.
+
+Intervals are ``(start, stop)`` pairs of naive UTC datetimes, half-open,
+in lists sorted by start. Every operation is a single merge pass over its
+sorted inputs.
+"""
+from datetime import datetime, time, timedelta
+
+import pytz
+
+ALL_DAYS = frozenset(range(7))
+
+# availability: (weekdays, first hour, last hour) in the user's timezone
+AVAILABILITY_WINDOWS = {
+    'weekdays': (frozenset(range(5)), 9, 17),
+    'weekends': (frozenset((5, 6)), 9, 17),
+    'evenings': (ALL_DAYS, 18, 21),
+    'flexible': (ALL_DAYS, 8, 21),
+}
+
+
+def availability_windows(availability, tz_name, start, stop):
+    """Windows of ``availability`` between ``start`` and ``stop``, in UTC."""
+    weekdays, first_hour, last_hour = AVAILABILITY_WINDOWS.get(availability or 'flexible',
+                                                                AVAILABILITY_WINDOWS['flexible'])
+    try:
+        tz = pytz.timezone(tz_name or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        tz = pytz.utc
+    day = pytz.utc.localize(start).astimezone(tz).date()
+    last_day = pytz.utc.localize(stop).astimezone(tz).date()
+    windows = []
+    while day <= last_day:
+        if day.weekday() in weekdays:
+            window_start = _to_utc(tz, datetime.combine(day, time(first_hour)))
+            window_stop = _to_utc(tz, datetime.combine(day, time(last_hour)))
+            window_start, window_stop = max(window_start, start), min(window_stop, stop)
+            if window_start < window_stop:
+                windows.append((window_start, window_stop))
+        day += timedelta(days=1)
+    return windows
+
+
+def _to_utc(tz, local):
+    return tz.localize(local).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def intersect(intervals, others):
+    """Intervals covered by both lists."""
+    result = []
+    i = j = 0
+    while i < len(intervals) and j < len(others):
+        start = max(intervals[i][0], others[j][0])
+        stop = min(intervals[i][1], others[j][1])
+        if start < stop:
+            result.append((start, stop))
+        if intervals[i][1] < others[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtract(intervals, busy):
+    """Parts of ``intervals`` not covered by ``busy``, which may overlap itself."""
+    result = []
+    index = 0
+    for start, stop in intervals:
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+        cursor = start
+        for busy_start, busy_stop in busy[index:]:
+            if busy_start >= stop:
+                break
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_stop)
+        if cursor < stop:
+            result.append((cursor, stop))
+    return result
+
+
+def ceil_datetime(value, step):
+    """Round ``value`` up to a multiple of ``step`` since midnight."""
+    midnight = datetime.combine(value.date(), time())
+    steps = -(-(value - midnight) // step)
+    return midnight + steps * step
+
+
+def first_slots(intervals, duration, step, count):
+    """The first ``count`` slots of ``duration`` fitting in ``intervals``, starting on ``step``."""
+    slots = []
+    for start, stop in intervals:
+        slot_start = ceil_datetime(start, step)
+        while slot_start + duration <= stop:
+            slots.append((slot_start, slot_start + duration))
+            if len(slots) >= count:
+                return slots
+            slot_start = ceil_datetime(slot_start + duration, step)
+    return slots
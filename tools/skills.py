@@ -0,0 +1,8 @@
+import re
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_skill_name(name):
+    """Return the comparison key of a free-text skill name."""
+    return _WHITESPACE.sub(' ', name or '').strip().casefold()
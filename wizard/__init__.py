@@ -1 +1,2 @@
-from . import swap_request_wizard
\ No newline at end of file
+from . import swap_request_wizard
+from . import skill_swap_import_wizard
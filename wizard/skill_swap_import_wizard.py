@@ -0,0 +1,74 @@
+import io
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from ..models.bulk_import import DEFAULT_CHUNK_SIZE
+
+
+class SkillSwapImportWizard(models.TransientModel):
+    _name = 'skill.swap.import.wizard'
+    _description = 'Skill Swap Bulk Import Wizard'
+
+    model_name = fields.Selection([
+        ('user.skill', 'User Skills'),
+        ('swap.request', 'Swap Requests'),
+    ], string='Import', default='user.skill', required=True)
+    data_file = fields.Binary(string='File', required=True, attachment=True)
+    file_name = fields.Char(string='File Name')
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ], string='Format', default='csv', required=True)
+    chunk_size = fields.Integer(string='Chunk Size', default=DEFAULT_CHUNK_SIZE)
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft')
+    created_count = fields.Integer(string='Created', readonly=True)
+    error_count = fields.Integer(string='Rejected Rows', readonly=True)
+    error_log = fields.Text(string='Errors', readonly=True)
+
+    @api.onchange('file_name')
+    def _onchange_file_name(self):
+        if self.file_name and self.file_name.lower().endswith(('.jsonl', '.ndjson')):
+            self.file_format = 'jsonl'
+
+    def _open_data_file(self):
+        """Open the uploaded file as a binary stream, without loading it in memory."""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'data_file'),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_("Please upload a file to import."))
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw)
+
+    def action_import(self):
+        self.ensure_one()
+        if self.chunk_size <= 0:
+            raise UserError(_("The chunk size must be positive."))
+        with self._open_data_file() as stream:
+            result = self.env['skill.swap.bulk.import'].import_stream(
+                self.model_name, stream, self.file_format, self.chunk_size)
+        error_log = '\n'.join(_("Line %s: %s") % (line, message) for line, message in result['errors'])
+        if result['error_count'] > len(result['errors']):
+            error_log += '\n' + _("... %s more", result['error_count'] - len(result['errors']))
+        self.write({
+            'state': 'done',
+            'created_count': result['created'],
+            'error_count': result['error_count'],
+            'error_log': error_log,
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
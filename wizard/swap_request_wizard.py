@@ -49,20 +49,8 @@ class SwapRequestWizard(models.TransientModel):
         """Create the swap request"""
         self.ensure_one()
 
-        # Check if there's already a pending request
-        existing_request = self.env['swap.request'].search([
-            ('requester_id', '=', self.env.user.id),
-            ('provider_id', '=', self.provider_skill_id.user_id.id),
-            ('requester_skill_id', '=', self.requester_skill_id.id),
-            ('provider_skill_id', '=', self.provider_skill_id.id),
-            ('state', 'in', ['pending', 'accepted'])
-        ])
-
-        if existing_request:
-            raise ValidationError(_('You already have a pending or accepted request for this skill swap.'))
-
-        # Create the request
-        request = self.env['swap.request'].create({
+        # Create the request, unless the same one is already pending or accepted
+        request, created = self.env['swap.request']._create_or_get_open({
             'requester_id': self.env.user.id,
             'provider_id': self.provider_skill_id.user_id.id,
             'requester_skill_id': self.requester_skill_id.id,
@@ -72,10 +60,11 @@ class SwapRequestWizard(models.TransientModel):
             'estimated_duration': self.estimated_duration,
         })
 
-        # Send notification email
-        template = self.env.ref('skill_swap_platform.email_template_swap_request', raise_if_not_found=False)
-        if template:
-            template.send_mail(request.id, force_send=True)
+        if not created:
+            raise ValidationError(_('You already have a pending or accepted request for this skill swap.'))
+
+        # Queue notification email
+        request._queue_mail('skill_swap_platform.email_template_swap_request')
 
         return {
             'type': 'ir.actions.act_window',
@@ -110,23 +99,14 @@ class SwapRequestResponseWizard(models.TransientModel):
         """Respond to the swap request"""
         self.ensure_one()
 
+        vals = {'response_message': self.response_message, 'response_date': fields.Datetime.now()}
         if self.action_type == 'accept':
-            self.request_id.write({
-                'state': 'accepted',
-                'response_message': self.response_message,
-                'response_date': fields.Datetime.now()
-            })
+            self.request_id._bulk_transition('accepted', vals, "Swap request has been accepted!")
 
-            # Send acceptance email
-            template = self.env.ref('skill_swap_platform.email_template_swap_accepted', raise_if_not_found=False)
-            if template:
-                template.send_mail(self.request_id.id, force_send=True)
+            # Queue acceptance email
+            self.request_id._queue_mail('skill_swap_platform.email_template_swap_accepted')
 
         elif self.action_type == 'reject':
-            self.request_id.write({
-                'state': 'rejected',
-                'response_message': self.response_message,
-                'response_date': fields.Datetime.now()
-            })
+            self.request_id._bulk_transition('rejected', vals, "Swap request has been rejected!")
 
         return {'type': 'ir.actions.act_window_close'}
\ No newline at end of file